@@ -0,0 +1,107 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import diario  # noqa: E402
+from grid import Grid, configurar_partida  # noqa: E402
+from motor import ESTADOS  # noqa: E402
+from protocolo import Par  # noqa: E402
+from simulacao import Simulacao  # noqa: E402
+
+OPERACOES = 200000
+TAMANHO = 2000
+TIROS = 2000000
+PARTIDAS = 10
+REPETICOES = 5
+OPONENTE = Par("10.0.0.2", 5001, 2)
+
+
+def custo_registrar(caminho):
+    registro = diario.Diario(caminho, {"tamanho": 10, "frota": []})
+    inicio = time.perf_counter()
+    for i in range(OPERACOES):
+        registro.registrar(diario.TIRO_RECEBIDO, OPONENTE, i & 7, i & 3, 1)
+    custo = (time.perf_counter() - inicio) / OPERACOES
+    registro.fechar()
+    return custo
+
+
+def gravar_sintetico(caminho):
+    # Um tabuleiro grande recebendo tiros aleatórios (com repetições), gravado
+    # pelo próprio Diario: a reprodução precisa chegar aos mesmos resultados.
+    tamanho, frota = configurar_partida(TAMANHO)
+    grid = Grid(tamanho, frota)
+    grid.posicionar_navios_aleatorio(random.Random(0))
+    registro = diario.Diario(
+        caminho,
+        {
+            "ip": "10.0.0.1",
+            "tamanho": tamanho,
+            "frota": list(frota.items()),
+            "estados": ESTADOS,
+        },
+    )
+    registro.registrar_frota(grid)
+    rng = random.Random(1)
+    codigos = diario.protocolo.CODIGO_RESULTADO
+    for _ in range(TIROS):
+        x, y = rng.randrange(tamanho), rng.randrange(tamanho)
+        resultado = grid.processar_tiro(x, y)
+        registro.registrar(diario.TIRO_RECEBIDO, OPONENTE, x, y, codigos[resultado])
+        registro.registrar(diario.RESULTADO_RECEBIDO, OPONENTE, x, y, 0)
+    registro.fechar()
+    return grid.navios_restantes
+
+
+def medir_simulacao(diretorio):
+    simulacao = Simulacao(6, "aleatoria", semente=1, diarios=diretorio)
+    return 1 / simulacao.executar(PARTIDAS)["tiros_por_s"]
+
+
+def sobrecusto_simulacao(diretorio):
+    sem, com = [], []
+    for _ in range(REPETICOES):
+        sem.append(medir_simulacao(None))
+        com.append(medir_simulacao(diretorio))
+    return min(sem), min(com)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as diretorio:
+        custo = custo_registrar(os.path.join(diretorio, "custo.diario"))
+        print(f"[BENCH] registrar: {custo * 1e9:.0f} ns por evento")
+
+        sem, com = sobrecusto_simulacao(diretorio)
+        print(
+            f"[BENCH] simulação (6 jogadores): {sem * 1e6:.1f} µs/tiro sem diário, "
+            f"{com * 1e6:.1f} com ({com / sem - 1:+.1%})"
+        )
+        divergencias = 0
+        for nome in os.listdir(diretorio):
+            if nome != "custo.diario":
+                caminho = os.path.join(diretorio, nome)
+                divergencias += diario.reproduzir(caminho)["divergencias"]
+        print(
+            f"[BENCH] diários da simulação reproduzidos: {divergencias} divergência(s)"
+        )
+
+        caminho = os.path.join(diretorio, "sintetico.diario")
+        navios = gravar_sintetico(caminho)
+        melhor = float("inf")
+        for _ in range(REPETICOES):
+            inicio = time.perf_counter()
+            relatorio = diario.reproduzir(caminho)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        print(
+            f"[BENCH] reprodução: {relatorio['registros']:,} registros "
+            f"({os.path.getsize(caminho) / 2**20:.1f} MiB, {TAMANHO}x{TAMANHO}) em "
+            f"{melhor:.2f} s = {relatorio['registros'] / melhor:,.0f} registros/s"
+        )
+        if relatorio["divergencias"] or relatorio["navios_restantes"] != navios:
+            print("[BENCH] reprodução divergiu do que foi gravado")
+            sys.exit(1)
+    sys.exit(1 if divergencias else 0)
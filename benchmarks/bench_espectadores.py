@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from espectadores import EU, ServidorEspectadores  # noqa: E402
+from grid import Grid, configurar_partida  # noqa: E402
+from motor import ESTADO_AGUARDANDO, MotorJogo  # noqa: E402
+from protocolo import Par  # noqa: E402
+
+TAMANHO = 200
+OPONENTES = 8
+ESPECTADORES = 50
+QUADROS = 400
+TIROS_POR_QUADRO = 20
+PAUSA_QUADRO = 0.005
+# O espectador lento lê 256 bytes a cada 50 ms (~5 KiB/s).
+LEITURA_LENTA = 256
+PAUSA_LENTA = 0.05
+LIMITE_ALCANCE = 60.0
+
+
+class Espectador(threading.Thread):
+    # Cliente SSE mínimo que reconstrói os tabuleiros a partir do feed.
+    def __init__(self, porta, lento=False):
+        super().__init__(daemon=True)
+        self.porta = porta
+        self.lento = lento
+        self.tabuleiros = {}
+        self.seq = -1
+        self.retratos = 0
+        self.deltas = 0
+        self.bytes = 0
+        self.acelerar = threading.Event()
+
+    def run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.lento:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(("127.0.0.1", self.porta))
+        sock.sendall(b"GET /espectar HTTP/1.0\r\n\r\n")
+        pendente = b""
+        evento = None
+        try:
+            while True:
+                lento = self.lento and not self.acelerar.is_set()
+                bloco = sock.recv(LEITURA_LENTA if lento else 65536)
+                if not bloco:
+                    break
+                self.bytes += len(bloco)
+                if lento:
+                    time.sleep(PAUSA_LENTA)
+                *linhas, pendente = (pendente + bloco).split(b"\n")
+                for linha in linhas:
+                    if linha.startswith(b"event: "):
+                        evento = linha[7:].decode()
+                    elif linha.startswith(b"data: "):
+                        self._aplicar(evento, json.loads(linha[6:]))
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def _aplicar(self, evento, dados):
+        if evento == "retrato":
+            self.retratos += 1
+            self.tabuleiros = {}
+            for dono, tabuleiro in dados["tabuleiros"].items():
+                celulas = self.tabuleiros[dono] = {}
+                celulas.update(
+                    (i, Grid.SIMBOLO_NAVIO) for i in tabuleiro.get("navios", ())
+                )
+                celulas.update((i, Grid.SIMBOLO_ATINGIDO) for i in tabuleiro["acertos"])
+                celulas.update((i, Grid.SIMBOLO_ERRO) for i in tabuleiro["erros"])
+                celulas.update(
+                    (i, Grid.SIMBOLO_BLOQUEADO) for i in tabuleiro["bloqueados"]
+                )
+        else:
+            self.deltas += 1
+            for dono in dados.get("sairam", ()):
+                self.tabuleiros.pop(dono, None)
+            for dono in dados.get("entraram", ()):
+                self.tabuleiros[dono] = {}
+            for dono, celulas in dados.get("celulas", {}).items():
+                self.tabuleiros.setdefault(dono, {}).update(celulas)
+        self.seq = dados["seq"]
+
+
+def esperado(motor):
+    grid = motor.grid
+    tabuleiros = {EU: dict.fromkeys(grid.navio_na_celula, Grid.SIMBOLO_NAVIO)}
+    tabuleiros[EU].update(dict.fromkeys(grid.acertos, Grid.SIMBOLO_ATINGIDO))
+    tabuleiros[EU].update(dict.fromkeys(grid.erros, Grid.SIMBOLO_ERRO))
+    for par, oponente in motor.grids_oponentes.items():
+        celulas = tabuleiros[str(par)] = {}
+        celulas.update(dict.fromkeys(oponente.acertos, Grid.SIMBOLO_ATINGIDO))
+        celulas.update(dict.fromkeys(oponente.erros, Grid.SIMBOLO_ERRO))
+        celulas.update(dict.fromkeys(oponente.bloqueados, Grid.SIMBOLO_BLOQUEADO))
+    return tabuleiros
+
+
+def normalizar(tabuleiros):
+    # Deltas trazem índices como chaves de texto (JSON) e água como "~".
+    return {
+        dono: {int(i): s for i, s in celulas.items() if s != Grid.SIMBOLO_AGUA}
+        for dono, celulas in tabuleiros.items()
+    }
+
+
+def partida(motor, rng, quadros):
+    # Tiros recebidos e resultados de tiros nossos entram pela fila, como os
+    # eventos da rede; mede só o processamento de cada quadro.
+    n = motor.grid.GRID_SIZE
+    oponentes = list(motor.grids_oponentes)
+    tempos = []
+    for _ in range(quadros):
+        for _ in range(TIROS_POR_QUADRO):
+            x, y = rng.randrange(n), rng.randrange(n)
+            motor.callback_queue.put(("tiro_recebido", oponentes[0], x, y))
+            resultado = "hit" if rng.random() < 0.2 else "miss"
+            alvo = rng.choice(oponentes)
+            motor.callback_queue.put(
+                ("resultado_tiro", alvo, resultado, rng.randrange(n), rng.randrange(n))
+            )
+        inicio = time.perf_counter()
+        motor.processar_eventos_rede()
+        motor.celulas_alteradas.clear()
+        tempos.append(time.perf_counter() - inicio)
+        time.sleep(PAUSA_QUADRO)
+    return tempos
+
+
+def criar_motor(rng):
+    tamanho, frota = configurar_partida(TAMANHO)
+    motor = MotorJogo(grid=Grid(tamanho, frota))
+    motor.verboso = False
+    motor.grid.posicionar_navios_aleatorio(rng)
+    motor.estado_jogo = ESTADO_AGUARDANDO
+    motor.callback_queue.put(
+        (
+            "lista_participantes",
+            [Par("10.0.0.2", 5001 + i, i + 1) for i in range(OPONENTES)],
+        )
+    )
+    motor.processar_eventos_rede()
+    return motor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed de espectadores sob carga.")
+    parser.add_argument("--espectadores", type=int, default=ESPECTADORES)
+    parser.add_argument("--quadros", type=int, default=QUADROS)
+    args = parser.parse_args()
+
+    falhas = []
+    motor = criar_motor(random.Random(0))
+    sem = partida(motor, random.Random(1), args.quadros)
+    motor.p2p_node.stop()
+
+    motor = criar_motor(random.Random(0))
+    servidor = ServidorEspectadores(motor.iniciar_espectadores())
+    servidor.iniciar()
+    espectadores = [Espectador(servidor.porta) for _ in range(args.espectadores)]
+    lento = Espectador(servidor.porta, lento=True)
+    for espectador in espectadores + [lento]:
+        espectador.start()
+    # Os retratos iniciais são pedidos pela fila e tirados na thread do jogo.
+    inicio = time.perf_counter()
+    while motor.espectadores.assinantes < len(espectadores) + 1 or any(
+        e.retratos == 0 for e in espectadores + [lento]
+    ):
+        motor.processar_eventos_rede()
+        time.sleep(0.01)
+        if time.perf_counter() - inicio > LIMITE_ALCANCE:
+            falhas.append("retrato inicial não chegou a todos")
+            break
+    com = partida(motor, random.Random(1), args.quadros)
+    seq_final = motor.espectadores._seq
+
+    rapidos = time.perf_counter()
+    while any(e.seq < seq_final for e in espectadores):
+        if time.perf_counter() - rapidos > LIMITE_ALCANCE:
+            break
+        time.sleep(0.01)
+    rapidos = time.perf_counter() - rapidos
+    atraso_lento = seq_final - lento.seq
+    # Depois da partida o lento lê sem pausas e tem de alcançar o estado final.
+    lento.acelerar.set()
+    limite = time.perf_counter() + LIMITE_ALCANCE
+    while lento.seq < seq_final and time.perf_counter() < limite:
+        motor.processar_eventos_rede()
+        time.sleep(0.01)
+
+    verdade = esperado(motor)
+    divergentes = sum(
+        normalizar(e.tabuleiros) != verdade for e in espectadores + [lento]
+    )
+    servidor.parar()
+    motor.p2p_node.stop()
+
+    def ms(tempos):
+        tempos = sorted(tempos)
+        return (
+            sum(tempos) / len(tempos) * 1e3,
+            tempos[int(len(tempos) * 0.99)] * 1e3,
+            tempos[-1] * 1e3,
+        )
+
+    eventos = TIROS_POR_QUADRO * 2
+    for rotulo, tempos in (
+        ("sem espectadores", sem),
+        (f"{args.espectadores}+1 espectadores", com),
+    ):
+        media, p99, maximo = ms(tempos)
+        print(
+            f"[BENCH] quadro com {eventos} eventos, {rotulo}: média {media:.2f} ms, "
+            f"p99 {p99:.2f} ms, máx {maximo:.2f} ms"
+        )
+    deltas = sum(e.deltas for e in espectadores) / len(espectadores)
+    volume = sum(e.bytes for e in espectadores) / len(espectadores)
+    print(
+        f"[BENCH] espectador rápido: {deltas:.0f} deltas, {volume / 1024:.0f} KiB, "
+        f"alcança o jogo {rapidos * 1e3:.0f} ms após o último quadro"
+    )
+    print(
+        f"[BENCH] espectador lento: {lento.deltas} deltas, {lento.retratos} "
+        f"retrato(s), {lento.bytes / 1024:.0f} KiB, {atraso_lento} entradas atrás "
+        f"no fim da partida"
+    )
+    print(
+        f"[BENCH] {seq_final} entradas publicadas, {motor.espectadores.retratos} "
+        f"retrato(s) capturado(s), {divergentes} espectador(es) divergente(s)"
+    )
+    if any(e.seq < seq_final for e in espectadores):
+        falhas.append("espectadores rápidos não alcançaram o fim da partida")
+    if lento.seq < seq_final:
+        falhas.append("espectador lento não alcançou o estado final")
+    if divergentes:
+        falhas.append("tabuleiro reconstruído difere do motor")
+    if ms(com)[2] > max(ms(sem)[2] * 10, 50.0):
+        falhas.append("o espectador lento travou o loop do jogo")
+    for falha in falhas:
+        print(f"[BENCH] FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import Grid  # noqa: E402
+from grid_batch import GridBatch  # noqa: E402
+
+
+def medir_vazao(tabuleiros=10000, semente=0):
+    random.seed(semente)
+    grids = []
+    for _ in range(tabuleiros):
+        grid = Grid()
+        grid.posicionar_navios_aleatorio()
+        grids.append(grid)
+    lote = GridBatch.de_grids(grids)
+
+    rng = np.random.default_rng(semente)
+    celulas = Grid.GRID_SIZE * Grid.GRID_SIZE
+    ordem = np.argsort(rng.random((tabuleiros, celulas)), axis=1)
+
+    inicio = time.perf_counter()
+    for rodada in range(celulas):
+        alvo = ordem[:, rodada]
+        lote.processar_tiros(alvo % Grid.GRID_SIZE, alvo // Grid.GRID_SIZE)
+    duracao = time.perf_counter() - inicio
+    assert lote.derrotados().all()
+    return tabuleiros * celulas / duracao
+
+
+if __name__ == "__main__":
+    print(f"[BENCH] GridBatch: {medir_vazao():,.0f} tiros/s")
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_NO = """
+import sys, time
+inicio = time.perf_counter()
+from headless import NoHeadless
+importado = time.perf_counter()
+no = NoHeadless(atirar=False)
+no.p2p_node.start()
+pronto = time.perf_counter()
+print("MEDIDA", importado - inicio, pronto - importado, "pygame" in sys.modules)
+no.p2p_node.stop()
+"""
+
+
+def medir_inicializacao(repeticoes=5):
+    importacoes = []
+    partidas = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", CODIGO_NO],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        linha = next(l for l in saida.splitlines() if l.startswith("MEDIDA"))
+        _, importacao, partida, pygame_importado = linha.split()
+        if pygame_importado != "False":
+            raise AssertionError("o nó headless importou pygame")
+        importacoes.append(float(importacao))
+        partidas.append(float(partida))
+    return min(importacoes), min(partidas)
+
+
+if __name__ == "__main__":
+    importacao, partida = medir_inicializacao()
+    print(f"[BENCH] Importação dos módulos (sem pygame): {importacao * 1000:.1f} ms")
+    print(f"[BENCH] Criação do nó até listeners prontos: {partida * 1000:.1f} ms")
+    print(f"[BENCH] Total até pronto: {(importacao + partida) * 1000:.1f} ms")
@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protocolo  # noqa: E402
+from confiabilidade import EstimadorRtt  # noqa: E402
+from fila_eventos import FilaEventos  # noqa: E402
+from grid import Grid  # noqa: E402
+from motor import ESTADO_AGUARDANDO, MotorJogo  # noqa: E402
+from p2p_node import P2PNode  # noqa: E402
+
+# Três nós reais em 127.0.0.1: um par bem-comportado e a vítima trocam tiros
+# a TAXA_BOA por segundo enquanto o terceiro inunda a vítima com TAXA_INUNDACAO
+# datagramas de tiro por segundo, 2500 vezes o limite por par. Sem pausa, a
+# thread do inundador disputa a única CPU com a vítima e o kernel descarta
+# datagramas de todos no buffer do socket, antes de qualquer limite do jogo.
+SALA = "inundacao"
+DURACAO = 8.0
+TAXA_BOA = 10
+TAXA_INUNDACAO = 50000
+LOTE_INUNDACAO = 200
+QUADRO = 0.01
+LIMITE_ENTRADA = 10.0
+LIMITE_RESPOSTAS = 10.0
+# Com proteção, o p99 dos pares legítimos fica abaixo do primeiro timeout
+# mais o primeiro recuo: no máximo uma retransmissão (o datagrama original
+# pode se perder no buffer do socket inundado, antes de qualquer limite).
+_RTT = EstimadorRtt()
+LIMITE_P99 = _RTT.recuo(1) + _RTT.recuo(2)
+# Nesta taxa a vítima atende a fila mais rápido do que ela enche: a faixa
+# padrão (1024) não chega ao limite. O cenário só com a faixa usa uma menor,
+# para que ela de fato recuse tiros.
+LIMITE_FAIXA_PEQUENA = 64
+
+
+class NoLoopback(P2PNode):
+    def _get_meu_ip_local(self):
+        return "127.0.0.1"
+
+
+class NoMedido(MotorJogo):
+    # Loop próprio, acordado pela fila como o do headless; mede a latência de
+    # cada tiro nosso, do envio ao resultado processado no loop.
+    def __init__(self, limite_tiros=FilaEventos.LIMITE_TIROS):
+        self._acordar = threading.Event()
+        fila = FilaEventos(ao_inserir=self._acordar.set, limite_tiros=limite_tiros)
+        super().__init__(fila, NoLoopback(fila, sala=SALA), Grid())
+        self.verboso = False
+        self.grid.posicionar_navios_aleatorio()
+        self.estado_jogo = ESTADO_AGUARDANDO
+        self.enviados = {}
+        self.latencias = []
+        self.quadros = []
+        self._a_enviar = []
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while self.jogo_ativo:
+            self._acordar.wait(QUADRO)
+            self._acordar.clear()
+            inicio = time.perf_counter()
+            while self._a_enviar:
+                self.enviar_tiro(*self._a_enviar.pop())
+            self.processar_eventos_rede()
+            self.celulas_alteradas.clear()
+            self.quadros.append(time.perf_counter() - inicio)
+
+    def atirar(self, par, x, y):
+        # Chamado de fora: o tiro sai pela thread do loop.
+        self._a_enviar.append((par, x, y))
+        self._acordar.set()
+
+    def enviar_tiro(self, ip_alvo, x, y):
+        self.enviados[(ip_alvo, x, y)] = time.perf_counter()
+        super().enviar_tiro(ip_alvo, x, y)
+
+    def _registrar_resultado(self, ip_vitima, resultado, x, y):
+        enviado = self.enviados.pop((ip_vitima, x, y), None)
+        if enviado is not None:
+            self.latencias.append(time.perf_counter() - enviado)
+        super()._registrar_resultado(ip_vitima, resultado, x, y)
+
+
+def inundar(no, destino, taxa, parar, enviados):
+    # O socket UDP do próprio nó: os datagramas saem do endereço de um par
+    # legítimo da visão, como os de um cliente com defeito.
+    sock = no.p2p_node._sockets[0]
+    seq = 0
+    proximo = time.perf_counter()
+    while not parar.is_set():
+        for _ in range(LOTE_INUNDACAO):
+            seq = (seq + 1) & 0xFFFFFFFF
+            try:
+                sock.sendto(
+                    protocolo.codificar_tiro(seq, seq % 10, seq // 10 % 10), destino
+                )
+                enviados[0] += 1
+            except BlockingIOError:
+                pass
+            except OSError:
+                return
+        proximo += LOTE_INUNDACAO / taxa
+        time.sleep(max(0.0, proximo - time.perf_counter()))
+
+
+def percentis(latencias):
+    if not latencias:
+        return float("nan"), float("nan"), float("nan")
+    latencias = sorted(latencias)
+    return (
+        latencias[len(latencias) // 2],
+        latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))],
+        latencias[-1],
+    )
+
+
+# Proteções da vítima em cada cenário: (limite da faixa de tiros, taxa por par).
+CENARIOS = {
+    "sem limites": (sys.maxsize, False),
+    "só a faixa limitada": (LIMITE_FAIXA_PEQUENA, False),
+    "faixa e taxa por par": (FilaEventos.LIMITE_TIROS, True),
+}
+
+
+def cenario(limite_tiros, taxa_por_par, duracao, taxa):
+    vitima = NoMedido(limite_tiros)
+    if not taxa_por_par:
+        vitima.p2p_node.TAXA_TIROS = None
+    bom = NoMedido()
+    inundador = NoMedido()
+    motores = (vitima, bom, inundador)
+
+    for motor in motores:
+        motor.p2p_node.start()
+        motor._thread.start()
+    for motor in motores:
+        motor.p2p_node.anunciar()
+    inicio = time.perf_counter()
+    while not all(len(motor.grids_oponentes) == 2 for motor in motores):
+        if time.perf_counter() - inicio > LIMITE_ENTRADA:
+            raise RuntimeError("os três nós não se enxergaram")
+        time.sleep(QUADRO)
+    for motor in motores:
+        motor.quadros.clear()
+
+    parar = threading.Event()
+    enviados = [0]
+    thread = threading.Thread(
+        target=inundar,
+        args=(inundador, vitima.p2p_node.endereco, taxa, parar, enviados),
+        daemon=True,
+    )
+    thread.start()
+    # Cada célula uma vez só: o resultado identifica o tiro.
+    celulas = [(x, y) for y in range(10) for x in range(10)]
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < duracao and celulas:
+        x, y = celulas.pop()
+        bom.atirar(vitima.eu, x, y)
+        vitima.atirar(bom.eu, x, y)
+        time.sleep(1 / TAXA_BOA)
+    parar.set()
+    thread.join()
+    inundacao = time.perf_counter() - inicio
+
+    limite = time.perf_counter() + LIMITE_RESPOSTAS
+    while (bom.enviados or vitima.enviados) and time.perf_counter() < limite:
+        time.sleep(QUADRO)
+    fila = vitima.callback_queue
+    resultado = {
+        "datagramas": enviados[0] / inundacao,
+        "bom": percentis(bom.latencias),
+        "vitima": percentis(vitima.latencias),
+        "sem_resposta": len(bom.enviados) + len(vitima.enviados),
+        "fila_max": fila.profundidade_maxima,
+        "quadro_max": max(vitima.quadros),
+        "limitados": vitima.metricas.contadores["tiros_limitados"],
+        "sem_vaga": vitima.metricas.contadores["tiros_sem_vaga"],
+        "descartados": fila.descartados,
+    }
+    for motor in motores:
+        motor.jogo_ativo = False
+        motor._thread.join()
+    paradas = [threading.Thread(target=motor.p2p_node.stop) for motor in motores]
+    for parada in paradas:
+        parada.start()
+    for parada in paradas:
+        parada.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inundação de tiros de um par.")
+    parser.add_argument("--duracao", type=float, default=DURACAO)
+    parser.add_argument("--taxa", type=float, default=TAXA_INUNDACAO)
+    args = parser.parse_args()
+
+    falhas = []
+    for rotulo, (limite_tiros, taxa_por_par) in CENARIOS.items():
+        # Cada nó imprime ao posicionar, iniciar e encerrar: silenciados.
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = cenario(limite_tiros, taxa_por_par, args.duracao, args.taxa)
+        print(
+            f"[BENCH] {rotulo}: inundação de {r['datagramas']:,.0f} tiros/s, "
+            f"fila da vítima até {r['fila_max']:,} eventos, quadro máx "
+            f"{r['quadro_max'] * 1e3:.0f} ms"
+        )
+        for nome in ("bom", "vitima"):
+            p50, p99, maximo = r[nome]
+            quem = "par bem-comportado" if nome == "bom" else "resultados da vítima"
+            print(
+                f"[BENCH]   {quem}: p50 {p50 * 1e3:.1f} ms, p99 {p99 * 1e3:.1f} ms, "
+                f"máx {maximo * 1e3:.1f} ms"
+            )
+        print(
+            f"[BENCH]   {r['limitados']:,} tiros acima da taxa, {r['sem_vaga']:,} "
+            f"sem vaga na fila, {r['descartados']:,} descartados pela fila, "
+            f"{r['sem_resposta']} tiro(s) legítimo(s) sem resposta"
+        )
+        if taxa_por_par:
+            if r["sem_resposta"]:
+                falhas.append("tiros legítimos sem resposta")
+            if r["bom"][1] > LIMITE_P99 or r["vitima"][1] > LIMITE_P99:
+                falhas.append("latência dos pares legítimos passou do limite")
+        if limite_tiros != sys.maxsize and r["fila_max"] > limite_tiros + 64:
+            falhas.append(f"{rotulo}: fila da vítima passou do limite")
+    for falha in falhas:
+        print(f"[BENCH] FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protocolo  # noqa: E402
+from fila_eventos import FilaEventos  # noqa: E402
+from grid import Grid, configurar_partida  # noqa: E402
+from metricas import Metricas, MetricasDesligadas, ServidorMetricas  # noqa: E402
+from motor import MotorJogo  # noqa: E402
+from p2p_node import P2PNode  # noqa: E402
+from simulacao import Simulacao  # noqa: E402
+
+OPERACOES = 200000
+TIROS = 10000
+JANELA = 32
+ORIGEM = "127.0.0.2"
+PARTIDAS = 10
+REPETICOES = 5
+LIMITE_SOBRECUSTO = 0.05
+
+
+def custo_operacoes():
+    metricas = Metricas(protocolo.NOMES_TIPO)
+    custos = {}
+    operacoes = {
+        "contar": lambda: metricas.contar("retransmissoes"),
+        "contar_mensagem": lambda: metricas.contar_mensagem(
+            "entrada", protocolo.TIPO_TIRO, 10
+        ),
+        "observar": lambda: metricas.observar("rtt_tiro_s", 0.0012, "10.0.0.1"),
+    }
+    for nome, operacao in operacoes.items():
+        inicio = time.perf_counter()
+        for _ in range(OPERACOES):
+            operacao()
+        custos[nome] = (time.perf_counter() - inicio) / OPERACOES
+    vazio = lambda: None  # noqa: E731
+    inicio = time.perf_counter()
+    for _ in range(OPERACOES):
+        vazio()
+    vazio = (time.perf_counter() - inicio) / OPERACOES
+    return {nome: custo - vazio for nome, custo in custos.items()}
+
+
+def _atirador():
+    # Par mínimo em outro endereço de loopback: UDP para atirar e, na mesma
+    # porta, um TCP que só descarta os resultados recebidos.
+    escuta = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    escuta.bind((ORIGEM, 0))
+    escuta.listen()
+    atirador = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    atirador.bind(escuta.getsockname())
+
+    def descartar():
+        while True:
+            try:
+                conexao, _ = escuta.accept()
+            except OSError:
+                return
+            with conexao:
+                while conexao.recv(65536):
+                    pass
+
+    threading.Thread(target=descartar, daemon=True).start()
+    return atirador, escuta
+
+
+def medir_no_real(metricas):
+    # Um P2PNode de verdade recebe tiros por UDP de outro endereço de loopback
+    # e responde por TCP.
+    acordar = threading.Event()
+    fila = FilaEventos(ao_inserir=acordar.set)
+    tamanho, frota = configurar_partida(1000)
+    grid = Grid(tamanho, frota)
+    grid.posicionar_navios_aleatorio(random.Random(0))
+    no = P2PNode(fila, metricas)
+    # O atirador não retransmite e passa da taxa por par: sem limite.
+    no.TAXA_TIROS = None
+    motor = MotorJogo(fila, no, grid)
+    motor.verboso = False
+    alvos = random.Random(1).sample(range(tamanho * tamanho), TIROS)
+
+    def processados():
+        return len(grid.acertos) + len(grid.erros)
+
+    def consumir():
+        while motor.jogo_ativo:
+            acordar.wait(0.1)
+            acordar.clear()
+            motor.processar_eventos_rede()
+            motor.celulas_alteradas.clear()
+
+    no.start()
+    consumidor = threading.Thread(target=consumir, daemon=True)
+    consumidor.start()
+    atirador, escuta = _atirador()
+    destino = ("127.0.0.1", no.porta)
+    try:
+        # Tiros só são aceitos de pares conhecidos: primeiro o anúncio.
+        atirador.sendto(
+            protocolo.codificar_conectando(1, 1, 0, *no.config_jogo), destino
+        )
+        while len(no.get_participantes()) < 1:
+            time.sleep(0.001)
+        inicio = time.perf_counter()
+        for seq, idx in enumerate(alvos):
+            while seq - processados() >= JANELA:
+                time.sleep(0)
+            atirador.sendto(
+                protocolo.codificar_tiro(seq, idx % tamanho, idx // tamanho), destino
+            )
+        limite = time.monotonic() + 5.0
+        while processados() < TIROS:
+            if time.monotonic() > limite:
+                raise RuntimeError("tiros perdidos no loopback")
+            time.sleep(0.001)
+        return (time.perf_counter() - inicio) / TIROS
+    finally:
+        motor.jogo_ativo = False
+        consumidor.join()
+        atirador.close()
+        escuta.close()
+        no.stop()
+
+
+def medir_simulacao(metricas):
+    simulacao = Simulacao(6, "aleatoria", semente=1, metricas=metricas.ativa)
+    return 1 / simulacao.executar(PARTIDAS)["tiros_por_s"]
+
+
+def sobrecusto(medir):
+    # Execuções intercaladas para que o ruído da máquina afete as duas igualmente.
+    custos = {False: [], True: []}
+    for _ in range(REPETICOES):
+        custos[False].append(medir(MetricasDesligadas()))
+        custos[True].append(medir(Metricas(protocolo.NOMES_TIPO)))
+    desligadas, ligadas = min(custos[False]), min(custos[True])
+    return desligadas, ligadas, ligadas / desligadas - 1
+
+
+def consultar_endpoint():
+    metricas = Metricas(protocolo.NOMES_TIPO)
+    metricas.contar_mensagem("saida", protocolo.TIPO_TIRO, 10)
+    metricas.observar("rtt_tiro_s", 0.002, "10.0.0.1")
+    servidor = ServidorMetricas(metricas)
+    porta = servidor.iniciar()
+    try:
+        url = f"http://127.0.0.1:{porta}/metricas"
+        inicio = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=2) as resposta:
+            dados = json.load(resposta)
+        return time.perf_counter() - inicio, dados
+    finally:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    for nome, custo in custo_operacoes().items():
+        print(f"[BENCH] {nome}: {custo * 1e9:.0f} ns por chamada")
+
+    desligadas, ligadas, real = sobrecusto(medir_no_real)
+    print(
+        f"[BENCH] nó real ({TIROS:,} tiros UDP->motor->TCP no loopback): "
+        f"{desligadas * 1e6:.1f} µs/tiro sem métricas, {ligadas * 1e6:.1f} com "
+        f"({real:+.1%}, limite {LIMITE_SOBRECUSTO:.0%})"
+    )
+
+    # Transporte em memória: sem custo de E/S, é o limite superior do sobrecusto.
+    desligadas, ligadas, simulado = sobrecusto(medir_simulacao)
+    print(
+        f"[BENCH] simulação em memória (6 jogadores): {desligadas * 1e6:.1f} µs/tiro "
+        f"sem métricas, {ligadas * 1e6:.1f} com ({simulado:+.1%}, sem E/S)"
+    )
+
+    duracao, dados = consultar_endpoint()
+    print(
+        f"[BENCH] endpoint HTTP respondeu em {duracao * 1e3:.1f} ms "
+        f"({len(dados['mensagens']['saida'])} tipo(s) de saída)"
+    )
+    sys.exit(0 if real <= LIMITE_SOBRECUSTO else 1)
@@ -0,0 +1,39 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid_bitboard import GridBitboard  # noqa: E402
+from mira import MapaCalor  # noqa: E402
+from posicionamento import indice_posicionamento  # noqa: E402
+
+
+def jogar(partidas=500, semente=0):
+    rng = random.Random(semente)
+    indice = indice_posicionamento(GridBitboard.GRID_SIZE)
+    tiros = 0
+    decisoes = 0.0
+    for _ in range(partidas):
+        grid = GridBitboard()
+        for navio in indice.sortear_frota(grid.SHIP_CONFIG, rng):
+            grid._posicionar_navio(*navio)
+        mapa = MapaCalor()
+        resultado = None
+        while resultado != "game_over":
+            inicio = time.perf_counter()
+            _, x, y = mapa.melhor_celula()
+            decisoes += time.perf_counter() - inicio
+            resultado = grid.processar_tiro(x, y)
+            inicio = time.perf_counter()
+            mapa.registrar_resultado(resultado, x, y)
+            decisoes += time.perf_counter() - inicio
+            tiros += 1
+    return tiros / partidas, decisoes / tiros
+
+
+if __name__ == "__main__":
+    media, decisao = jogar()
+    print(f"[BENCH] Mira por densidade: {media:.1f} tiros/partida")
+    print(f"[BENCH] Decisão + atualização do mapa: {decisao * 1e6:.1f} us/tiro")
@@ -0,0 +1,52 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import Grid, GridOponente, configurar_partida  # noqa: E402
+
+TIROS = 100000
+
+
+def medir(tamanho, semente=0):
+    rng = random.Random(semente)
+    tamanho, frota = configurar_partida(tamanho)
+    # Aquece o índice de posições (compartilhado entre tabuleiros do mesmo tamanho).
+    Grid(tamanho, frota).posicionar_navios_aleatorio(rng)
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    grid = Grid(tamanho, frota)
+    grid.posicionar_navios_aleatorio(rng)
+    posicionamento = time.perf_counter() - inicio
+    memoria_grid = tracemalloc.get_traced_memory()[0]
+
+    oponente = GridOponente(tamanho)
+    alvos = [(rng.randrange(tamanho), rng.randrange(tamanho)) for _ in range(TIROS)]
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    for x, y in alvos:
+        resultado = grid.processar_tiro(x, y)
+        oponente.marcar(x, y, Grid.SIMBOLO_ATINGIDO if resultado == "hit" else "O")
+    tiros = time.perf_counter() - inicio
+    memoria_tiros = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    # Lista de listas de referências (8 bytes cada) + cabeçalho de cada linha.
+    denso = tamanho * (tamanho * 8 + 56)
+    return len(frota), posicionamento, memoria_grid, tiros, memoria_tiros, denso
+
+
+if __name__ == "__main__":
+    for tamanho in (10, 100, 1000):
+        navios, pos, mem, tiros, mem_tiros, denso = medir(tamanho)
+        print(
+            f"[BENCH] {tamanho}x{tamanho}, {navios} navios: posicionamento "
+            f"{pos * 1e3:.1f} ms, grid {mem / 1024:,.0f} KiB "
+            f"(denso seria {denso / 1024:,.0f} KiB por tabuleiro), "
+            f"{TIROS / tiros:,.0f} tiros/s, "
+            f"{mem_tiros / 1024:,.0f} KiB após {TIROS:,} tiros (grid + visão)"
+        )
@@ -0,0 +1,127 @@
+import argparse
+import contextlib
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from grid import GridOponente, configurar_partida  # noqa: E402
+from mira import Mira  # noqa: E402
+from protocolo import Par  # noqa: E402
+
+CONTAGENS = (10, 200, 1000)
+TAMANHOS = (10, 1000)
+# Numa sala grande só uma fração dos oponentes chega a levar tiros nossos.
+FRACAO_ALVEJADA = 0.1
+TIROS_POR_ALVO = 5
+QUADROS = 300
+RESULTADOS_POR_QUADRO = 10
+# O quadro com 1000 oponentes pode custar no máximo isso vezes o de 10.
+LIMITE_CRESCIMENTO = 3.0
+
+
+def pares(quantidade):
+    return [Par("10.0.0.2", 5001 + i, i + 1) for i in range(quantidade)]
+
+
+def memoria(tamanho, quantidade, rng):
+    # Tabuleiros de oponente e mapas da mira, medidos juntos.
+    tamanho, frota = configurar_partida(tamanho)
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    oponentes = {}
+    mira = Mira(tamanho, frota, rng)
+    for par in pares(quantidade):
+        oponentes[par] = GridOponente(tamanho)
+        mira.adicionar_oponente(par)
+    for par in rng.sample(list(oponentes), int(quantidade * FRACAO_ALVEJADA)):
+        for _ in range(TIROS_POR_ALVO):
+            x, y = rng.randrange(tamanho), rng.randrange(tamanho)
+            oponentes[par].marcar(x, y, "O")
+            mira.registrar_resultado(par, "miss", x, y)
+    mira.escolher()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (depois - antes) / quantidade
+
+
+def quadros(quantidade, args, rng):
+    # Importado só aqui: a medida de memória não precisa de pygame.
+    from jogo import BatalhaNavalPygame
+    from motor import ESTADO_ESCOLHENDO_ALVO
+
+    jogo = BatalhaNavalPygame(10)
+    jogo.verboso = False
+    jogo.grid.posicionar_navios_aleatorio(rng)
+    jogo.callback_queue.put(("lista_participantes", pares(quantidade)))
+    jogo.processar_eventos_rede()
+    jogo.estado_jogo = ESTADO_ESCOLHENDO_ALVO
+    oponentes = list(jogo.grids_oponentes)
+    tempos = []
+    for quadro in range(args.quadros):
+        # Resultados chegam para qualquer oponente, visível ou não; de tempos
+        # em tempos o jogador troca de página.
+        for _ in range(RESULTADOS_POR_QUADRO):
+            resultado = "hit" if rng.random() < 0.2 else "miss"
+            jogo.callback_queue.put(
+                (
+                    "resultado_tiro",
+                    rng.choice(oponentes),
+                    resultado,
+                    rng.randrange(10),
+                    rng.randrange(10),
+                )
+            )
+        jogo.processar_eventos_rede()
+        if quadro % 50 == 49:
+            jogo.lista_oponentes.rolar(jogo, 1)
+        inicio = time.perf_counter()
+        jogo.draw_ui()
+        tempos.append(time.perf_counter() - inicio)
+    jogo.p2p_node.stop()
+    tempos.sort()
+    return sum(tempos) / len(tempos), tempos[int(len(tempos) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muitos oponentes: memória e UI.")
+    parser.add_argument("--quadros", type=int, default=QUADROS)
+    args = parser.parse_args()
+
+    falhas = []
+    for tamanho in TAMANHOS:
+        for quantidade in CONTAGENS:
+            por_oponente = memoria(tamanho, quantidade, random.Random(0))
+            print(
+                f"[BENCH] {tamanho}x{tamanho}, {quantidade} oponentes "
+                f"({FRACAO_ALVEJADA:.0%} alvejados): "
+                f"{por_oponente / 1024:.2f} KiB por oponente"
+            )
+
+    medias = {}
+    for quantidade in CONTAGENS:
+        # Cada jogo imprime ao posicionar e ao encerrar: silenciados.
+        with contextlib.redirect_stdout(io.StringIO()):
+            media, p99 = quadros(quantidade, args, random.Random(1))
+        medias[quantidade] = media
+        print(
+            f"[BENCH] draw_ui com {quantidade} oponentes: média {media * 1e3:.2f} ms, "
+            f"p99 {p99 * 1e3:.2f} ms"
+        )
+    if medias[CONTAGENS[-1]] > medias[CONTAGENS[0]] * LIMITE_CRESCIMENTO:
+        falhas.append("o quadro cresce com o número de oponentes")
+    for falha in falhas:
+        print(f"[BENCH] FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
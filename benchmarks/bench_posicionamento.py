@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import Grid  # noqa: E402
+from posicionamento import indice_posicionamento  # noqa: E402
+
+
+def medir_frotas(quantidade=20000, semente=0):
+    indice = indice_posicionamento(Grid.GRID_SIZE)
+    inicio = time.perf_counter()
+    for _ in indice.gerar_frotas(quantidade, Grid.SHIP_CONFIG, semente):
+        pass
+    return quantidade / (time.perf_counter() - inicio)
+
+
+def verificar_reprodutibilidade(quantidade=100, semente=42):
+    indice = indice_posicionamento(Grid.GRID_SIZE)
+    a = list(indice.gerar_frotas(quantidade, Grid.SHIP_CONFIG, semente))
+    b = list(indice.gerar_frotas(quantidade, Grid.SHIP_CONFIG, semente))
+    if a != b:
+        raise AssertionError("gerar_frotas não é reprodutível para a mesma semente")
+
+
+if __name__ == "__main__":
+    verificar_reprodutibilidade()
+    print(f"[BENCH] gerar_frotas: {medir_frotas():,.0f} frotas/s")
@@ -0,0 +1,111 @@
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import Grid, GridOponente, configurar_partida  # noqa: E402
+from motor import ESTADO_AGUARDANDO, MotorJogo  # noqa: E402
+from protocolo import Par  # noqa: E402
+
+TAMANHOS = (100, 1000, 2000)
+FRACAO_ATINGIDA = 0.25
+OPONENTES = 4
+FRACAO_OPONENTE = 0.05
+REPETICOES = 3
+
+
+def preparar(tamanho):
+    # Nó no meio de uma partida longa: um quarto do tabuleiro já recebeu tiros
+    # e cada oponente tem uma fração marcada.
+    rng = random.Random(0)
+    tamanho, frota = configurar_partida(tamanho)
+    motor = MotorJogo(grid=Grid(tamanho, frota))
+    motor.verboso = False
+    motor.grid.posicionar_navios_aleatorio(rng)
+    motor.estado_jogo = ESTADO_AGUARDANDO
+    celulas = tamanho * tamanho
+    for idx in rng.sample(range(celulas), int(celulas * FRACAO_ATINGIDA)):
+        motor.grid.processar_tiro(idx % tamanho, idx // tamanho)
+    for i in range(OPONENTES):
+        par = Par(f"10.0.0.{i + 2}", 5001, i + 2)
+        oponente = motor.grids_oponentes[par] = GridOponente(tamanho)
+        for idx in rng.sample(range(celulas), int(celulas * FRACAO_OPONENTE)):
+            simbolo = Grid.SIMBOLO_ERRO if rng.random() < 0.9 else "X"
+            oponente.marcar(idx % tamanho, idx // tamanho, simbolo)
+        motor.p2p_node.visao.atualizar(par, 1, 0)
+    return motor
+
+
+def medir(tamanho, diretorio):
+    motor = preparar(tamanho)
+    caminho = os.path.join(diretorio, f"{tamanho}.snapshot")
+    capturas, gravacoes, incrementais, restauracoes = [], [], [], []
+    for _ in range(REPETICOES):
+        motor.iniciar_snapshots(caminho)
+        snapshots = motor.snapshots
+        gc.collect()
+        inicio = time.perf_counter()
+        snapshots.capturar(motor)
+        capturas.append(time.perf_counter() - inicio)
+        motor.fechar_snapshots()
+        gravacoes.append(snapshots.ultima_gravacao_s)
+
+        # Captura seguinte com poucas mudanças: só as seções alteradas são
+        # copiadas e recomprimidas.
+        motor.iniciar_snapshots(caminho)
+        motor.snapshots.capturar(motor)
+        n = motor.grid.GRID_SIZE
+        motor.grids_oponentes[Par("10.0.0.2", 5001, 2)].marcar(
+            n - 1, n - 1, Grid.SIMBOLO_ERRO
+        )
+        gc.collect()
+        inicio = time.perf_counter()
+        motor.snapshots.capturar(motor)
+        incrementais.append(time.perf_counter() - inicio)
+        motor.fechar_snapshots()
+
+        restaurado = MotorJogo(grid=Grid(motor.grid.GRID_SIZE, motor.grid.SHIP_CONFIG))
+        restaurado.verboso = False
+        gc.collect()
+        inicio = time.perf_counter()
+        restaurado.restaurar_estado(caminho)
+        restauracoes.append(time.perf_counter() - inicio)
+    if (
+        restaurado.grid.acertos != motor.grid.acertos
+        or restaurado.grid.erros != motor.grid.erros
+        or restaurado.grid.meus_navios_saude != motor.grid.meus_navios_saude
+    ):
+        raise RuntimeError("restauração divergiu do estado salvo")
+    marcadas = len(motor.grid.acertos) + len(motor.grid.erros)
+    marcadas += sum(
+        len(o.acertos) + len(o.erros) for o in motor.grids_oponentes.values()
+    )
+    return (
+        motor.grid.GRID_SIZE,
+        marcadas,
+        os.path.getsize(caminho),
+        min(capturas),
+        min(incrementais),
+        min(gravacoes),
+        min(restauracoes),
+    )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in TAMANHOS:
+            n, marcadas, bytes_, captura, incremental, gravacao, restauracao = medir(
+                tamanho, diretorio
+            )
+            print(
+                f"[BENCH] {n}x{n}: {marcadas:,} células marcadas, "
+                f"{bytes_ / 2**20:.2f} MiB ({bytes_ / marcadas:.2f} B/célula) | "
+                f"captura no loop {captura * 1e3:.1f} ms "
+                f"(incremental {incremental * 1e3:.2f} ms), "
+                f"escrita em segundo plano {gravacao * 1e3:.0f} ms, "
+                f"restauração {restauracao * 1e3:.0f} ms"
+            )
@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fila_eventos import FilaEventos  # noqa: E402
+from grid import Grid  # noqa: E402
+from motor import ESTADO_AGUARDANDO, MotorJogo  # noqa: E402
+from p2p_node import P2PNode  # noqa: E402
+
+# Centenas de nós de verdade (sockets, asyncio, uma thread cada) no mesmo IP:
+# cada um com id e porta efêmera própria, descobertos pelo grupo da sala.
+NOS = 500
+SALA = "carga"
+TIROS_POR_NO = 4
+# Entrada em lotes, como jogadores chegando: 500 anúncios no mesmo instante
+# estouram o buffer de recepção de quem escuta o grupo.
+LOTE_ENTRADA = 25
+INTERVALO_ENTRADA = 0.5
+LIMITE_CONVERGENCIA = 300.0
+LIMITE_TIROS = 30.0
+
+
+class NoLoopback(P2PNode):
+    # As duas pontas de cada conexão ficam neste processo: ociosas fecham cedo
+    # para caber no limite de descritores.
+    TCP_OCIOSO = 5.0
+
+    def _get_meu_ip_local(self):
+        return "127.0.0.1"
+
+
+def criar_motor(rng):
+    fila = FilaEventos()
+    motor = MotorJogo(fila, NoLoopback(fila, sala=SALA), Grid())
+    motor.verboso = False
+    motor.grid.posicionar_navios_aleatorio(rng)
+    motor.estado_jogo = ESTADO_AGUARDANDO
+    return motor
+
+
+def processar(motores):
+    for motor in motores:
+        motor.processar_eventos_rede()
+        motor.celulas_alteradas.clear()
+
+
+def esperar(motores, condicao, limite):
+    inicio = time.perf_counter()
+    while not condicao():
+        if time.perf_counter() - inicio > limite:
+            return None
+        processar(motores)
+        time.sleep(0.05)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nós reais no mesmo IP.")
+    parser.add_argument("--nos", type=int, default=NOS)
+    parser.add_argument("--tiros", type=int, default=TIROS_POR_NO)
+    args = parser.parse_args()
+
+    # ~6 descritores por nó (UDP, TCP, descoberta, loop) mais duas pontas por
+    # conexão aberta.
+    suave, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if suave < rigido:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (rigido, rigido))
+
+    rng = random.Random(0)
+    # Cada nó imprime ao posicionar, iniciar e encerrar: silenciados.
+    silencio = contextlib.redirect_stdout(io.StringIO())
+    with silencio:
+        motores = [criar_motor(rng) for _ in range(args.nos)]
+    pares = {motor.eu for motor in motores}
+    portas = {par.porta for par in pares}
+    print(
+        f"[CARGA] {args.nos} nós em 127.0.0.1: {len(portas)} portas e "
+        f"{len({par.id for par in pares})} ids distintos"
+    )
+    falhas = []
+    if len(portas) != args.nos:
+        falhas.append("portas repetidas")
+    try:
+        inicio = time.perf_counter()
+        with silencio:
+            for motor in motores:
+                motor.p2p_node.start()
+        print(f"[CARGA] nós iniciados em {time.perf_counter() - inicio:.1f} s")
+        for i in range(0, args.nos, LOTE_ENTRADA):
+            for motor in motores[i : i + LOTE_ENTRADA]:
+                motor.p2p_node.anunciar()
+            processar(motores)
+            time.sleep(INTERVALO_ENTRADA)
+
+        def convergiu():
+            return all(len(motor.grids_oponentes) == args.nos - 1 for motor in motores)
+
+        convergencia = esperar(motores, convergiu, LIMITE_CONVERGENCIA)
+        vistos = sum(len(motor.grids_oponentes) for motor in motores) / args.nos
+        if convergencia is None:
+            falhas.append(f"sem convergência: {vistos:.1f} oponentes por nó")
+        else:
+            print(
+                f"[CARGA] todos veem os {args.nos - 1} outros em {convergencia:.1f} s"
+            )
+
+        enviados = 0
+        for motor in motores:
+            oponentes = list(motor.grids_oponentes)
+            if not oponentes:
+                continue
+            for par in rng.sample(oponentes, min(args.tiros, len(oponentes))):
+                motor.enviar_tiro(par, rng.randrange(10), rng.randrange(10))
+                enviados += 1
+
+        def respondidos():
+            return sum(
+                oponente.marcacoes
+                for motor in motores
+                for oponente in motor.grids_oponentes.values()
+            )
+
+        duracao = esperar(motores, lambda: respondidos() >= enviados, LIMITE_TIROS)
+        if duracao is None:
+            falhas.append(
+                f"{enviados - respondidos()} de {enviados} tiros sem resposta"
+            )
+        else:
+            print(
+                f"[CARGA] {enviados} tiros entre pares distintos respondidos em "
+                f"{duracao:.2f} s ({enviados / duracao:,.0f} tiros/s)"
+            )
+
+        contadores = [motor.metricas.contadores for motor in motores]
+        print(
+            f"[CARGA] por nó: "
+            f"{sum(c['tcp_conexoes'] for c in contadores) / args.nos:.1f} conexões TCP, "
+            f"{sum(c['retransmissoes'] for c in contadores) / args.nos:.2f} "
+            f"retransmissões, "
+            f"{sum(c['remetente_desconhecido'] for c in contadores)} datagramas "
+            f"de remetente desconhecido no total"
+        )
+    finally:
+        # Em paralelo: em série, os últimos loops ainda estariam encerrando
+        # quando o processo sai.
+        paradas = [threading.Thread(target=motor.p2p_node.stop) for motor in motores]
+        with silencio:
+            for parada in paradas:
+                parada.start()
+            for parada in paradas:
+                parada.join()
+
+    for falha in falhas:
+        print(f"[CARGA] FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
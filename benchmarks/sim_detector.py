@@ -0,0 +1,84 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector_falhas import MORTO, SUSPEITO, DetectorFalhas  # noqa: E402
+from p2p_node import P2PNode  # noqa: E402
+
+PARES = 50
+DURACAO = 3600.0
+PASSO = 0.1
+JITTER = 0.1
+PERDA = 0.05
+# Cada par nos visita uma vez por volta do rodízio de gossip, numa posição
+# sorteada a cada volta: o batimento é de ~N/FANOUT rodadas, não de uma.
+PERIODO = P2PNode.PERIODO_GOSSIP * max(1.0, PARES / P2PNode.FANOUT_GOSSIP)
+
+
+class RelogioSimulado:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def simular(limiar_suspeita, limiar_morte, pausa_aceitavel, semente=0):
+    rng = random.Random(semente)
+    relogio = RelogioSimulado()
+    detector = DetectorFalhas(
+        relogio,
+        intervalo_esperado=PERIODO,
+        limiar_suspeita=limiar_suspeita,
+        limiar_morte=limiar_morte,
+        desvio_minimo=max(P2PNode.DESVIO_MINIMO, PERIODO / 2),
+        pausa_aceitavel=pausa_aceitavel,
+    )
+    proximo = {par: rng.uniform(0, PERIODO) for par in range(PARES)}
+    queda = {par: rng.uniform(DURACAO / 2, DURACAO) for par in range(PARES // 5)}
+
+    falsos = {SUSPEITO: 0, MORTO: 0}
+    latencia = {SUSPEITO: [], MORTO: []}
+    passos = int(DURACAO / PASSO)
+    for i in range(passos):
+        relogio.agora = i * PASSO
+        for par, instante in proximo.items():
+            if instante > relogio.agora or relogio.agora >= queda.get(par, DURACAO):
+                continue
+            if rng.random() >= PERDA:
+                detector.registrar(par)
+            volta = (instante // PERIODO + 1) * PERIODO
+            proximo[par] = volta + rng.uniform(0, PERIODO) + rng.gauss(0, JITTER)
+        for par, estado in detector.verificar():
+            if par in queda and relogio.agora >= queda[par]:
+                latencia[estado].append(relogio.agora - queda[par])
+            else:
+                falsos[estado] += 1
+
+    horas = DURACAO / 3600 * (PARES - len(queda))
+    return {
+        estado: (sum(v) / len(v) if v else float("nan"), falsos[estado] / horas)
+        for estado, v in latencia.items()
+    }
+
+
+if __name__ == "__main__":
+    print(
+        f"[BENCH] {PARES} pares, rodízio de {PERIODO:.1f}s ± {JITTER}s, "
+        f"{PERDA:.0%} de perda, {DURACAO / 3600:.0f}h simuladas"
+    )
+    configuracoes = [
+        (P2PNode.PHI_SUSPEITA, P2PNode.PHI_MORTE, P2PNode.PAUSA_ACEITAVEL),
+        (1.0, 3.0, 0.0),
+        (3.0, 8.0, 0.0),
+        (3.0, 8.0, 5.0),
+    ]
+    for suspeita, morte, pausa in configuracoes:
+        r = simular(suspeita, morte, pausa)
+        print(
+            f"[BENCH] phi {suspeita}/{morte}, pausa {pausa}s: "
+            f"suspeita em {r[SUSPEITO][0]:.2f}s ({r[SUSPEITO][1]:.2f} falsas/par·h), "
+            f"morte em {r[MORTO][0]:.2f}s ({r[MORTO][1]:.3f} falsas/par·h)"
+        )
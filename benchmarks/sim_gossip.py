@@ -0,0 +1,83 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulacao import RedeMemoria, TransporteMemoria  # noqa: E402
+
+TICKS_DE_ENTRADA = 10
+MAX_TICKS = 500
+
+# Protocolo v1: anúncio de 2 bytes; cada par respondia via TCP com a lista
+# completa (prefixo de 4 bytes + cabeçalho de 4 bytes + 4 bytes por IP).
+ANUNCIO_LEGADO = 2
+
+
+class _Descarte:
+    def put(self, evento):
+        pass
+
+
+class RedeContada(RedeMemoria):
+    # Um broadcast é um único pacote no fio, independente de quantos o recebem.
+    def entregar_broadcast(self, origem, dados):
+        self._contar(dados)
+        for destino in list(self.nos.values()):
+            destino._tratar_datagrama(dados, origem)
+
+
+def _custo_legado(nos):
+    mensagens = 0
+    total_bytes = 0
+    for k in range(1, nos + 1):
+        mensagens += 1 + (k - 1)
+        total_bytes += ANUNCIO_LEGADO
+        total_bytes += (k - 1) * (4 + 4 + 4 * k)
+    return mensagens, total_bytes
+
+
+def simular(nos, semente=0):
+    rng = random.Random(semente)
+    rede = RedeContada()
+    transportes = []
+    for i in range(nos):
+        ip = f"10.{i // 62500}.{i // 250 % 250}.{i % 250 + 1}"
+        no = TransporteMemoria(_Descarte(), rede, ip)
+        no._rng = random.Random(rng.random())
+        transportes.append(no)
+
+    pendentes = list(transportes)
+    ativos = []
+    inicio = time.perf_counter()
+    for tick in range(1, MAX_TICKS + 1):
+        for no in pendentes[: max(1, nos // TICKS_DE_ENTRADA)]:
+            no.start()
+            no.anunciar()
+            ativos.append(no)
+        del pendentes[: max(1, nos // TICKS_DE_ENTRADA)]
+
+        for no in ativos:
+            no.rodada_gossip()
+
+        if not pendentes:
+            digest = ativos[0].visao.digest
+            if all(len(no.visao) == nos and no.visao.digest == digest for no in ativos):
+                break
+    duracao = time.perf_counter() - inicio
+    return tick, rede.mensagens, rede.bytes, duracao
+
+
+if __name__ == "__main__":
+    print(f"[BENCH] Entradas escalonadas em {TICKS_DE_ENTRADA} ticks, 1 rodada/tick")
+    for nos in (10, 100, 1000):
+        ticks, mensagens, total_bytes, duracao = simular(nos)
+        msg_legado, bytes_legado = _custo_legado(nos)
+        print(
+            f"[BENCH] {nos:5d} nós: convergiu em {ticks} ticks ({duracao:.2f}s) | "
+            f"gossip {mensagens:,} msgs / {total_bytes:,} B "
+            f"({mensagens / nos:.1f} msgs, {total_bytes / nos:,.0f} B por nó) | "
+            f"legado {msg_legado:,} msgs / {bytes_legado:,} B "
+            f"({msg_legado / nos:.1f} msgs, {bytes_legado / nos:,.0f} B por nó)"
+        )
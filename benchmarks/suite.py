@@ -0,0 +1,305 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import protocolo  # noqa: E402
+from confiabilidade import Pendente  # noqa: E402
+from fila_eventos import FilaEventos  # noqa: E402
+from grid import Grid  # noqa: E402
+from grid_bitboard import GridBitboard  # noqa: E402
+from membros import VIVO  # noqa: E402
+from motor import MotorJogo  # noqa: E402
+from p2p_node import P2PNode  # noqa: E402
+from protocolo import Par  # noqa: E402
+
+REFERENCIA = os.path.join(RAIZ, "benchmarks", "referencia.json")
+LIMIAR = 0.15
+# Limiares iniciais por caso, gravados na primeira referência. Os caminhos do
+# nó alocam a cada mensagem e oscilam mais que os do tabuleiro.
+LIMIARES = {
+    "posicionar_navios_aleatorio": 0.25,
+    "processar_tiro_partida": 0.30,
+    "processar_tiro_partida_bitboard": 0.30,
+    "decodificar_membros": 0.30,
+    "tratar_datagrama_tiro": 0.40,
+    "tratar_mensagem_tcp_resultado": 0.40,
+    "processar_eventos_rede": 0.40,
+}
+REPETICOES = 5
+OPONENTE = Par("10.0.0.2", 5001, 2)
+MEMBROS = 1000
+EVENTOS = 10000
+
+
+# Cada caso prepara o estado fora da medição e devolve (executar, operações).
+
+
+def caso_posicionamento():
+    rng = random.Random(0)
+    grids = [Grid() for _ in range(500)]
+
+    def executar():
+        for grid in grids:
+            grid.posicionar_navios_aleatorio(rng)
+
+    return executar, len(grids)
+
+
+def caso_validar_posicao():
+    rng = random.Random(0)
+    grid = Grid()
+    grid.posicionar_navios_aleatorio(rng)
+    n = grid.GRID_SIZE
+    consultas = [
+        (rng.randrange(n), rng.randrange(n), rng.randint(2, 5), rng.choice("hv"))
+        for _ in range(50000)
+    ]
+    validar = grid._validar_posicao
+
+    def executar():
+        for x, y, tamanho, orientacao in consultas:
+            validar(x, y, tamanho, orientacao)
+
+    return executar, len(consultas)
+
+
+def _caso_partidas(classe):
+    # Partidas completas: tiros em ordem aleatória, cortados no tiro que afunda
+    # o último navio.
+    rng = random.Random(0)
+    partidas = []
+    for _ in range(200):
+        grid = classe()
+        grid.posicionar_navios_aleatorio(rng)
+        n = grid.GRID_SIZE
+        alvos = list(range(n * n))
+        rng.shuffle(alvos)
+        ordem = {idx: i for i, idx in enumerate(alvos)}
+        ultimo = max(ordem[idx] for idx in grid.navio_na_celula)
+        partidas.append((grid, [(idx % n, idx // n) for idx in alvos[: ultimo + 1]]))
+
+    def executar():
+        for grid, alvos in partidas:
+            processar = grid.processar_tiro
+            for x, y in alvos:
+                processar(x, y)
+
+    return executar, sum(len(alvos) for _, alvos in partidas)
+
+
+def caso_processar_tiro():
+    return _caso_partidas(Grid)
+
+
+def caso_processar_tiro_bitboard():
+    return _caso_partidas(GridBitboard)
+
+
+def _membros(quantidade):
+    return [
+        (Par(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 5001, i), i, 0)
+        for i in range(quantidade)
+    ]
+
+
+def caso_decodificar_membros():
+    mensagem = protocolo.codificar_visao(0, _membros(MEMBROS))
+    repeticoes = 200
+
+    def executar():
+        for _ in range(repeticoes):
+            protocolo.decodificar(mensagem)
+
+    return executar, repeticoes * MEMBROS
+
+
+def _no():
+    # Limites folgados: os casos medem o caminho de quem é aceito.
+    no = P2PNode(FilaEventos(limite_tiros=EVENTOS))
+    no.RAJADA_TIROS = EVENTOS
+    # Datagramas só são aceitos de pares da visão.
+    no._mesclar([(OPONENTE, 1, VIVO)])
+    return no
+
+
+def caso_tratar_datagrama_tiro():
+    no = _no()
+    rng = random.Random(0)
+    datagramas = [
+        protocolo.codificar_tiro(seq, rng.randrange(10), rng.randrange(10))
+        for seq in range(EVENTOS)
+    ]
+    tratar = no._tratar_datagrama
+
+    def executar():
+        for dados in datagramas:
+            tratar(dados, OPONENTE[:2])
+
+    return executar, len(datagramas)
+
+
+def caso_tratar_mensagem_tcp_resultado():
+    no = _no()
+    rng = random.Random(0)
+    mensagens = []
+    for seq in range(EVENTOS):
+        x, y = rng.randrange(10), rng.randrange(10)
+        dados = protocolo.codificar_tiro(seq, x, y)
+        no._pendentes[(OPONENTE, seq)] = Pendente(OPONENTE, seq, dados, ((x, y),), 0)
+        mensagens.append(protocolo.codificar_resultado(seq, "miss", x, y))
+    tratar = no._tratar_mensagem_tcp
+
+    def executar():
+        for dados in mensagens:
+            tratar(dados, 0, len(dados), OPONENTE)
+
+    return executar, len(mensagens)
+
+
+def caso_processar_eventos_rede():
+    rng = random.Random(0)
+    motor = MotorJogo(FilaEventos(limite_tiros=EVENTOS), grid=Grid())
+    motor.verboso = False
+    motor.grid.posicionar_navios_aleatorio(rng)
+    motor.callback_queue.put(("novo_participante", OPONENTE))
+    motor.processar_eventos_rede()
+    n = motor.grid.GRID_SIZE
+    for i in range(EVENTOS):
+        x, y = rng.randrange(n), rng.randrange(n)
+        if i % 2:
+            motor.callback_queue.put(("tiro_recebido", OPONENTE, x, y))
+        else:
+            motor.callback_queue.put(("resultado_tiro", OPONENTE, "miss", x, y))
+
+    return motor.processar_eventos_rede, EVENTOS
+
+
+CASOS = {
+    "posicionar_navios_aleatorio": caso_posicionamento,
+    "validar_posicao": caso_validar_posicao,
+    "processar_tiro_partida": caso_processar_tiro,
+    "processar_tiro_partida_bitboard": caso_processar_tiro_bitboard,
+    "decodificar_membros": caso_decodificar_membros,
+    "tratar_datagrama_tiro": caso_tratar_datagrama_tiro,
+    "tratar_mensagem_tcp_resultado": caso_tratar_mensagem_tcp_resultado,
+    "processar_eventos_rede": caso_processar_eventos_rede,
+}
+
+
+def medir(preparar, repeticoes=REPETICOES):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        with contextlib.redirect_stdout(io.StringIO()):
+            executar, operacoes = preparar()
+            gc.collect()
+            inicio = time.perf_counter()
+            executar()
+            duracao = time.perf_counter() - inicio
+        melhor = min(melhor, duracao / operacoes)
+    return melhor * 1e9
+
+
+def comparar(resultados, referencia, limiar):
+    regressoes = []
+    casos = referencia.get("casos", {})
+    limiares = referencia.get("limiares", {})
+    for nome, atual in resultados.items():
+        base = casos.get(nome)
+        if base is None:
+            print(f"[BENCH] {nome:32} {atual:10.1f} ns/op  (sem referência)")
+            continue
+        variacao = atual / base - 1
+        permitido = limiares.get(nome, limiar)
+        marca = ""
+        if variacao > permitido:
+            marca = f"  REGRESSÃO (limite {permitido:+.0%})"
+            regressoes.append(nome)
+        print(
+            f"[BENCH] {nome:32} {atual:10.1f} ns/op  "
+            f"ref {base:10.1f}  {variacao:+7.1%}{marca}"
+        )
+    return regressoes
+
+
+def carregar(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def salvar(caminho, resultados, anterior):
+    dados = {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "unidade": "ns/op",
+        "casos": resultados,
+    }
+    # Limiares por caso são configuração, não medição: preservados.
+    dados["limiares"] = anterior.get("limiares") or LIMIARES
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, indent=2, sort_keys=True)
+        arquivo.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmarks com referência em JSON e limiar de regressão."
+    )
+    parser.add_argument("casos", nargs="*", help=f"subconjunto de {sorted(CASOS)}")
+    parser.add_argument("--referencia", default=REFERENCIA)
+    parser.add_argument(
+        "--limiar",
+        type=float,
+        default=LIMIAR,
+        help="piora relativa tolerada (0.15 = 15%%)",
+    )
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument(
+        "--salvar", action="store_true", help="grava os resultados como referência"
+    )
+    args = parser.parse_args()
+
+    desconhecidos = set(args.casos) - set(CASOS)
+    if desconhecidos:
+        parser.error(f"casos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    nomes = args.casos or list(CASOS)
+
+    resultados = {nome: medir(CASOS[nome], args.repeticoes) for nome in nomes}
+    referencia = carregar(args.referencia)
+    if not referencia.get("casos") and not args.salvar:
+        # Sem referência nada é comparado: sair com 0 esconderia regressões.
+        print(
+            f"[BENCH] Sem referência em {args.referencia}: portão de regressão "
+            "inativo. Grave uma com --salvar.",
+            file=sys.stderr,
+        )
+        return 2
+    regressoes = comparar(resultados, referencia, args.limiar)
+
+    if args.salvar:
+        # Casos não medidos nesta execução mantêm a referência anterior.
+        salvar(
+            args.referencia, {**referencia.get("casos", {}), **resultados}, referencia
+        )
+        print(f"[BENCH] Referência gravada em {args.referencia}")
+        return 0
+    if regressoes:
+        print(f"[BENCH] {len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
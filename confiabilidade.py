@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+
+class EstimadorRtt:
+    # Jacobson/Karels (RFC 6298) com limites ajustados para rede local.
+    ALFA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, rto_inicial=0.3, rto_minimo=0.1, rto_maximo=2.0):
+        self.rto_minimo = rto_minimo
+        self.rto_maximo = rto_maximo
+        self.srtt = None
+        self.rttvar = None
+        self.rto = rto_inicial
+
+    def amostrar(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALFA * (rtt - self.srtt)
+        self.rto = min(
+            self.rto_maximo, max(self.rto_minimo, self.srtt + 4 * self.rttvar)
+        )
+
+    def recuo(self, tentativas):
+        return min(self.rto_maximo, self.rto * 2 ** (tentativas - 1))
+
+
+class Pendente:
+    def __init__(self, par, seq, dados, coords, enviado):
+        self.par = par
+        self.seq = seq
+        self.dados = dados
+        self.coords = coords
+        self.enviado = enviado
+        self.tentativas = 1
+        self.temporizador = None
+
+
+class JanelaDuplicatas:
+    AGUARDANDO = object()
+
+    def __init__(self, tamanho=64):
+        self.tamanho = tamanho
+        self.respostas = OrderedDict()
+
+    def receber(self, seq):
+        if seq in self.respostas:
+            return False, self.respostas[seq]
+        self.respostas[seq] = self.AGUARDANDO
+        if len(self.respostas) > self.tamanho:
+            self.respostas.popitem(last=False)
+        return True, None
+
+    def responder(self, seq, dados):
+        if seq in self.respostas:
+            self.respostas[seq] = dados
+
+
+class BaldeFichas:
+    # Token bucket: `taxa` fichas por segundo, acumulando até `capacidade`.
+    # Um lote maior que o saldo passa se houver ao menos uma ficha e deixa o
+    # balde negativo; a média continua sendo `taxa`.
+    def __init__(self, taxa, capacidade, agora):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self.atualizado = agora
+
+    def retirar(self, quantidade, agora):
+        fichas = self.fichas + (agora - self.atualizado) * self.taxa
+        if fichas > self.capacidade:
+            fichas = self.capacidade
+        self.atualizado = agora
+        if fichas < 1:
+            self.fichas = fichas
+            return False
+        self.fichas = fichas - quantidade
+        return True
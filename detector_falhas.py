@@ -0,0 +1,133 @@
+import math
+import time
+from collections import deque
+
+VIVO = "vivo"
+SUSPEITO = "suspeito"
+MORTO = "morto"
+
+
+class _Historico:
+    def __init__(self, agora, intervalo_esperado, janela):
+        self.ultimo = agora
+        self.estado = VIVO
+        self.intervalos = deque(maxlen=janela)
+        self.soma = 0.0
+        self.soma_quadrados = 0.0
+        # Duas amostras sintéticas dão média e desvio razoáveis até chegarem
+        # batimentos de verdade.
+        self.adicionar(intervalo_esperado * 0.75)
+        self.adicionar(intervalo_esperado * 1.25)
+
+    def adicionar(self, intervalo):
+        if len(self.intervalos) == self.intervalos.maxlen:
+            antigo = self.intervalos[0]
+            self.soma -= antigo
+            self.soma_quadrados -= antigo * antigo
+        self.intervalos.append(intervalo)
+        self.soma += intervalo
+        self.soma_quadrados += intervalo * intervalo
+
+    def media(self):
+        return self.soma / len(self.intervalos)
+
+    def desvio(self):
+        media = self.media()
+        variancia = self.soma_quadrados / len(self.intervalos) - media * media
+        return math.sqrt(max(variancia, 0.0))
+
+
+class DetectorFalhas:
+    def __init__(
+        self,
+        relogio=time.monotonic,
+        intervalo_esperado=1.0,
+        limiar_suspeita=3.0,
+        limiar_morte=8.0,
+        desvio_minimo=0.1,
+        pausa_aceitavel=0.0,
+        janela=100,
+    ):
+        self.relogio = relogio
+        self.intervalo_esperado = intervalo_esperado
+        self.limiar_suspeita = limiar_suspeita
+        self.limiar_morte = limiar_morte
+        self.desvio_minimo = desvio_minimo
+        self.pausa_aceitavel = pausa_aceitavel
+        self.janela = janela
+        self._pares = {}
+
+    def registrar(self, par, agora=None):
+        if agora is None:
+            agora = self.relogio()
+        historico = self._pares.get(par)
+        if historico is None:
+            self._pares[par] = _Historico(agora, self.intervalo_esperado, self.janela)
+            return None
+        if historico.estado == MORTO:
+            # Dado como morto e de volta: o silêncio não entra na média, mas o
+            # ritmo aprendido antes continua valendo.
+            historico.ultimo = agora
+            historico.estado = VIVO
+            return MORTO
+        historico.adicionar(agora - historico.ultimo)
+        historico.ultimo = agora
+        anterior = historico.estado
+        historico.estado = VIVO
+        return anterior if anterior != VIVO else None
+
+    def remover(self, par):
+        self._pares.pop(par, None)
+
+    def _media(self, historico):
+        # O intervalo esperado é um piso: quem usa o detector pode ajustá-lo
+        # depois (ao tamanho do rodízio de gossip, por exemplo) e ele vale
+        # também para os históricos já criados.
+        return max(historico.media(), self.intervalo_esperado) + self.pausa_aceitavel
+
+    def _phi(self, historico, agora):
+        media = self._media(historico)
+        desvio = max(historico.desvio(), self.desvio_minimo)
+        decorrido = agora - historico.ultimo
+        atraso = 0.5 * math.erfc((decorrido - media) / (desvio * math.sqrt(2)))
+        if atraso <= 0.0:
+            return math.inf
+        return -math.log10(atraso)
+
+    def phi(self, par, agora=None):
+        historico = self._pares.get(par)
+        if historico is None:
+            return 0.0
+        return self._phi(historico, self.relogio() if agora is None else agora)
+
+    def estado(self, par):
+        historico = self._pares.get(par)
+        return historico.estado if historico is not None else None
+
+    def verificar(self, agora=None):
+        if agora is None:
+            agora = self.relogio()
+        transicoes = []
+        for par, historico in self._pares.items():
+            if historico.estado == MORTO:
+                continue
+            # Antes de a média passar, phi não chega a log10(2): com centenas de
+            # pares quase todos saem aqui, sem erfc.
+            if agora - historico.ultimo <= self._media(historico):
+                continue
+            phi = self._phi(historico, agora)
+            if phi >= self.limiar_morte:
+                historico.estado = MORTO
+                transicoes.append((par, MORTO))
+            elif phi >= self.limiar_suspeita and historico.estado == VIVO:
+                historico.estado = SUSPEITO
+                transicoes.append((par, SUSPEITO))
+        return transicoes
+
+    def vivacidade(self, agora=None):
+        if agora is None:
+            agora = self.relogio()
+        return {
+            par: (historico.estado, self._phi(historico, agora))
+            for par, historico in list(self._pares.items())
+        }
@@ -0,0 +1,254 @@
+import argparse
+import json
+import mmap
+import queue
+import socket
+import struct
+import threading
+import time
+
+import protocolo
+from grid import Grid
+
+MAGICA = b"BNDJ"
+VERSAO = 2
+
+# Cabeçalho: mágica, versão e tamanho do JSON de metadados que vem em seguida.
+_CABECALHO = struct.Struct("<4sBI")
+# Registro fixo: instante (s desde a abertura), tipo, valor, o par (ip, porta,
+# id), x, y.
+REGISTRO = struct.Struct("<dBBIHIHH")
+
+NAVIO = 1  # valor: orientação (0 = h, 1 = v); campo ip: índice na frota
+TIRO_RECEBIDO = 2  # valor: resultado que respondemos
+TIRO_ENVIADO = 3
+RESULTADO_RECEBIDO = 4  # valor: resultado
+ENTROU = 5
+SAIU = 6  # valor: índice em MOTIVOS_SAIDA
+SUSPEITO = 7
+RECUPERADO = 8
+ESTADO = 9  # valor: índice em metadados["estados"]
+TIRO_PERDIDO = 10
+CONFIG_DIVERGENTE = 11  # x: tamanho do tabuleiro anunciado
+RESTAURADO = 12  # tiro já recebido antes do snapshot; valor: 1 = acerto
+
+NOMES = {
+    NAVIO: "navio",
+    TIRO_RECEBIDO: "tiro_recebido",
+    TIRO_ENVIADO: "tiro_enviado",
+    RESULTADO_RECEBIDO: "resultado_recebido",
+    ENTROU: "entrou",
+    SAIU: "saiu",
+    SUSPEITO: "suspeito",
+    RECUPERADO: "recuperado",
+    ESTADO: "estado",
+    TIRO_PERDIDO: "tiro_perdido",
+    CONFIG_DIVERGENTE: "config_divergente",
+    RESTAURADO: "restaurado",
+}
+MOTIVOS_SAIDA = ("jogador_saiu", "erro_conexao", "peer_morto", "jogador_perdeu")
+CODIGO_MOTIVO = {motivo: i for i, motivo in enumerate(MOTIVOS_SAIDA)}
+
+
+def ip_para_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def int_para_ip(valor):
+    return socket.inet_ntoa(valor.to_bytes(4, "big"))
+
+
+class Diario:
+    LIMITE_BUFFER = 64 * 1024
+    INTERVALO_DESCARGA = 1.0
+
+    def __init__(self, caminho, metadados):
+        self.caminho = caminho
+        self.inicio = time.monotonic()
+        self._arquivo = open(caminho, "wb")
+        corpo = json.dumps(metadados).encode()
+        self._arquivo.write(_CABECALHO.pack(MAGICA, VERSAO, len(corpo)) + corpo)
+        self._arquivo.flush()
+        self._buffer = bytearray()
+        self._ultima_descarga = self.inicio
+        self._pares = {}
+        # A escrita em disco fica numa thread própria; o jogo só empacota.
+        self._blocos = queue.SimpleQueue()
+        self._escritor = threading.Thread(target=self._escrever, daemon=True)
+        self._escritor.start()
+
+    def _escrever(self):
+        while True:
+            bloco = self._blocos.get()
+            if bloco is None:
+                break
+            self._arquivo.write(bloco)
+            self._arquivo.flush()
+        self._arquivo.close()
+
+    def _par(self, par):
+        campos = self._pares.get(par)
+        if campos is None:
+            campos = self._pares[par] = (ip_para_int(par.ip), par.porta, par.id)
+        return campos
+
+    def registrar(self, tipo, par=None, x=0, y=0, valor=0, indice=0):
+        agora = time.monotonic()
+        ip, porta, id_par = self._par(par) if par else (indice, 0, 0)
+        self._buffer += REGISTRO.pack(
+            agora - self.inicio, tipo, valor, ip, porta, id_par, x, y
+        )
+        if (
+            len(self._buffer) >= self.LIMITE_BUFFER
+            or agora - self._ultima_descarga >= self.INTERVALO_DESCARGA
+        ):
+            self.descarregar()
+
+    def descarregar(self):
+        if self._buffer:
+            self._blocos.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._ultima_descarga = time.monotonic()
+
+    def registrar_frota(self, grid):
+        indices = {nome: i for i, nome in enumerate(grid.SHIP_CONFIG)}
+        for nome, x, y, orientacao in grid.navios_posicionados():
+            self.registrar(
+                NAVIO, x=x, y=y, valor=orientacao == "v", indice=indices[nome]
+            )
+
+    def registrar_restauracao(self, grid):
+        # Diário aberto depois de um snapshot: os tiros que o tabuleiro já
+        # levou vão antes dos novos, para a reprodução partir do mesmo estado.
+        for x, y, simbolo in grid.celulas_marcadas():
+            if simbolo == Grid.SIMBOLO_ATINGIDO or simbolo == Grid.SIMBOLO_ERRO:
+                self.registrar(
+                    RESTAURADO, x=x, y=y, valor=simbolo == Grid.SIMBOLO_ATINGIDO
+                )
+
+    def fechar(self):
+        self.descarregar()
+        self._blocos.put(None)
+        self._escritor.join()
+
+
+def _ler_cabecalho(mapa):
+    magica, versao, tamanho = _CABECALHO.unpack_from(mapa, 0)
+    if magica != MAGICA or versao != VERSAO:
+        raise ValueError("arquivo não é um diário de partida compatível")
+    inicio = _CABECALHO.size + tamanho
+    return json.loads(mapa[_CABECALHO.size : inicio]), inicio
+
+
+def reproduzir(caminho):
+    with open(caminho, "rb") as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    metadados, inicio = _ler_cabecalho(mapa)
+    # Um registro incompleto no fim (queda no meio da escrita) é ignorado.
+    quantidade = (len(mapa) - inicio) // REGISTRO.size
+    registros = memoryview(mapa)[inicio : inicio + quantidade * REGISTRO.size]
+    relatorio = _reproduzir(metadados, REGISTRO.iter_unpack(registros))
+    registros.release()
+    mapa.close()
+    return relatorio
+
+
+def _reproduzir(metadados, registros):
+    frota = [(nome, tamanho) for nome, tamanho in metadados["frota"]]
+    grid = Grid(metadados["tamanho"], dict(frota))
+    processar = grid.processar_tiro
+    codigos = protocolo.CODIGO_RESULTADO
+    posicionar = grid._posicionar_navio
+
+    # Contagens em listas indexadas pelo código: mais baratas que Counter no laço.
+    contagem = [0] * 256
+    recebidos = [0] * len(protocolo.RESULTADOS)
+    por_oponente = {}
+    divergencias = []
+    estado = None
+    instante = 0.0
+    for instante, tipo, valor, ip, porta, id_par, x, y in registros:
+        contagem[tipo] += 1
+        if tipo == TIRO_RECEBIDO:
+            obtido = codigos[processar(x, y)]
+            recebidos[obtido] += 1
+            if obtido != valor:
+                divergencias.append(
+                    (
+                        instante,
+                        x,
+                        y,
+                        protocolo.RESULTADOS[valor],
+                        protocolo.RESULTADOS[obtido],
+                    )
+                )
+        elif tipo == RESULTADO_RECEBIDO:
+            chave = (ip, porta, id_par)
+            resultados = por_oponente.get(chave)
+            if resultados is None:
+                resultados = por_oponente[chave] = [0] * len(protocolo.RESULTADOS)
+            resultados[valor] += 1
+        elif tipo == NAVIO:
+            nome, tamanho = frota[ip]
+            posicionar(nome, x, y, tamanho, "v" if valor else "h")
+        elif tipo == RESTAURADO:
+            # Só reconstrói o tabuleiro: a resposta foi dada antes do diário.
+            obtido = processar(x, y)
+            if (obtido != "miss") != valor:
+                esperado = "hit" if valor else "miss"
+                divergencias.append((instante, x, y, esperado, obtido))
+        elif tipo == ESTADO:
+            estado = valor
+
+    def por_nome(quantidades):
+        return {
+            protocolo.RESULTADOS[codigo]: n for codigo, n in enumerate(quantidades) if n
+        }
+
+    estados = metadados.get("estados", [])
+    return {
+        "ip": metadados.get("ip"),
+        "porta": metadados.get("porta"),
+        "id": metadados.get("id"),
+        "tamanho": metadados["tamanho"],
+        "registros": sum(contagem),
+        "duracao_s": instante,
+        "eventos": {NOMES.get(t, str(t)): n for t, n in enumerate(contagem) if n},
+        "tiros_recebidos": por_nome(recebidos),
+        "resultados_por_oponente": {
+            str(protocolo.Par(int_para_ip(ip), porta, id_par)): por_nome(resultados)
+            for (ip, porta, id_par), resultados in por_oponente.items()
+        },
+        "navios_restantes": grid.navios_restantes,
+        "estado_final": estados[estado] if estado is not None else None,
+        "divergencias": len(divergencias),
+        "primeiras_divergencias": divergencias[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reproduz um diário de partida sobre o Grid, sem interface."
+    )
+    parser.add_argument("caminho")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    relatorio = reproduzir(args.caminho)
+    duracao = time.perf_counter() - inicio
+    if args.json:
+        print(json.dumps(relatorio, indent=1))
+        return
+    print("\n--- DIÁRIO ---")
+    for chave, valor in relatorio.items():
+        print(f"{chave}: {valor}")
+    print(
+        f"reproduzido em {duracao * 1e3:.1f} ms "
+        f"({relatorio['registros'] / max(duracao, 1e-9):,.0f} registros/s)"
+    )
+    print("--------------")
+
+
+if __name__ == "__main__":
+    main()
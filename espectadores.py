@@ -0,0 +1,309 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Entradas do anel: (CELULA, dono, indice, simbolo), (ENTROU, dono),
+# (SAIU, dono) e (ESTADO, estado). O dono é "eu" ou o par como texto.
+CELULA = 0
+ENTROU = 1
+SAIU = 2
+ESTADO = 3
+
+EU = "eu"
+
+
+class FeedEspectadores:
+    # O anel é compartilhado: o jogo escreve cada mudança uma vez, qualquer
+    # que seja o número de espectadores, e cada um lê a partir do seu cursor.
+    CAPACIDADE = 1 << 16
+
+    def __init__(self, fila, capacidade=CAPACIDADE):
+        self.fila = fila
+        self.capacidade = capacidade
+        self._anel = [None] * capacidade
+        # Número da próxima entrada; quem ficou antes de _base (ou foi
+        # sobrescrito no anel) precisa de um retrato novo.
+        self._seq = 0
+        self._base = 0
+        self._condicao = threading.Condition()
+        self.assinantes = 0
+        self.retratos = 0
+        self._retrato = None
+        self._pedido = False
+        self._oponentes = set()
+        self._estado = None
+
+    def _minimo(self):
+        return max(self._seq - self.capacidade, self._base)
+
+    def entrar(self):
+        with self._condicao:
+            self.assinantes += 1
+
+    def sair(self):
+        with self._condicao:
+            self.assinantes -= 1
+            if not self.assinantes:
+                # Sem espectadores publicar() descarta as mudanças e _seq para:
+                # o retrato guardado envelheceria parecendo válido.
+                self._base = self._seq
+                self._retrato = None
+
+    def publicar(self, motor):
+        # Thread do jogo, a cada lote de eventos. Sem espectadores não há o
+        # que acompanhar: quem chegar recebe um retrato.
+        if not self.assinantes:
+            return
+        entradas = []
+        estado = motor.estado_jogo
+        if estado != self._estado:
+            entradas.append((ESTADO, estado))
+            self._estado = estado
+        oponentes = motor.grids_oponentes
+        if oponentes.keys() != self._oponentes:
+            atuais = set(oponentes)
+            entradas.extend((SAIU, str(par)) for par in self._oponentes - atuais)
+            entradas.extend((ENTROU, str(par)) for par in atuais - self._oponentes)
+            self._oponentes = atuais
+        n = motor.grid.GRID_SIZE
+        for dono, x, y in motor.celulas_alteradas:
+            if dono is None:
+                tabuleiro, nome = motor.grid, EU
+            else:
+                tabuleiro = oponentes.get(dono)
+                if tabuleiro is None:
+                    continue
+                nome = str(dono)
+            entradas.append((CELULA, nome, y * n + x, tabuleiro.celula(x, y)))
+        if not entradas:
+            return
+        with self._condicao:
+            for entrada in entradas:
+                self._anel[self._seq % self.capacidade] = entrada
+                self._seq += 1
+            self._condicao.notify_all()
+
+    def invalidar(self):
+        # Frota reposicionada ou estado restaurado: deltas não bastam.
+        with self._condicao:
+            self._base = self._seq
+            self._retrato = None
+            self._condicao.notify_all()
+
+    def capturar(self, motor):
+        # Thread do jogo, a pedido de um espectador (evento na fila): só
+        # cópias dos conjuntos; a conversão para JSON fica com quem pediu.
+        grid = motor.grid
+        tabuleiros = {
+            EU: (
+                list(grid.navio_na_celula),
+                grid.acertos.copy(),
+                grid.erros.copy(),
+                (),
+            )
+        }
+        for par, oponente in motor.grids_oponentes.items():
+            tabuleiros[str(par)] = (
+                None,
+                oponente.acertos,
+                oponente.erros,
+                oponente.bloqueados,
+            )
+        self._oponentes = set(motor.grids_oponentes)
+        self._estado = motor.estado_jogo
+        dados = {
+            "eu": str(motor.eu),
+            "tamanho": grid.GRID_SIZE,
+            "estado": motor.estado_jogo,
+            "tabuleiros": tabuleiros,
+        }
+        with self._condicao:
+            self._retrato = {"seq": self._seq, "dados": dados, "json": None}
+            self._pedido = False
+            self.retratos += 1
+            self._condicao.notify_all()
+
+    def _retrato_valido(self):
+        return self._retrato is not None and self._retrato["seq"] >= self._minimo()
+
+    def retrato(self, limite):
+        # Devolve (json, seq): o estado até a entrada seq, exclusive.
+        with self._condicao:
+            if not self._retrato_valido():
+                if not self._pedido:
+                    self._pedido = True
+                    self.fila.put(("retrato_espectadores",))
+                if not self._condicao.wait_for(self._retrato_valido, limite):
+                    return None, None
+            retrato = self._retrato
+        if retrato["json"] is None:
+            # Vários espectadores chegando juntos compartilham a codificação.
+            retrato["json"] = _codificar_retrato(retrato["seq"], retrato["dados"])
+        return retrato["json"], retrato["seq"]
+
+    def aguardar(self, cursor, limite):
+        # Devolve (entradas, cursor novo); None se o cursor ficou para trás do
+        # anel e o espectador precisa de um retrato.
+        with self._condicao:
+            if not self._condicao.wait_for(
+                lambda: self._seq > cursor or cursor < self._minimo(), limite
+            ):
+                return [], cursor
+            if cursor < self._minimo():
+                return None, cursor
+            inicio, fim = cursor % self.capacidade, self._seq % self.capacidade
+            if inicio < fim:
+                entradas = self._anel[inicio:fim]
+            else:
+                entradas = self._anel[inicio:] + self._anel[:fim]
+            return entradas, self._seq
+
+
+def _codificar_retrato(seq, dados):
+    tabuleiros = {}
+    for dono, (navios, acertos, erros, bloqueados) in dados["tabuleiros"].items():
+        tabuleiro = tabuleiros[dono] = {
+            "acertos": list(acertos),
+            "erros": list(erros),
+            "bloqueados": list(bloqueados),
+        }
+        if navios is not None:
+            tabuleiro["navios"] = navios
+    return json.dumps(
+        dict(dados, seq=seq, tabuleiros=tabuleiros), separators=(",", ":")
+    )
+
+
+def coalescer(entradas):
+    # Só o último valor de cada célula; quem saiu (ou saiu e voltou) perde as
+    # células anteriores, que eram do tabuleiro antigo.
+    celulas = {}
+    entraram = {}
+    sairam = {}
+    estado = None
+    for entrada in entradas:
+        tipo = entrada[0]
+        if tipo == CELULA:
+            _, dono, indice, simbolo = entrada
+            por_dono = celulas.get(dono)
+            if por_dono is None:
+                por_dono = celulas[dono] = {}
+            por_dono[indice] = simbolo
+        elif tipo == ESTADO:
+            estado = entrada[1]
+        else:
+            dono = entrada[1]
+            celulas.pop(dono, None)
+            if tipo == ENTROU:
+                entraram[dono] = None
+            else:
+                sairam[dono] = None
+                entraram.pop(dono, None)
+    delta = {}
+    if estado is not None:
+        delta["estado"] = estado
+    if sairam:
+        delta["sairam"] = list(sairam)
+    if entraram:
+        delta["entraram"] = list(entraram)
+    if celulas:
+        delta["celulas"] = {
+            dono: [[indice, simbolo] for indice, simbolo in por_dono.items()]
+            for dono, por_dono in celulas.items()
+        }
+    return delta
+
+
+class _TratadorEspectador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/espectar"):
+            self.send_error(404)
+            return
+        servidor = self.server
+        feed = servidor.feed
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        # Buffer de envio pequeno: um espectador lento trava logo no write e
+        # recebe depois um delta só, em vez de o kernel acumular megabytes de
+        # mudanças já superadas.
+        self.connection.setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, servidor.BUFFER_ENVIO
+        )
+        feed.entrar()
+        try:
+            cursor = None
+            while servidor.ativo:
+                if cursor is None:
+                    corpo, cursor = feed.retrato(servidor.LIMITE_RETRATO)
+                    if corpo is None:
+                        break
+                    self._enviar("retrato", corpo)
+                    continue
+                entradas, seq = feed.aguardar(cursor, servidor.BATIMENTO)
+                if entradas is None:
+                    cursor = None
+                elif entradas:
+                    delta = coalescer(entradas)
+                    delta["seq"] = seq
+                    self._enviar("delta", json.dumps(delta, separators=(",", ":")))
+                    cursor = seq
+                    # Um espectador lento fica preso no write acima, nunca o
+                    # jogo; o intervalo junta as mudanças seguintes num delta só.
+                    time.sleep(servidor.INTERVALO_MINIMO)
+                else:
+                    # Comentário SSE: mantém a conexão e detecta quem saiu.
+                    self.wfile.write(b":\n\n")
+                    self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            feed.sair()
+
+    def _enviar(self, evento, corpo):
+        self.wfile.write(f"event: {evento}\ndata: {corpo}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorEspectadores:
+    INTERVALO_MINIMO = 0.1
+    BATIMENTO = 15.0
+    LIMITE_RETRATO = 5.0
+    BUFFER_ENVIO = 32 * 1024
+
+    def __init__(self, feed, porta=0, endereco="127.0.0.1"):
+        self.feed = feed
+        self.endereco = endereco
+        self.porta = porta
+        self._servidor = None
+        self._thread = None
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(
+            (self.endereco, self.porta), _TratadorEspectador
+        )
+        self._servidor.daemon_threads = True
+        self._servidor.feed = self.feed
+        self._servidor.ativo = True
+        for nome in ("INTERVALO_MINIMO", "BATIMENTO", "LIMITE_RETRATO", "BUFFER_ENVIO"):
+            setattr(self._servidor, nome, getattr(self, nome))
+        self.porta = self._servidor.server_address[1]
+        self._thread = threading.Thread(
+            target=self._servidor.serve_forever, daemon=True
+        )
+        self._thread.start()
+        print(f"[ESPECTADORES] http://{self.endereco}:{self.porta}/espectar")
+        return self.porta
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.ativo = False
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class _Faixa:
+    # Itens de uma prioridade, numerados na ordem de chegada para a amostragem
+    # da espera.
+    __slots__ = ("itens", "inseridos", "retirados", "amostras")
+
+    def __init__(self):
+        self.itens = deque()
+        self.inseridos = 0
+        self.retirados = 0
+        self.amostras = deque()
+
+
+class FilaEventos(queue.Queue):
+    # Mede a espera de uma a cada AMOSTRAGEM_ESPERA inserções.
+    AMOSTRAGEM_ESPERA = 8
+    # Tiros recebidos são o único evento que um par gera à vontade: vão numa
+    # faixa própria, limitada e atendida depois de resultados, entradas e
+    # saídas, que assim nunca esperam atrás de uma enxurrada.
+    TIPOS_TIRO = frozenset(("tiro_recebido", "salvo_recebido"))
+    LIMITE_TIROS = 1024
+
+    def __init__(self, ao_inserir=None, maxsize=0, limite_tiros=LIMITE_TIROS):
+        self.limite_tiros = limite_tiros
+        super().__init__(maxsize)
+        self.ao_inserir = ao_inserir
+        self._aviso_pendente = threading.Event()
+        self.metricas = None
+        self.profundidade_maxima = 0
+        self.descartados = 0
+        self._espera = None
+
+    def _init(self, maxsize):
+        self._prioritaria = _Faixa()
+        self._tiros = _Faixa()
+        self.queue = self._prioritaria.itens
+
+    def _qsize(self):
+        return len(self._prioritaria.itens) + len(self._tiros.itens)
+
+    def instrumentar(self, metricas):
+        if not metricas.ativa:
+            return
+        with self.mutex:
+            if self.metricas is None:
+                for faixa in (self._prioritaria, self._tiros):
+                    faixa.retirados = 0
+                    faixa.inseridos = len(faixa.itens)
+            self.metricas = metricas
+            self._espera = metricas.histograma("espera_fila_s")
+        metricas.medir("fila_eventos", self.qsize)
+        metricas.medir("fila_eventos_max", lambda: self.profundidade_maxima)
+        metricas.medir("fila_tiros", lambda: len(self._tiros.itens))
+        metricas.medir("eventos_descartados", lambda: self.descartados)
+
+    def aceita_tiros(self):
+        # Consultado pela rede antes de aceitar um tiro: quem é recusado aqui
+        # não é respondido e o atirador retransmite com recuo.
+        return len(self._tiros.itens) < self.limite_tiros
+
+    def put(self, item, block=True, timeout=None):
+        if item[0] in self.TIPOS_TIRO and len(self._tiros.itens) >= self.limite_tiros:
+            with self.mutex:
+                self.descartados += 1
+            return
+        super().put(item, block, timeout)
+        if self.ao_inserir is not None and not self._aviso_pendente.is_set():
+            self._aviso_pendente.set()
+            self.ao_inserir()
+
+    def _put(self, item):
+        faixa = self._tiros if item[0] in self.TIPOS_TIRO else self._prioritaria
+        faixa.itens.append(item)
+        if self.metricas is not None:
+            faixa.inseridos += 1
+            if faixa.inseridos % self.AMOSTRAGEM_ESPERA == 0:
+                faixa.amostras.append((faixa.inseridos, time.monotonic()))
+            if self._qsize() > self.profundidade_maxima:
+                self.profundidade_maxima = self._qsize()
+
+    def _get(self):
+        faixa = self._prioritaria if self._prioritaria.itens else self._tiros
+        if self.metricas is not None:
+            faixa.retirados += 1
+            if faixa.amostras and faixa.amostras[0][0] == faixa.retirados:
+                _, inserido = faixa.amostras.popleft()
+                self._espera.registrar(time.monotonic() - inserido)
+        return faixa.itens.popleft()
+
+    def rearmar(self):
+        self._aviso_pendente.clear()
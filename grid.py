@@ -1,4 +1,26 @@
 import random
+import string
+from collections import Counter
+
+from posicionamento import LIMITE_INDICE, indice_posicionamento, sortear_frota_esparsa
+
+
+def rotulo_linha(indice):
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = string.ascii_uppercase[resto] + letras
+    return letras
+
+
+def indice_linha(rotulo):
+    indice = 0
+    for letra in rotulo.upper():
+        if letra not in string.ascii_uppercase:
+            raise ValueError(f"linha inválida: {rotulo}")
+        indice = indice * 26 + ord(letra) - ord("A") + 1
+    return indice - 1
 
 
 class Grid:
@@ -14,25 +36,52 @@ class Grid:
     SIMBOLO_NAVIO = "N"
     SIMBOLO_ATINGIDO = "X"
     SIMBOLO_ERRO = "O"
+    # "repeat": a célula já levou tiro de outro jogador e não sabemos o quê.
+    SIMBOLO_BLOQUEADO = "?"
 
-    def __init__(self):
-        self.meu_grid = self._criar_grid_vazio()
+    def __init__(self, tamanho=None, frota=None):
+        if tamanho is not None:
+            self.GRID_SIZE = tamanho
+        if frota is not None:
+            self.SHIP_CONFIG = dict(frota)
+        self.navio_na_celula = {}
+        self.acertos = set()
+        self.erros = set()
         self.meus_navios_saude = {}
+        self.navios_restantes = 0
         self.score_vezes_fui_atingido = 0
         self.score_jogadores_que_atingi = set()
 
-    def _criar_grid_vazio(self):
-        return [
-            [self.SIMBOLO_AGUA for _ in range(self.GRID_SIZE)]
-            for _ in range(self.GRID_SIZE)
-        ]
+    def config_jogo(self):
+        return self.GRID_SIZE, resumo_frota(self.SHIP_CONFIG)
+
+    def celula(self, x, y):
+        idx = y * self.GRID_SIZE + x
+        if idx in self.acertos:
+            return self.SIMBOLO_ATINGIDO
+        if idx in self.erros:
+            return self.SIMBOLO_ERRO
+        return self.navio_na_celula.get(idx, self.SIMBOLO_AGUA)
+
+    @property
+    def meu_grid(self):
+        # Visão lista-de-listas (meu_grid[y][x]) de antes do armazenamento
+        # esparso, montada a pedido: é uma cópia, não aceita escrita.
+        n = self.GRID_SIZE
+        return [[self.celula(x, y) for x in range(n)] for y in range(n)]
+
+    def celulas_marcadas(self):
+        n = self.GRID_SIZE
+        for idx in self.navio_na_celula:
+            yield idx % n, idx // n, self.celula(idx % n, idx // n)
+        for idx in self.erros:
+            yield idx % n, idx // n, self.SIMBOLO_ERRO
 
     def _parse_coord(self, coord_str):
         try:
-            col_str = coord_str[0].upper()
-            lin_str = coord_str[1:]
-            y = ord(col_str) - ord("A")
-            x = int(lin_str)
+            letras = coord_str.rstrip("0123456789")
+            y = indice_linha(letras)
+            x = int(coord_str[len(letras) :])
             if not (0 <= x < self.GRID_SIZE and 0 <= y < self.GRID_SIZE):
                 return None, None
             return x, y
@@ -40,45 +89,57 @@ class Grid:
         except Exception:
             return None, None
 
-    def _validar_posicao(self, x, y, tamanho, orientacao):
-        if orientacao == "h":
-            if x + tamanho > self.GRID_SIZE:
-                return False
-
-            for i in range(tamanho):
-                if self.meu_grid[y][x + i] != self.SIMBOLO_AGUA:
-                    return False
-        else:
-            if y + tamanho > self.GRID_SIZE:
-                return False
+    def _celula_livre(self, idx):
+        return idx not in self.navio_na_celula and idx not in self.erros
 
-            for i in range(tamanho):
-                if self.meu_grid[y + i][x] != self.SIMBOLO_AGUA:
-                    return False
-        return True
+    def _validar_posicao(self, x, y, tamanho, orientacao):
+        limite = x if orientacao == "h" else y
+        if limite + tamanho > self.GRID_SIZE:
+            return False
+        passo = 1 if orientacao == "h" else self.GRID_SIZE
+        inicio = y * self.GRID_SIZE + x
+        return all(self._celula_livre(inicio + i * passo) for i in range(tamanho))
 
     def _posicionar_navio(self, nome, x, y, tamanho, orientacao):
         self.meus_navios_saude[nome] = tamanho
-        if orientacao == "h":
-            for i in range(tamanho):
-                self.meu_grid[y][x + i] = nome
-        else:
-            for i in range(tamanho):
-                self.meu_grid[y + i][x] = nome
+        self.navios_restantes += 1
+        passo = 1 if orientacao == "h" else self.GRID_SIZE
+        inicio = y * self.GRID_SIZE + x
+        for i in range(tamanho):
+            self.navio_na_celula[inicio + i * passo] = nome
 
-    def posicionar_navios_aleatorio(self):
-        print("[JOGO] Posicionando navios aleatoriamente...")
+    def navios_posicionados(self):
+        # (nome, x, y, orientação) de cada navio, a partir da primeira célula.
+        celulas = {}
+        for idx, nome in self.navio_na_celula.items():
+            celulas.setdefault(nome, []).append(idx)
+        n = self.GRID_SIZE
+        for nome, indices in celulas.items():
+            inicio = min(indices)
+            vertical = len(indices) > 1 and inicio + 1 not in indices
+            yield nome, inicio % n, inicio // n, "v" if vertical else "h"
+
+    def _mascara_bloqueada(self):
+        mascara = 0
+        for idx in self.navio_na_celula:
+            mascara |= 1 << idx
+        for idx in self.erros:
+            mascara |= 1 << idx
+        return mascara
 
-        for nome_navio, tamanho in self.SHIP_CONFIG.items():
-            posicionado = False
+    def posicionar_navios_aleatorio(self, rng=random):
+        print("[JOGO] Posicionando navios aleatoriamente...")
 
-            while not posicionado:
-                orientacao = random.choice(["h", "v"])
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                if self._validar_posicao(x, y, tamanho, orientacao):
-                    self._posicionar_navio(nome_navio, x, y, tamanho, orientacao)
-                    posicionado = True
+        if self.GRID_SIZE <= LIMITE_INDICE:
+            navios = indice_posicionamento(self.GRID_SIZE).sortear_frota(
+                self.SHIP_CONFIG, rng, self._mascara_bloqueada()
+            )
+        else:
+            navios = sortear_frota_esparsa(
+                self.GRID_SIZE, self.SHIP_CONFIG, rng, self._celula_livre
+            )
+        for nome_navio, x, y, tamanho, orientacao in navios:
+            self._posicionar_navio(nome_navio, x, y, tamanho, orientacao)
 
     def posicionar_navios_manual(self):
         print("Posicionamento manual não suportado nesta versão, usando aleatório.")
@@ -88,25 +149,27 @@ class Grid:
 
         if not (0 <= x < self.GRID_SIZE and 0 <= y < self.GRID_SIZE):
             return "miss"
-        celula = self.meu_grid[y][x]
-        if celula == self.SIMBOLO_AGUA:
-            self.meu_grid[y][x] = self.SIMBOLO_ERRO
+        idx = y * self.GRID_SIZE + x
+        if idx in self.acertos or idx in self.erros:
+            return "repeat"
+
+        nome_navio = self.navio_na_celula.get(idx)
+        if nome_navio is None:
+            self.erros.add(idx)
             return "miss"
 
-        if celula in [self.SIMBOLO_ATINGIDO, self.SIMBOLO_ERRO]:
-            return "repeat"
+        self.acertos.add(idx)
+        self.meus_navios_saude[nome_navio] -= 1
+        self.score_vezes_fui_atingido += 1
+        if self.meus_navios_saude[nome_navio] == 0:
+            self.navios_restantes -= 1
+            if self.navios_restantes == 0:
+                return "game_over"
+            return "destroyed"
+        return "hit"
 
-        if celula in self.meus_navios_saude:
-            nome_navio = celula
-            self.meu_grid[y][x] = self.SIMBOLO_ATINGIDO
-            self.meus_navios_saude[nome_navio] -= 1
-            self.score_vezes_fui_atingido += 1
-            if self.meus_navios_saude[nome_navio] == 0:
-                if all(saude == 0 for saude in self.meus_navios_saude.values()):
-                    return "game_over"
-                return "destroyed"
-            return "hit"
-        return "miss"
+    def processar_salvo(self, coords):
+        return [self.processar_tiro(x, y) for x, y in coords]
 
     def calcular_score_final(self):
         score_final = (
@@ -119,3 +182,173 @@ class Grid:
         print(f"Número de vezes que você foi atingido: {self.score_vezes_fui_atingido}")
         print(f"Pontuação Final (Atingidos - Vezes Atingido): {score_final}")
         print("-------------------")
+
+
+def frota_ampliada(copias, frota=None):
+    if frota is None:
+        frota = Grid.SHIP_CONFIG
+    if copias <= 1:
+        return dict(frota)
+    return {
+        f"{nome}-{i + 1}": tamanho
+        for i in range(copias)
+        for nome, tamanho in frota.items()
+    }
+
+
+def copias_para_tamanho(tamanho):
+    # Mantém a densidade de navios do tabuleiro clássico (~1 frota a cada 1000
+    # células, no mínimo uma).
+    return max(1, tamanho * tamanho // 1000)
+
+
+def configurar_partida(tamanho=None, copias=None):
+    if tamanho is None:
+        tamanho = Grid.GRID_SIZE
+    if copias is None:
+        copias = copias_para_tamanho(tamanho)
+    return tamanho, frota_ampliada(copias)
+
+
+def resumo_frota(frota):
+    return tuple(sorted(Counter(frota.values()).items()))
+
+
+# Códigos de célula da visão de um oponente.
+AGUA = 0
+ERRO = 1
+ACERTO = 2
+BLOQUEADO = 3
+_SIMBOLOS_CODIGO = (
+    Grid.SIMBOLO_AGUA,
+    Grid.SIMBOLO_ERRO,
+    Grid.SIMBOLO_ATINGIDO,
+    Grid.SIMBOLO_BLOQUEADO,
+)
+_CODIGOS_SIMBOLO = {simbolo: codigo for codigo, simbolo in enumerate(_SIMBOLOS_CODIGO)}
+
+
+class GridOponente:
+    # Com centenas de oponentes a maioria nunca recebe um tiro nosso: nada é
+    # alocado até a primeira marcação. Depois, um byte por célula em
+    # tabuleiros pequenos; nos grandes ("oceano") n² bytes por oponente
+    # custariam mais que as poucas células marcadas, e ficam três conjuntos
+    # esparsos (erros, acertos, bloqueados), copiados em C pelos snapshots.
+    __slots__ = ("GRID_SIZE", "marcacoes", "_celulas", "_afundados")
+    LIMITE_COMPACTO = 128
+
+    def __init__(self, tamanho):
+        self.GRID_SIZE = tamanho
+        self.marcacoes = 0
+        self._celulas = None
+        # Células que responderam "destroyed", na ordem: a mira restaurada
+        # precisa delas para saber quais navios já afundaram.
+        self._afundados = None
+
+    def _alocar(self):
+        n = self.GRID_SIZE
+        if n <= self.LIMITE_COMPACTO:
+            self._celulas = bytearray(n * n)
+        else:
+            self._celulas = (set(), set(), set())
+        return self._celulas
+
+    def codigo(self, idx):
+        celulas = self._celulas
+        if celulas is None:
+            return AGUA
+        if type(celulas) is bytearray:
+            return celulas[idx]
+        for codigo, indices in enumerate(celulas, 1):
+            if idx in indices:
+                return codigo
+        return AGUA
+
+    def celula(self, x, y):
+        return _SIMBOLOS_CODIGO[self.codigo(y * self.GRID_SIZE + x)]
+
+    def _gravar(self, idx, codigo):
+        celulas = self._celulas
+        if type(celulas) is bytearray:
+            celulas[idx] = codigo
+            return
+        if celulas is None:
+            if codigo == AGUA:
+                return
+            celulas = self._alocar()
+            if type(celulas) is bytearray:
+                celulas[idx] = codigo
+                return
+        for indices in celulas:
+            indices.discard(idx)
+        if codigo != AGUA:
+            celulas[codigo - 1].add(idx)
+
+    def marcar(self, x, y, simbolo):
+        self.marcacoes += 1
+        self._gravar(y * self.GRID_SIZE + x, _CODIGOS_SIMBOLO.get(simbolo, AGUA))
+
+    def registrar_afundado(self, x, y):
+        if self._afundados is None:
+            self._afundados = []
+        self._afundados.append(y * self.GRID_SIZE + x)
+
+    def afundados(self):
+        return list(self._afundados or ())
+
+    def restaurar(self, acertos, erros, bloqueados=(), afundados=()):
+        if afundados:
+            self._afundados = list(afundados)
+        if not acertos and not erros and not bloqueados:
+            return
+        celulas = self._celulas
+        if celulas is None:
+            celulas = self._alocar()
+        if type(celulas) is bytearray:
+            for codigo, indices in (
+                (ACERTO, acertos),
+                (ERRO, erros),
+                (BLOQUEADO, bloqueados),
+            ):
+                for idx in indices:
+                    celulas[idx] = codigo
+        else:
+            celulas[0].update(erros)
+            celulas[1].update(acertos)
+            celulas[2].update(bloqueados)
+
+    def indices(self, codigo):
+        # Sempre um conjunto novo: quem recebe pode guardá-lo ou levá-lo para
+        # outra thread.
+        celulas = self._celulas
+        if celulas is None:
+            return set()
+        if type(celulas) is not bytearray:
+            return celulas[codigo - 1].copy()
+        # bytearray.find percorre em C: só as células marcadas passam pelo
+        # interpretador.
+        indices = set()
+        idx = celulas.find(codigo)
+        while idx >= 0:
+            indices.add(idx)
+            idx = celulas.find(codigo, idx + 1)
+        return indices
+
+    @property
+    def acertos(self):
+        return self.indices(ACERTO)
+
+    @property
+    def erros(self):
+        return self.indices(ERRO)
+
+    @property
+    def bloqueados(self):
+        return self.indices(BLOQUEADO)
+
+    def celulas_marcadas(self):
+        n = self.GRID_SIZE
+        for codigo in (ACERTO, ERRO, BLOQUEADO):
+            simbolo = _SIMBOLOS_CODIGO[codigo]
+            for idx in self.indices(codigo):
+                yield idx % n, idx // n, simbolo
@@ -0,0 +1,105 @@
+import numpy as np
+
+import protocolo
+from grid import Grid
+
+MISS = protocolo.CODIGO_RESULTADO["miss"]
+HIT = protocolo.CODIGO_RESULTADO["hit"]
+DESTROYED = protocolo.CODIGO_RESULTADO["destroyed"]
+GAME_OVER = protocolo.CODIGO_RESULTADO["game_over"]
+REPEAT = protocolo.CODIGO_RESULTADO["repeat"]
+
+SEM_NAVIO = -1
+
+
+def _tipo_indice_navio(navios):
+    # Frotas ampliadas ("oceano") passam de 127 navios: o menor inteiro com
+    # sinal que comporte o maior índice e SEM_NAVIO.
+    for tipo in (np.int8, np.int16, np.int32):
+        if navios - 1 <= np.iinfo(tipo).max:
+            return tipo
+    raise ValueError(f"frota com {navios} navios não cabe no GridBatch")
+
+
+class GridBatch:
+    def __init__(self, quantidade, tamanho=Grid.GRID_SIZE, frota=None):
+        if frota is None:
+            frota = Grid.SHIP_CONFIG
+        self.quantidade = quantidade
+        self.tamanho = tamanho
+        self.nomes_navios = list(frota)
+        self.tamanhos_navios = np.array(list(frota.values()), dtype=np.int16)
+
+        celulas = tamanho * tamanho
+        self.navio_id = np.full(
+            (quantidade, celulas),
+            SEM_NAVIO,
+            dtype=_tipo_indice_navio(len(self.nomes_navios)),
+        )
+        self.atirado = np.zeros((quantidade, celulas), dtype=bool)
+        self.saude = np.zeros((quantidade, len(self.nomes_navios)), dtype=np.int16)
+        self.restante = np.zeros(quantidade, dtype=np.int32)
+        self.score_vezes_fui_atingido = np.zeros(quantidade, dtype=np.int32)
+        self._linhas = np.arange(quantidade)
+
+    @classmethod
+    def de_grids(cls, grids):
+        lote = cls(len(grids), grids[0].GRID_SIZE, grids[0].SHIP_CONFIG)
+        indice_navio = {nome: i for i, nome in enumerate(lote.nomes_navios)}
+        for i, grid in enumerate(grids):
+            for idx, nome in grid.navio_na_celula.items():
+                lote.navio_id[i, idx] = indice_navio[nome]
+            for nome, saude in grid.meus_navios_saude.items():
+                lote.saude[i, indice_navio[nome]] = saude
+            # Tabuleiros já em jogo: as células atiradas voltam como repeat.
+            for x, y, simbolo in grid.celulas_marcadas():
+                if simbolo in (Grid.SIMBOLO_ATINGIDO, Grid.SIMBOLO_ERRO):
+                    lote.atirado[i, y * lote.tamanho + x] = True
+            lote.score_vezes_fui_atingido[i] = grid.score_vezes_fui_atingido
+        lote.restante[:] = lote.saude.sum(axis=1)
+        return lote
+
+    def posicionar_navio(self, tabuleiro, nome, x, y, tamanho, orientacao):
+        idx_navio = self.nomes_navios.index(nome)
+        passo = 1 if orientacao == "h" else self.tamanho
+        inicio = y * self.tamanho + x
+        celulas = inicio + passo * np.arange(tamanho)
+        self.navio_id[tabuleiro, celulas] = idx_navio
+        self.saude[tabuleiro, idx_navio] = tamanho
+        self.restante[tabuleiro] = self.saude[tabuleiro].sum()
+
+    def processar_tiros(self, xs, ys):
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        codigos = np.full(self.quantidade, MISS, dtype=np.uint8)
+
+        validos = (xs >= 0) & (xs < self.tamanho) & (ys >= 0) & (ys < self.tamanho)
+        linhas = self._linhas[validos]
+        celulas = ys[validos] * self.tamanho + xs[validos]
+
+        repetidos = self.atirado[linhas, celulas]
+        codigos[linhas[repetidos]] = REPEAT
+
+        novos = ~repetidos
+        linhas = linhas[novos]
+        celulas = celulas[novos]
+        self.atirado[linhas, celulas] = True
+
+        ids = self.navio_id[linhas, celulas]
+        acertos = ids != SEM_NAVIO
+        linhas = linhas[acertos]
+        ids = ids[acertos]
+
+        self.saude[linhas, ids] -= 1
+        self.restante[linhas] -= 1
+        self.score_vezes_fui_atingido[linhas] += 1
+        codigos[linhas] = HIT
+
+        afundados = self.saude[linhas, ids] == 0
+        codigos[linhas[afundados]] = DESTROYED
+        fim = afundados & (self.restante[linhas] == 0)
+        codigos[linhas[fim]] = GAME_OVER
+        return codigos
+
+    def derrotados(self):
+        return self.restante == 0
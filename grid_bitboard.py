@@ -0,0 +1,78 @@
+from grid import Grid
+from posicionamento import mascara_navio
+
+
+class GridBitboard(Grid):
+    def __init__(self, tamanho=None, frota=None):
+        super().__init__(tamanho, frota)
+        self.ocupacao = 0
+        self.acertos = 0
+        self.erros = 0
+        self.mascaras_navios = {}
+
+    def celula(self, x, y):
+        bit = 1 << (y * self.GRID_SIZE + x)
+        if bit & self.acertos:
+            return self.SIMBOLO_ATINGIDO
+        if bit & self.erros:
+            return self.SIMBOLO_ERRO
+        return self.navio_na_celula.get(y * self.GRID_SIZE + x, self.SIMBOLO_AGUA)
+
+    def celulas_marcadas(self):
+        n = self.GRID_SIZE
+        for idx in self.navio_na_celula:
+            yield idx % n, idx // n, self.celula(idx % n, idx // n)
+        mascara = self.erros
+        while mascara:
+            bit = mascara & -mascara
+            idx = bit.bit_length() - 1
+            yield idx % n, idx // n, self.SIMBOLO_ERRO
+            mascara ^= bit
+
+    def _mascara_bloqueada(self):
+        return self.ocupacao | self.erros
+
+    def _celula_livre(self, idx):
+        return not (self._mascara_bloqueada() >> idx) & 1
+
+    def _validar_posicao(self, x, y, tamanho, orientacao):
+        limite = x if orientacao == "h" else y
+        if limite + tamanho > self.GRID_SIZE:
+            return False
+        mascara = mascara_navio(self.GRID_SIZE, x, y, tamanho, orientacao)
+        return not (mascara & self._mascara_bloqueada())
+
+    def _posicionar_navio(self, nome, x, y, tamanho, orientacao):
+        mascara = mascara_navio(self.GRID_SIZE, x, y, tamanho, orientacao)
+        self.mascaras_navios[nome] = mascara
+        self.meus_navios_saude[nome] = tamanho
+        self.navios_restantes += 1
+        self.ocupacao |= mascara
+        passo = 1 if orientacao == "h" else self.GRID_SIZE
+        inicio = y * self.GRID_SIZE + x
+        for i in range(tamanho):
+            self.navio_na_celula[inicio + i * passo] = nome
+
+    def processar_tiro(self, x, y):
+        if not (0 <= x < self.GRID_SIZE and 0 <= y < self.GRID_SIZE):
+            return "miss"
+        idx = y * self.GRID_SIZE + x
+        bit = 1 << idx
+
+        if bit & (self.acertos | self.erros):
+            return "repeat"
+
+        if not bit & self.ocupacao:
+            self.erros |= bit
+            return "miss"
+
+        nome_navio = self.navio_na_celula[idx]
+        self.acertos |= bit
+        self.meus_navios_saude[nome_navio] -= 1
+        self.score_vezes_fui_atingido += 1
+        if self.mascaras_navios[nome_navio] & ~self.acertos == 0:
+            self.navios_restantes -= 1
+            if self.ocupacao & ~self.acertos == 0:
+                return "game_over"
+            return "destroyed"
+        return "hit"
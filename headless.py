@@ -0,0 +1,149 @@
+import argparse
+import os
+import random
+import threading
+import time
+
+from espectadores import ServidorEspectadores
+from fila_eventos import FilaEventos
+from grid import Grid, configurar_partida
+from metricas import ServidorMetricas
+from motor import (
+    ESTADO_AGUARDANDO,
+    ESTADO_FIM_DE_JOGO,
+    ESTADOS_POSICIONAMENTO,
+    MotorJogo,
+)
+from p2p_node import P2PNode
+
+
+class NoHeadless(MotorJogo):
+    def __init__(
+        self,
+        atirar=True,
+        intervalo=0.5,
+        semente=None,
+        tamanho=None,
+        copias=None,
+        sala=None,
+        porta=None,
+    ):
+        self._acordar = threading.Event()
+        tamanho, frota = configurar_partida(tamanho, copias)
+        fila = FilaEventos(ao_inserir=self._acordar.set)
+        super().__init__(
+            fila, P2PNode(fila, sala=sala, porta=porta), Grid(tamanho, frota)
+        )
+        self.atirar = atirar
+        self.intervalo = intervalo
+        self.rng = random.Random(semente)
+        self._proximo_tiro = 0.0
+
+    def iniciar(self):
+        # Estado restaurado de um snapshot já traz a frota.
+        if self.estado_jogo in ESTADOS_POSICIONAMENTO:
+            self.grid.posicionar_navios_aleatorio(self.rng)
+            self.estado_jogo = ESTADO_AGUARDANDO
+        self.p2p_node.start()
+        self.p2p_node.anunciar()
+        self._proximo_tiro = time.monotonic() + self.intervalo
+
+    def _atirar_automatico(self):
+        if time.monotonic() < self._proximo_tiro:
+            return
+        self._proximo_tiro = time.monotonic() + self.intervalo
+        escolha = self.mira.escolher()
+        if escolha is None:
+            return
+        ip_alvo, x, y = escolha
+        self._log(f"[JOGO] Atirando em {ip_alvo} em ({x},{y})")
+        self.enviar_tiro(ip_alvo, x, y)
+
+    def loop_principal(self):
+        try:
+            self.iniciar()
+            while self.jogo_ativo:
+                if self.atirar:
+                    espera = max(0.0, self._proximo_tiro - time.monotonic())
+                elif self.snapshots is not None:
+                    espera = self.snapshots.intervalo
+                else:
+                    espera = None
+                self._acordar.wait(espera)
+                self._acordar.clear()
+                self.processar_eventos_rede()
+                self.celulas_alteradas.clear()
+                if self.estado_jogo == ESTADO_FIM_DE_JOGO:
+                    break
+                if self.atirar:
+                    self._atirar_automatico()
+
+        except KeyboardInterrupt:
+            self.jogo_ativo = False
+        finally:
+            self.fechar_snapshots()
+            self.fechar_diario()
+            self.p2p_node.stop()
+            self.grid.calcular_score_final()
+            print("Jogo encerrado.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nó de Batalha Naval sem interface.")
+    parser.add_argument(
+        "--passivo", action="store_true", help="apenas responde, sem atirar"
+    )
+    parser.add_argument("--intervalo", type=float, default=0.5)
+    parser.add_argument("--semente", type=int, default=None)
+    parser.add_argument("--tamanho", type=int, default=None, help="lado do tabuleiro")
+    parser.add_argument("--copias", type=int, default=None, help="cópias da frota")
+    parser.add_argument(
+        "--sala", default=None, help="nome da sala (grupo multicast próprio)"
+    )
+    parser.add_argument(
+        "--porta", type=int, default=None, help="porta UDP/TCP do nó (padrão: livre)"
+    )
+    parser.add_argument(
+        "--metricas", type=int, default=None, help="porta local do endpoint JSON"
+    )
+    parser.add_argument(
+        "--espectadores",
+        type=int,
+        default=None,
+        help="porta local do feed de espectadores (SSE)",
+    )
+    parser.add_argument("--diario", default=None, help="arquivo do diário de partida")
+    parser.add_argument(
+        "--snapshot", default=None, help="arquivo de snapshot periódico do estado"
+    )
+    parser.add_argument(
+        "--retomar",
+        action="store_true",
+        help="restaura o estado do --snapshot, se existir, em vez de começar do zero",
+    )
+    args = parser.parse_args()
+
+    no = NoHeadless(
+        not args.passivo,
+        args.intervalo,
+        args.semente,
+        args.tamanho,
+        args.copias,
+        args.sala,
+        args.porta,
+    )
+    if args.metricas is not None:
+        ServidorMetricas(no.metricas, args.metricas).iniciar()
+    if args.espectadores is not None:
+        ServidorEspectadores(no.iniciar_espectadores(), args.espectadores).iniciar()
+    if args.snapshot is not None:
+        if args.retomar and os.path.exists(args.snapshot):
+            no.restaurar_estado(args.snapshot)
+        no.iniciar_snapshots(args.snapshot)
+    if args.diario is not None:
+        no.iniciar_diario(args.diario)
+    no.loop_principal()
+
+
+if __name__ == "__main__":
+    main()
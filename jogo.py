@@ -1,6 +1,22 @@
+import argparse
+import os
+import time
+
 import pygame
-import queue
-from grid import Grid
+from espectadores import ServidorEspectadores
+from fila_eventos import FilaEventos
+from grid import Grid, configurar_partida, rotulo_linha
+from metricas import ServidorMetricas
+from motor import (
+    ESTADO_AGUARDANDO,
+    ESTADO_ATIRANDO,
+    ESTADO_ESCOLHA_POSICIONAMENTO,
+    ESTADO_ESCOLHENDO_ALVO,
+    ESTADO_FIM_DE_JOGO,
+    ESTADO_POSICIONANDO,
+    ESTADOS_POSICIONAMENTO,
+    MotorJogo,
+)
 from p2p_node import P2PNode
 
 
@@ -14,143 +30,184 @@ VERDE = (0, 150, 0)
 CELL_SIZE = 30
 MARGIN = 5
 TOP_MARGIN_Y = 100
-BOTTOM_MARGIN_Y = 150
+BOTTOM_MARGIN_Y = 190
+CELULAS_VISIVEIS = 10
+# Lista de oponentes: uma página de 3x3, cada um com a miniatura do tabuleiro.
+COLUNAS_OPONENTES = 3
+OPONENTES_POR_PAGINA = 9
+MINIATURA = 24
+LARGURA_OPONENTE = 280
+ALTURA_OPONENTE = MINIATURA + 6
 
 
-GRID_HEIGHT = (CELL_SIZE + MARGIN) * 10 + MARGIN
+GRID_HEIGHT = (CELL_SIZE + MARGIN) * CELULAS_VISIVEIS + MARGIN
 GRID_WIDTH = GRID_HEIGHT
+GRID_LABEL_X = 20
+GRID_LABEL_Y = 55
 SCREEN_WIDTH = GRID_WIDTH * 2 + 200
 SCREEN_HEIGHT = TOP_MARGIN_Y + GRID_HEIGHT + BOTTOM_MARGIN_Y
 
 
-ESTADO_POSICIONANDO = "posicionando"
-ESTADO_AGUARDANDO = "aguardando"
-ESTADO_ESCOLHENDO_ALVO = "escolhendo_alvo"
-ESTADO_ATIRANDO = "atirando"
-ESTADO_ESCOLHA_POSICIONAMENTO = "escolha_posicionamento"
-ESTADO_FIM_DE_JOGO = "fim_de_jogo"
-
+EVENTO_REDE = pygame.USEREVENT + 1
+MSG_ESCOLHER_ALVO = "Escolha um oponente: 1-9, PgUp/PgDn troca a página, 'F' filtra."
+TECLAS_ROLAGEM = (
+    pygame.K_LEFT,
+    pygame.K_RIGHT,
+    pygame.K_UP,
+    pygame.K_DOWN,
+    pygame.K_PAGEUP,
+    pygame.K_PAGEDOWN,
+)
 
-class BatalhaNavalPygame:
 
+class ListaOponentes:
+    # Com centenas de oponentes as teclas 1-9 valem para a página atual, que
+    # o filtro (trecho de ip:porta#id) reduz. A lista filtrada só é refeita
+    # quando a versão dos oponentes ou o filtro mudam.
     def __init__(self):
-        self.callback_queue = queue.Queue()
-        self.grid = Grid()
-        self.p2p_node = P2PNode(self.callback_queue)
-        self.meu_ip = self.p2p_node.MEU_IP
+        self.filtro = ""
+        self.editando = False
+        self.pagina = 0
+        self._chave = None
+        self._filtrados = []
+
+    def filtrados(self, motor):
+        chave = (motor.versao_oponentes, self.filtro)
+        if chave != self._chave:
+            if self.filtro:
+                self._filtrados = [
+                    par for par in motor.grids_oponentes if self.filtro in str(par)
+                ]
+            else:
+                self._filtrados = list(motor.grids_oponentes)
+            self._chave = chave
+        return self._filtrados
+
+    def paginas(self, motor):
+        return max(1, -(-len(self.filtrados(motor)) // OPONENTES_POR_PAGINA))
+
+    def visiveis(self, motor):
+        filtrados = self.filtrados(motor)
+        self.pagina = min(self.pagina, self.paginas(motor) - 1)
+        inicio = self.pagina * OPONENTES_POR_PAGINA
+        return filtrados[inicio : inicio + OPONENTES_POR_PAGINA]
 
-        self.grids_oponentes = {}
-        self.jogo_ativo = True
+    def rolar(self, motor, passo):
+        self.pagina = min(max(self.pagina + passo, 0), self.paginas(motor) - 1)
 
-        self.estado_jogo = ESTADO_ESCOLHA_POSICIONAMENTO
+    def filtrar(self, filtro):
+        self.filtro = filtro
+        self.pagina = 0
+
+
+class BatalhaNavalPygame(MotorJogo):
+
+    def __init__(self, tamanho=None, copias=None, sala=None, porta=None):
+        tamanho, frota = configurar_partida(tamanho, copias)
+        fila = FilaEventos(ao_inserir=self._acordar_loop)
+        super().__init__(fila, P2PNode(fila, sala=sala, porta=porta), Grid(tamanho, frota))
 
         self.status_msg = "Pressione 'A' para Aleatório ou 'M' para Manual."
-        self.navios_para_posicionar = list(Grid.SHIP_CONFIG.items())
+        self.navios_para_posicionar = list(self.grid.SHIP_CONFIG.items())
         self.navio_atual_idx = 0
         self.orientacao_atual = "h"
 
-        self.ip_alvo_atual = None
+        self.modo_salvo = False
+        self.salvo_pendente = []
+
+        self.visiveis = min(CELULAS_VISIVEIS, self.grid.GRID_SIZE)
+        self.viewport_meu = (0, 0)
+        self.viewport_oponente = (0, 0)
+        self.lista_oponentes = ListaOponentes()
 
         pygame.init()
         pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Batalha Naval P2P")
-        self.clock = pygame.time.Clock()
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
         self.font_pequena = pygame.font.SysFont("Consolas", 16)
         self.font_media = pygame.font.SysFont("Consolas", 22)
 
-    def processar_eventos_rede(self):
-        try:
-            while not self.callback_queue.empty():
-                evento = self.callback_queue.get_nowait()
-                tipo, *dados = evento
+        self._textos = {}
+        self._fundos_grid = {}
+        self._redesenhar_tudo = True
+        self._painel_anterior = None
+        self._dashboard_anterior = None
+        # par -> (marcações, superfície): só é redesenhada quando o oponente
+        # recebeu tiros novos e aparece na página.
+        self._miniaturas = {}
 
-                if tipo == "novo_participante" or tipo == "lista_participantes":
-                    ips = [dados[0]] if tipo == "novo_participante" else dados[0]
-
-                    for ip in ips:
-                        if ip != self.meu_ip and ip not in self.grids_oponentes:
-                            self.grids_oponentes[ip] = self.grid._criar_grid_vazio()
-                            print(f"[REDE] Adicionado oponente: {ip}")
-
-                    self.status_msg = "Novo(s) oponente(s)! Pressione 'A' para atirar."
-
-                elif tipo == "jogador_saiu" or tipo == "erro_conexao":
-                    ip = dados[0]
-                    self.grids_oponentes.pop(ip, None)
-                    self.status_msg = f"Jogador {ip} saiu."
-
-                    if self.ip_alvo_atual == ip:
-                        self.ip_alvo_atual = None
-                        self.estado_jogo = ESTADO_AGUARDANDO
-
-                elif tipo == "jogador_perdeu":
-                    ip = dados[0]
-                    self.grids_oponentes.pop(ip, None)
-                    self.status_msg = f"Jogador {ip} perdeu!"
-
-                elif tipo == "tiro_recebido":
-                    ip_atacante, x, y = dados
-                    self.status_msg = f"Tiro recebido de {ip_atacante}!"
-                    resultado = self.grid.processar_tiro(x, y)
-
-                    if resultado != "repeat":
-                        self.p2p_node.enviar_resposta_tcp(
-                            ip_atacante, f"{resultado}:{x}:{y}"
-                        )
+    def _acordar_loop(self):
+        pygame.event.post(pygame.event.Event(EVENTO_REDE))
 
-                    if resultado == "game_over":
-                        self.p2p_node.broadcast_udp("lost")
-                        self.estado_jogo = ESTADO_FIM_DE_JOGO
-                        self.status_msg = "VOCE PERDEU! Fim de jogo."
-
-                elif tipo == "resultado_tiro":
-                    ip_vitima, resultado, x, y = dados
-                    if ip_vitima in self.grids_oponentes:
-                        simbolo = self.grid.SIMBOLO_AGUA
-                        if resultado in ["hit", "destroyed"]:
-                            simbolo = self.grid.SIMBOLO_ATINGIDO
-                            self.grid.score_jogadores_que_atingi.add(ip_vitima)
-                        elif resultado == "miss":
-                            simbolo = self.grid.SIMBOLO_ERRO
-                        self.grids_oponentes[ip_vitima][y][x] = simbolo
-                        self.status_msg = (
-                            f"Resposta de {ip_vitima}: {resultado.upper()}!"
-                        )
-
-        except queue.Empty:
-            pass
-
-    def get_coord_from_mouse(self, pos, offset_x, offset_y):
+    def get_coord_from_mouse(self, pos, offset_x, offset_y, viewport=(0, 0)):
         x_mouse, y_mouse = pos
         x_mouse -= offset_x
         y_mouse -= offset_y
         col = x_mouse // (CELL_SIZE + MARGIN)
         lin = y_mouse // (CELL_SIZE + MARGIN)
-        if 0 <= col < Grid.GRID_SIZE and 0 <= lin < Grid.GRID_SIZE:
-            return col, lin
+        if 0 <= col < self.visiveis and 0 <= lin < self.visiveis:
+            return viewport[0] + col, viewport[1] + lin
 
         return None, None
 
+    def _rolar(self, tecla, pagina):
+        passo = self.visiveis if pagina else 1
+        dx, dy = {
+            pygame.K_LEFT: (-passo, 0),
+            pygame.K_RIGHT: (passo, 0),
+            pygame.K_UP: (0, -passo),
+            pygame.K_DOWN: (0, passo),
+            pygame.K_PAGEUP: (0, -self.visiveis),
+            pygame.K_PAGEDOWN: (0, self.visiveis),
+        }[tecla]
+        limite = self.grid.GRID_SIZE - self.visiveis
+        oponente = self.estado_jogo == ESTADO_ATIRANDO
+        vx, vy = self.viewport_oponente if oponente else self.viewport_meu
+        viewport = (min(max(vx + dx, 0), limite), min(max(vy + dy, 0), limite))
+        if oponente:
+            self.viewport_oponente = viewport
+        else:
+            self.viewport_meu = viewport
+
     def handle_events(self):
-        for event in pygame.event.get():
+        eventos = [pygame.event.wait()] + pygame.event.get()
+        for event in eventos:
             if event.type == pygame.QUIT:
                 self.jogo_ativo = False
 
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self._redesenhar_tudo = True
+
             if event.type == pygame.KEYDOWN:
+                # Digitando o filtro, as teclas são texto e não comandos.
+                if self.lista_oponentes.editando:
+                    self._editar_filtro(event)
+                    continue
+
                 if event.key == pygame.K_s:
                     self.jogo_ativo = False
 
+                if self.estado_jogo == ESTADO_ESCOLHENDO_ALVO and event.key in (
+                    pygame.K_PAGEUP,
+                    pygame.K_PAGEDOWN,
+                ):
+                    passo = -1 if event.key == pygame.K_PAGEUP else 1
+                    self.lista_oponentes.rolar(self, passo)
+                elif event.key in TECLAS_ROLAGEM:
+                    self._rolar(event.key, event.mod & pygame.KMOD_SHIFT)
+
                 if self.estado_jogo == ESTADO_ESCOLHA_POSICIONAMENTO:
                     if event.key == pygame.K_a:
                         print("[JOGO] Posicionando navios aleatoriamente...")
                         self.grid.posicionar_navios_aleatorio()
+                        self._redesenhar_tudo = True
                         self.estado_jogo = ESTADO_AGUARDANDO
                         self.status_msg = (
-                            "Navios posicionados! Pressione 'A' para atirar."
+                            "Navios posicionados! 'A' para atirar, 'I' para mira automática."
                         )
 
-                        self.p2p_node.broadcast_udp(self.p2p_node.MSG_CONECTANDO)
+                        self.p2p_node.anunciar()
 
                     elif event.key == pygame.K_m:
                         self.estado_jogo = ESTADO_POSICIONANDO
@@ -172,21 +229,57 @@ class BatalhaNavalPygame:
 
                 elif self.estado_jogo == ESTADO_AGUARDANDO and event.key == pygame.K_a:
                     self.estado_jogo = ESTADO_ESCOLHENDO_ALVO
-                    self.status_msg = "Escolha um oponente (Pressione 1, 2...)"
+                    self.status_msg = MSG_ESCOLHER_ALVO
+
+                elif self.estado_jogo == ESTADO_AGUARDANDO and event.key == pygame.K_i:
+                    escolha = self.mira.escolher()
+                    if escolha is None:
+                        self.status_msg = "Nenhum alvo disponível para a mira automática."
+                    else:
+                        ip_alvo, shot_x, shot_y = escolha
+                        print(
+                            f"[JOGO] Mira automática: {ip_alvo} em ({shot_x},{shot_y})"
+                        )
+                        self.enviar_tiro(ip_alvo, shot_x, shot_y)
+                        self.status_msg = f"Tiro automático enviado para {ip_alvo}."
+
+                elif self.estado_jogo == ESTADO_ATIRANDO:
+                    if event.key == pygame.K_v:
+                        self.modo_salvo = not self.modo_salvo
+                        self.salvo_pendente = []
+                        modo = "ativado" if self.modo_salvo else "desativado"
+                        self.status_msg = f"Modo salva {modo}."
+
+                    elif event.key == pygame.K_RETURN and self.salvo_pendente:
+                        print(
+                            f"[JOGO] Salva de {len(self.salvo_pendente)} tiros em {self.ip_alvo_atual}"
+                        )
+                        self.enviar_salvo(
+                            self.ip_alvo_atual, self.salvo_pendente
+                        )
+                        self.status_msg = f"Salva enviada para {self.ip_alvo_atual}."
+                        self.salvo_pendente = []
+                        self.estado_jogo = ESTADO_AGUARDANDO
 
                 elif self.estado_jogo == ESTADO_ESCOLHENDO_ALVO:
-                    oponentes = list(self.grids_oponentes.keys())
+                    oponentes = self.lista_oponentes.visiveis(self)
                     if event.key >= pygame.K_1 and event.key <= pygame.K_9:
                         idx = event.key - pygame.K_1
                         if idx < len(oponentes):
-                            self.ip_alvo_atual = oponentes[idx]
-                            self.estado_jogo = ESTADO_ATIRANDO
-                            self.status_msg = f"Atirando em {self.ip_alvo_atual}. Clique no grid da direita."
+                            self._mirar(oponentes[idx])
+                    elif event.key == pygame.K_f:
+                        self.lista_oponentes.editando = True
+                        self.status_msg = (
+                            f"Filtro: {self.lista_oponentes.filtro}_ "
+                            "(ENTER confirma, ESC limpa)"
+                        )
 
             if event.type == pygame.MOUSEBUTTONDOWN:
 
                 if self.estado_jogo == ESTADO_POSICIONANDO:
-                    x, y = self.get_coord_from_mouse(event.pos, 50, TOP_MARGIN_Y)
+                    x, y = self.get_coord_from_mouse(
+                        event.pos, 50, TOP_MARGIN_Y, self.viewport_meu
+                    )
 
                     if x is not None:
                         navio_nome, navio_tam = self.navios_para_posicionar[
@@ -199,16 +292,15 @@ class BatalhaNavalPygame:
                             self.grid._posicionar_navio(
                                 navio_nome, x, y, navio_tam, self.orientacao_atual
                             )
+                            self._redesenhar_tudo = True
                             self.navio_atual_idx += 1
 
                             if self.navio_atual_idx >= len(self.navios_para_posicionar):
                                 self.estado_jogo = ESTADO_AGUARDANDO
                                 self.status_msg = (
-                                    "Navios posicionados! Pressione 'A' para atirar."
-                                )
-                                self.p2p_node.broadcast_udp(
-                                    self.p2p_node.MSG_CONECTANDO
+                                    "Navios posicionados! 'A' para atirar, 'I' para mira automática."
                                 )
+                                self.p2p_node.anunciar()
                             else:
                                 next_navio_nome, next_navio_tam = (
                                     self.navios_para_posicionar[self.navio_atual_idx]
@@ -224,76 +316,148 @@ class BatalhaNavalPygame:
                     offset_oponente_x = GRID_WIDTH + 150
                     offset_oponente_y = TOP_MARGIN_Y
                     shot_x, shot_y = self.get_coord_from_mouse(
-                        event.pos, offset_oponente_x, offset_oponente_y
+                        event.pos,
+                        offset_oponente_x,
+                        offset_oponente_y,
+                        self.viewport_oponente,
                     )
 
-                    if shot_x is not None:
+                    if shot_x is not None and self.modo_salvo:
+                        if (shot_x, shot_y) not in self.salvo_pendente:
+                            self.salvo_pendente.append((shot_x, shot_y))
+                        self.status_msg = f"Salva: {len(self.salvo_pendente)} alvo(s). ENTER para disparar."
+
+                    elif shot_x is not None:
                         print(
                             f"[JOGO] Atirando em {self.ip_alvo_atual} em ({shot_x},{shot_y})"
                         )
-                        self.p2p_node.enviar_tiro(self.ip_alvo_atual, shot_x, shot_y)
+                        self.enviar_tiro(self.ip_alvo_atual, shot_x, shot_y)
                         self.status_msg = f"Tiro enviado para {self.ip_alvo_atual}."
                         self.estado_jogo = ESTADO_AGUARDANDO
                     else:
                         self.status_msg = "Clique dentro do grid do oponente!"
 
-    def draw_grid(self, grid_data, offset_x, offset_y, title):
-        self.draw_status_text(title, offset_x, offset_y - 30, color=BRANCO)
-
-        for y in range(Grid.GRID_SIZE):
-            for x in range(Grid.GRID_SIZE):
-                cor = AZUL
-                celula = grid_data[y][x]
-
-                if celula == self.grid.SIMBOLO_ERRO:
-                    cor = BRANCO
-
-                elif celula == self.grid.SIMBOLO_ATINGIDO:
-                    cor = VERMELHO
-
-                elif celula != self.grid.SIMBOLO_AGUA:
-                    cor = CINZA
+    def _mirar(self, par):
+        self.ip_alvo_atual = par
+        self.estado_jogo = ESTADO_ATIRANDO
+        self.status_msg = f"Atirando em {self.ip_alvo_atual}. Clique no grid da direita ('V' alterna salva)."
+
+    def _editar_filtro(self, event):
+        lista = self.lista_oponentes
+        if event.key == pygame.K_RETURN:
+            lista.editando = False
+            filtrados = lista.filtrados(self)
+            if len(filtrados) == 1 and self.estado_jogo == ESTADO_ESCOLHENDO_ALVO:
+                self._mirar(filtrados[0])
+                return
+        elif event.key == pygame.K_ESCAPE:
+            lista.editando = False
+            lista.filtrar("")
+        elif event.key == pygame.K_BACKSPACE:
+            lista.filtrar(lista.filtro[:-1])
+        elif event.unicode and event.unicode.isprintable():
+            lista.filtrar(lista.filtro + event.unicode)
+        if lista.editando:
+            self.status_msg = f"Filtro: {lista.filtro}_ (ENTER confirma, ESC limpa)"
+        else:
+            self.status_msg = MSG_ESCOLHER_ALVO
+
+    def _rect_celula(self, offset_x, offset_y, x, y):
+        return pygame.Rect(
+            offset_x + MARGIN + x * (CELL_SIZE + MARGIN),
+            offset_y + MARGIN + y * (CELL_SIZE + MARGIN),
+            CELL_SIZE,
+            CELL_SIZE,
+        )
 
+    def _cor_celula(self, celula):
+        if celula == self.grid.SIMBOLO_ERRO:
+            return BRANCO
+        if celula == self.grid.SIMBOLO_ATINGIDO:
+            return VERMELHO
+        if celula != self.grid.SIMBOLO_AGUA:
+            return CINZA
+        return AZUL
+
+    def _texto(self, text, color, font):
+        chave = (text, color, font)
+        superficie = self._textos.get(chave)
+        if superficie is None:
+            if len(self._textos) > 512:
+                self._textos.clear()
+            superficie = font.render(text, True, color)
+            self._textos[chave] = superficie
+        return superficie
+
+    def _fundo_grid(self, title, viewport):
+        chave = (title, viewport)
+        fundo = self._fundos_grid.get(chave)
+        if fundo is not None:
+            return fundo
+
+        titulo = self._texto(title, BRANCO, self.font_pequena)
+        largura = max(GRID_WIDTH, titulo.get_width()) + GRID_LABEL_X
+        fundo = pygame.Surface((largura, GRID_HEIGHT + GRID_LABEL_Y))
+        fundo.fill(PRETO)
+        fundo.blit(titulo, (GRID_LABEL_X, GRID_LABEL_Y - 30))
+
+        vx, vy = viewport
+        for i in range(self.visiveis):
+            fundo.blit(
+                self._texto(str(vx + i), BRANCO, self.font_pequena),
+                (
+                    GRID_LABEL_X + i * (CELL_SIZE + MARGIN) + MARGIN + (CELL_SIZE // 3),
+                    0,
+                ),
+            )
+            fundo.blit(
+                self._texto(rotulo_linha(vy + i), BRANCO, self.font_pequena),
+                (
+                    0,
+                    GRID_LABEL_Y + i * (CELL_SIZE + MARGIN) + MARGIN + (CELL_SIZE // 3),
+                ),
+            )
+            for j in range(self.visiveis):
                 pygame.draw.rect(
-                    self.screen,
-                    cor,
-                    [
-                        offset_x + MARGIN + x * (CELL_SIZE + MARGIN),
-                        offset_y + MARGIN + y * (CELL_SIZE + MARGIN),
-                        CELL_SIZE,
-                        CELL_SIZE,
-                    ],
+                    fundo, AZUL, self._rect_celula(GRID_LABEL_X, GRID_LABEL_Y, i, j)
                 )
 
-        for i in range(Grid.GRID_SIZE):
-            self.draw_status_text(
-                str(i),
-                offset_x + i * (CELL_SIZE + MARGIN) + MARGIN + (CELL_SIZE // 3),
-                offset_y - 55,
-                BRANCO,
-            )
+        if len(self._fundos_grid) > 32:
+            self._fundos_grid.clear()
+        self._fundos_grid[chave] = fundo
+        return fundo
 
-            self.draw_status_text(
-                chr(ord("A") + i),
-                offset_x - 20,
-                offset_y + i * (CELL_SIZE + MARGIN) + MARGIN + (CELL_SIZE // 3),
-                BRANCO,
-            )
+    def draw_grid(self, grid_data, offset_x, offset_y, title, viewport=(0, 0)):
+        self.screen.blit(
+            self._fundo_grid(title, viewport),
+            (offset_x - GRID_LABEL_X, offset_y - GRID_LABEL_Y),
+        )
+        # Só a janela visível é percorrida: o custo não depende do tamanho do
+        # tabuleiro.
+        vx, vy = viewport
+        for y in range(self.visiveis):
+            for x in range(self.visiveis):
+                celula = grid_data.celula(vx + x, vy + y)
+                if celula != self.grid.SIMBOLO_AGUA:
+                    pygame.draw.rect(
+                        self.screen,
+                        self._cor_celula(celula),
+                        self._rect_celula(offset_x, offset_y, x, y),
+                    )
 
     def draw_status_text(self, text, x, y, color=BRANCO, font=None):
         if font is None:
             font = self.font_pequena
 
-        text_surface = font.render(text, True, color)
-        self.screen.blit(text_surface, (x, y))
+        self.screen.blit(self._texto(text, color, font), (x, y))
 
-    def draw_ui(self):
-        self.screen.fill(PRETO)
+    def _draw_paineis(self):
         self.draw_grid(
-            self.grid.meu_grid,
+            self.grid,
             50,
             TOP_MARGIN_Y,
             "Meu Grid (Navio=Cinza, Atingido=Vermelho)",
+            self.viewport_meu,
         )
         if self.estado_jogo == ESTADO_ATIRANDO and self.ip_alvo_atual:
             grid_oponente = self.grids_oponentes[self.ip_alvo_atual]
@@ -302,6 +466,7 @@ class BatalhaNavalPygame:
                 GRID_WIDTH + 150,
                 TOP_MARGIN_Y,
                 f"Grid Oponente: {self.ip_alvo_atual}",
+                self.viewport_oponente,
             )
         else:
             pygame.draw.rect(
@@ -316,8 +481,14 @@ class BatalhaNavalPygame:
                 TOP_MARGIN_Y + 20,
             )
 
-        self.draw_status_text(f"Meu IP: {self.meu_ip}", 20, 20, BRANCO)
+        self.draw_status_text(f"Eu: {self.eu}", 20, 20, BRANCO)
+
+    def _draw_dashboard(self):
         dashboard_y_start = TOP_MARGIN_Y + GRID_HEIGHT + 30
+        area = pygame.Rect(
+            0, dashboard_y_start, SCREEN_WIDTH, SCREEN_HEIGHT - dashboard_y_start
+        )
+        self.screen.fill(PRETO, area)
 
         status_color = BRANCO
 
@@ -337,37 +508,142 @@ class BatalhaNavalPygame:
         )
 
         oponentes_y_start = dashboard_y_start + 40
-        self.draw_status_text("Oponentes:", 20, oponentes_y_start, BRANCO)
-        oponentes = list(self.grids_oponentes.keys())
+        lista = self.lista_oponentes
+        oponentes = lista.visiveis(self)
+        cabecalho = (
+            f"Oponentes: {len(lista.filtrados(self))} de {len(self.grids_oponentes)}"
+            f" (página {lista.pagina + 1}/{lista.paginas(self)})"
+        )
+        if lista.filtro:
+            cabecalho += f" filtro '{lista.filtro}'"
+        self.draw_status_text(cabecalho, 20, oponentes_y_start, BRANCO)
 
         if not oponentes:
             self.draw_status_text("  Nenhum", 20, oponentes_y_start + 25)
 
-        for i, ip in enumerate(oponentes):
-            label = f"  {i+1}: {ip}"
-            if self.estado_jogo == ESTADO_ESCOLHENDO_ALVO:
-                self.draw_status_text(
-                    label, 20, oponentes_y_start + 25 + (i * 20), VERDE
-                )
+        # Só a página visível é desenhada: o custo do quadro não cresce com o
+        # número de oponentes.
+        cor = VERDE if self.estado_jogo == ESTADO_ESCOLHENDO_ALVO else BRANCO
+        for i, par in enumerate(oponentes):
+            x = 20 + (i % COLUNAS_OPONENTES) * LARGURA_OPONENTE
+            y = oponentes_y_start + 25 + (i // COLUNAS_OPONENTES) * ALTURA_OPONENTE
+            self.screen.blit(self._miniatura(par), (x, y))
+            self.draw_status_text(f"{i + 1}: {par}", x + MINIATURA + 6, y + 4, cor)
+        return area
+
+    def _miniatura(self, par):
+        oponente = self.grids_oponentes[par]
+        cache = self._miniaturas.get(par)
+        if cache is not None and cache[0] == oponente.marcacoes:
+            return cache[1]
+        if cache is not None:
+            superficie = cache[1]
+        else:
+            superficie = pygame.Surface((MINIATURA, MINIATURA))
+        superficie.fill(AZUL)
+        for x, y, simbolo in oponente.celulas_marcadas():
+            self._pintar_miniatura(superficie, oponente.GRID_SIZE, x, y, simbolo)
+        if len(self._miniaturas) > len(self.grids_oponentes) + OPONENTES_POR_PAGINA:
+            # Descarta as miniaturas de quem saiu.
+            self._miniaturas = {
+                p: m for p, m in self._miniaturas.items() if p in self.grids_oponentes
+            }
+        self._miniaturas[par] = (oponente.marcacoes, superficie)
+        return superficie
+
+    def _pintar_miniatura(self, superficie, n, x, y, simbolo):
+        # Vários tiros caem no mesmo pixel em tabuleiros grandes: o acerto
+        # prevalece sobre erro e água.
+        lado = max(1, MINIATURA // n)
+        ponto = (x * MINIATURA // n, y * MINIATURA // n)
+        if simbolo != self.grid.SIMBOLO_ATINGIDO and lado == 1:
+            if superficie.get_at(ponto)[:3] == VERMELHO:
+                return
+        superficie.fill(self._cor_celula(simbolo), (*ponto, lado, lado))
+
+    def _draw_celulas_sujas(self):
+        retangulos = []
+        for dono, x, y in self.celulas_alteradas:
+            if dono is None:
+                grid_data, offset_x = self.grid, 50
+                vx, vy = self.viewport_meu
+            elif dono == self.ip_alvo_atual and self.estado_jogo == ESTADO_ATIRANDO:
+                grid_data, offset_x = self.grids_oponentes[dono], GRID_WIDTH + 150
+                vx, vy = self.viewport_oponente
             else:
-                self.draw_status_text(
-                    label, 20, oponentes_y_start + 25 + (i * 20), BRANCO
-                )
+                # Miniatura já desenhada: só o pixel do tiro muda.
+                cache = self._miniaturas.get(dono)
+                oponente = self.grids_oponentes.get(dono)
+                if cache is not None and oponente is not None:
+                    self._pintar_miniatura(
+                        cache[1], oponente.GRID_SIZE, x, y, oponente.celula(x, y)
+                    )
+                    self._miniaturas[dono] = (oponente.marcacoes, cache[1])
+                continue
+            if not (0 <= x - vx < self.visiveis and 0 <= y - vy < self.visiveis):
+                continue
+            rect = self._rect_celula(offset_x, TOP_MARGIN_Y, x - vx, y - vy)
+            cor = self._cor_celula(grid_data.celula(x, y))
+            pygame.draw.rect(self.screen, cor, rect)
+            retangulos.append(rect)
+        return retangulos
 
-        pygame.display.flip()
+    def draw_ui(self):
+        painel = (
+            self.estado_jogo == ESTADO_ATIRANDO,
+            self.ip_alvo_atual,
+            self.viewport_meu,
+            self.viewport_oponente,
+        )
+        lista = self.lista_oponentes
+        visiveis = lista.visiveis(self)
+        dashboard = (
+            self.status_msg,
+            self.estado_jogo,
+            self.versao_oponentes,
+            lista.pagina,
+            lista.filtro,
+            tuple(self.grids_oponentes[par].marcacoes for par in visiveis),
+        )
+        if painel != self._painel_anterior:
+            self._redesenhar_tudo = True
+
+        if self._redesenhar_tudo:
+            self.screen.fill(PRETO)
+            self._draw_paineis()
+            self._draw_dashboard()
+            pygame.display.flip()
+        else:
+            retangulos = self._draw_celulas_sujas()
+            if dashboard != self._dashboard_anterior:
+                retangulos.append(self._draw_dashboard())
+            if retangulos:
+                pygame.display.update(retangulos)
+
+        self._redesenhar_tudo = False
+        self.celulas_alteradas.clear()
+        self._painel_anterior = painel
+        self._dashboard_anterior = dashboard
 
     def loop_principal(self):
         try:
             self.p2p_node.start()
+            if self.estado_jogo not in ESTADOS_POSICIONAMENTO:
+                # Retomada de um snapshot: a frota já está no tabuleiro.
+                self.status_msg = "Partida retomada! 'A' para atirar."
+                self.p2p_node.anunciar()
             while self.jogo_ativo:
-                self.clock.tick(10) 
+                inicio = time.perf_counter()
+                self.draw_ui()
+                self.metricas.observar("quadro_ui_s", time.perf_counter() - inicio)
                 self.handle_events()
                 self.processar_eventos_rede()
-                self.draw_ui()
 
         except KeyboardInterrupt:
             self.jogo_ativo = False
         finally:
+            self.fechar_snapshots()
+            self.fechar_diario()
             self.p2p_node.stop()
             self.grid.calcular_score_final()
             pygame.quit()
@@ -375,7 +651,45 @@ class BatalhaNavalPygame:
 
 
 if __name__ == "__main__":
-
-    jogo = BatalhaNavalPygame()
+    parser = argparse.ArgumentParser(description="Batalha Naval P2P.")
+    parser.add_argument("--tamanho", type=int, default=None, help="lado do tabuleiro")
+    parser.add_argument("--copias", type=int, default=None, help="cópias da frota")
+    parser.add_argument(
+        "--sala", default=None, help="nome da sala (grupo multicast próprio)"
+    )
+    parser.add_argument(
+        "--porta", type=int, default=None, help="porta UDP/TCP do nó (padrão: livre)"
+    )
+    parser.add_argument(
+        "--metricas", type=int, default=None, help="porta local do endpoint JSON"
+    )
+    parser.add_argument(
+        "--espectadores",
+        type=int,
+        default=None,
+        help="porta local do feed de espectadores (SSE)",
+    )
+    parser.add_argument("--diario", default=None, help="arquivo do diário de partida")
+    parser.add_argument(
+        "--snapshot", default=None, help="arquivo de snapshot periódico do estado"
+    )
+    parser.add_argument(
+        "--retomar",
+        action="store_true",
+        help="restaura o estado do --snapshot, se existir, em vez de começar do zero",
+    )
+    args = parser.parse_args()
+
+    jogo = BatalhaNavalPygame(args.tamanho, args.copias, args.sala, args.porta)
+    if args.metricas is not None:
+        ServidorMetricas(jogo.metricas, args.metricas).iniciar()
+    if args.espectadores is not None:
+        ServidorEspectadores(jogo.iniciar_espectadores(), args.espectadores).iniciar()
+    if args.snapshot is not None:
+        if args.retomar and os.path.exists(args.snapshot):
+            jogo.restaurar_estado(args.snapshot)
+        jogo.iniciar_snapshots(args.snapshot)
+    if args.diario is not None:
+        jogo.iniciar_diario(args.diario)
 
     jogo.loop_principal()
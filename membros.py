@@ -0,0 +1,101 @@
+import math
+import zlib
+
+VIVO = 0
+SAIU = 1
+
+
+def _hash_entrada(membro, geracao, estado):
+    return zlib.crc32(f"{membro}|{geracao}|{estado}".encode("utf-8"))
+
+
+class VisaoMembros:
+    RETRANSMISSOES_POR_LOG = 3
+
+    def __init__(self, meu_id, geracao):
+        self.meu_id = meu_id
+        self.entradas = {}
+        self.digest = 0
+        self.rumores = {}
+        self.atualizar(meu_id, geracao, VIVO)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    @property
+    def geracao(self):
+        return self.entradas[self.meu_id][0]
+
+    def _retransmissoes(self):
+        log_n = math.ceil(math.log2(len(self.entradas) + 1))
+        return self.RETRANSMISSOES_POR_LOG * log_n
+
+    def atualizar(self, membro, geracao, estado):
+        atual = self.entradas.get(membro)
+        if atual is not None and (geracao, estado) <= atual:
+            return None
+        if atual is not None:
+            self.digest ^= _hash_entrada(membro, *atual)
+        self.entradas[membro] = (geracao, estado)
+        self.digest ^= _hash_entrada(membro, geracao, estado)
+        self.rumores[membro] = self._retransmissoes()
+
+        estava_vivo = atual is not None and atual[1] == VIVO
+        if estado == VIVO and not estava_vivo:
+            return VIVO
+        if estado == SAIU and estava_vivo:
+            return SAIU
+        return None
+
+    def marcar_saida(self, membro):
+        atual = self.entradas.get(membro)
+        if atual is None or atual[1] == SAIU:
+            return None
+        return self.atualizar(membro, atual[0], SAIU)
+
+    def refutar(self, geracao_vista):
+        # Alguém nos dá como saídos (ou numa geração à frente da nossa): a
+        # nossa entrada volta como viva numa geração maior que as duas, e o
+        # rumor leva o desmentido adiante.
+        geracao = (max(geracao_vista, self.geracao) + 1) & 0xFFFFFFFF
+        self.atualizar(self.meu_id, geracao, VIVO)
+        return geracao
+
+    def mesclar(self, entradas):
+        novos = []
+        removidos = []
+        for membro, geracao, estado in entradas:
+            if membro == self.meu_id:
+                if (geracao, estado) > self.entradas[membro]:
+                    self.refutar(geracao)
+                continue
+            mudanca = self.atualizar(membro, geracao, estado)
+            if mudanca == VIVO:
+                novos.append(membro)
+            elif mudanca == SAIU:
+                removidos.append(membro)
+        return novos, removidos
+
+    def vivos(self):
+        return [m for m, (_, estado) in self.entradas.items() if estado == VIVO]
+
+    def esta_vivo(self, membro):
+        atual = self.entradas.get(membro)
+        return atual is not None and atual[1] == VIVO
+
+    def conhece(self, membro):
+        return membro in self.entradas
+
+    def todas(self):
+        return [(m, g, e) for m, (g, e) in self.entradas.items()]
+
+    def rumores_para_envio(self, limite):
+        escolhidos = sorted(self.rumores.items(), key=lambda r: -r[1])[:limite]
+        entradas = []
+        for membro, restantes in escolhidos:
+            if restantes <= 1:
+                del self.rumores[membro]
+            else:
+                self.rumores[membro] = restantes - 1
+            entradas.append((membro, *self.entradas[membro]))
+        return entradas
@@ -0,0 +1,190 @@
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Baldes em progressão geométrica de razão 2^(1/4) (~19%): de ~1 µs a ~76 s.
+LIMITES_TEMPO = tuple(2.0 ** (e / 4) for e in range(-80, 25))
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_TEMPO):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)
+        self.contagem = 0
+        self.soma = 0
+        self.minimo = float("inf")
+        self.maximo = float("-inf")
+
+    def registrar(self, valor):
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p):
+        # Limite superior do balde que contém o percentil, preso a [min, max].
+        if not self.contagem:
+            return 0
+        alvo = p / 100 * self.contagem
+        acumulado = 0
+        for i, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                break
+        limite = self.limites[i] if i < len(self.limites) else self.maximo
+        return min(max(limite, self.minimo), self.maximo)
+
+    def resumo(self):
+        if not self.contagem:
+            return {"contagem": 0}
+        return {
+            "contagem": self.contagem,
+            "media": self.soma / self.contagem,
+            "min": self.minimo,
+            "max": self.maximo,
+            "p50": self.percentil(50),
+            "p90": self.percentil(90),
+            "p99": self.percentil(99),
+        }
+
+
+class Metricas:
+    ativa = True
+
+    def __init__(self, nomes_tipo=None):
+        self.nomes_tipo = nomes_tipo or {}
+        self.inicio = time.monotonic()
+        self.contadores = defaultdict(int)
+        # Por sentido, quantidade e bytes em listas indexadas pelo tipo (um byte).
+        self.mensagens = {
+            sentido: ([0] * 256, [0] * 256) for sentido in ("entrada", "saida")
+        }
+        self.histogramas = {}
+        self.medidores = {}
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] += quantidade
+
+    def contar_mensagem(self, sentido, tipo, tamanho):
+        quantidades, tamanhos = self.mensagens[sentido]
+        quantidades[tipo] += 1
+        tamanhos[tipo] += tamanho
+
+    def histograma(self, nome, rotulo=None):
+        por_rotulo = self.histogramas.get(nome)
+        if por_rotulo is None:
+            por_rotulo = self.histogramas[nome] = {}
+        histograma = por_rotulo.get(rotulo)
+        if histograma is None:
+            histograma = por_rotulo[rotulo] = Histograma()
+        return histograma
+
+    def observar(self, nome, valor, rotulo=None):
+        self.histograma(nome, rotulo).registrar(valor)
+
+    def esquecer(self, rotulo):
+        # Histogramas por par: sem isto cada par que passa pela sala fica na
+        # memória (e no snapshot) para sempre.
+        for por_rotulo in list(self.histogramas.values()):
+            por_rotulo.pop(rotulo, None)
+
+    def medir(self, nome, funcao):
+        self.medidores[nome] = funcao
+
+    def snapshot(self):
+        # Cópias rasas primeiro: os dicionários podem crescer em outra thread.
+        mensagens = {
+            sentido: {
+                self.nomes_tipo.get(tipo, str(tipo)): {
+                    "mensagens": quantidade,
+                    "bytes": tamanhos[tipo],
+                }
+                for tipo, quantidade in enumerate(quantidades)
+                if quantidade
+            }
+            for sentido, (quantidades, tamanhos) in self.mensagens.items()
+        }
+
+        histogramas = {}
+        for nome, por_rotulo in list(self.histogramas.items()):
+            # Rótulos podem ser pares (tuplas): o JSON só aceita chaves texto.
+            resumos = {
+                rotulo if rotulo is None else str(rotulo): histograma.resumo()
+                for rotulo, histograma in list(por_rotulo.items())
+            }
+            # Sem rótulo, o histograma aparece direto sob o nome.
+            histogramas[nome] = resumos.pop(None, None) or resumos
+
+        return {
+            "tempo_ativo_s": time.monotonic() - self.inicio,
+            "contadores": dict(self.contadores),
+            "medidores": {
+                nome: funcao() for nome, funcao in list(self.medidores.items())
+            },
+            "mensagens": mensagens,
+            "histogramas": histogramas,
+        }
+
+
+class MetricasDesligadas(Metricas):
+    ativa = False
+
+    def contar(self, nome, quantidade=1):
+        pass
+
+    def contar_mensagem(self, sentido, tipo, tamanho):
+        pass
+
+    def observar(self, nome, valor, rotulo=None):
+        pass
+
+
+class _TratadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metricas"):
+            self.send_error(404)
+            return
+        corpo = json.dumps(self.server.metricas.snapshot(), indent=1).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorMetricas:
+    def __init__(self, metricas, porta=0, endereco="127.0.0.1"):
+        self.metricas = metricas
+        self.endereco = endereco
+        self.porta = porta
+        self._servidor = None
+        self._thread = None
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(
+            (self.endereco, self.porta), _TratadorMetricas
+        )
+        self._servidor.daemon_threads = True
+        self._servidor.metricas = self.metricas
+        self.porta = self._servidor.server_address[1]
+        self._thread = threading.Thread(
+            target=self._servidor.serve_forever, daemon=True
+        )
+        self._thread.start()
+        print(f"[METRICAS] http://{self.endereco}:{self.porta}/metricas")
+        return self.porta
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -0,0 +1,261 @@
+import random
+from collections import Counter
+from functools import lru_cache
+
+from grid import Grid
+from posicionamento import indice_posicionamento
+
+PESO_ACERTO = 20
+# O mapa de calor guarda O(tamanho_grid²) por oponente; acima disso usa-se a
+# busca esparsa, que só guarda as células atiradas.
+LIMITE_MAPA_CALOR = 32
+TENTATIVAS_BUSCA = 64
+
+
+@lru_cache(maxsize=None)
+def _tabela_posicoes(tamanho_grid, tamanho):
+    mascaras = []
+    celulas = []
+    for mascara, x, y, orientacao in indice_posicionamento(tamanho_grid).posicoes(
+        tamanho
+    ):
+        passo = 1 if orientacao == "h" else tamanho_grid
+        inicio = y * tamanho_grid + x
+        mascaras.append(mascara)
+        celulas.append(tuple(inicio + i * passo for i in range(tamanho)))
+
+    por_celula = [[] for _ in range(tamanho_grid * tamanho_grid)]
+    for p, celulas_p in enumerate(celulas):
+        for c in celulas_p:
+            por_celula[c].append(p)
+    return mascaras, celulas, por_celula
+
+
+class MapaCalor:
+    def __init__(self, tamanho_grid=Grid.GRID_SIZE, frota=None):
+        if frota is None:
+            frota = Grid.SHIP_CONFIG
+        self.tamanho_grid = tamanho_grid
+        self.restantes = Counter(frota.values())
+        self.calor = [0] * (tamanho_grid * tamanho_grid)
+        self.atirado = bytearray(tamanho_grid * tamanho_grid)
+        self.acertos = 0
+        # Células que deram "repeat": atiradas por outro jogador, com conteúdo
+        # desconhecido. Não voltam a ser escolhidas, mas não invalidam as
+        # posições que passam por elas.
+        self.desconhecidas = 0
+
+        self.tabelas = {}
+        self.valida = {}
+        self.cobertos = {}
+        for tamanho, quantidade in self.restantes.items():
+            tabela = _tabela_posicoes(tamanho_grid, tamanho)
+            self.tabelas[tamanho] = tabela
+            self.valida[tamanho] = bytearray(b"\x01") * len(tabela[1])
+            self.cobertos[tamanho] = [0] * len(tabela[1])
+            for celulas_p in tabela[1]:
+                for c in celulas_p:
+                    self.calor[c] += quantidade
+
+    def _peso(self, tamanho, p):
+        return self.restantes[tamanho] * (1 + PESO_ACERTO * self.cobertos[tamanho][p])
+
+    def _somar(self, tamanho, p, delta):
+        if delta:
+            calor = self.calor
+            for c in self.tabelas[tamanho][1][p]:
+                calor[c] += delta
+
+    def _invalidar_celula(self, c):
+        for tamanho, (_, _, por_celula) in self.tabelas.items():
+            valida = self.valida[tamanho]
+            for p in por_celula[c]:
+                if valida[p]:
+                    valida[p] = 0
+                    self._somar(tamanho, p, -self._peso(tamanho, p))
+
+    def registrar_erro(self, x, y):
+        c = y * self.tamanho_grid + x
+        if self.atirado[c]:
+            return
+        self.atirado[c] = 1
+        self._invalidar_celula(c)
+
+    def registrar_bloqueio(self, x, y):
+        c = y * self.tamanho_grid + x
+        if self.atirado[c]:
+            return
+        self.atirado[c] = 1
+        self.desconhecidas |= 1 << c
+
+    def registrar_acerto(self, x, y):
+        c = y * self.tamanho_grid + x
+        if self.atirado[c]:
+            return
+        self.atirado[c] = 1
+        self.acertos |= 1 << c
+        for tamanho, (_, _, por_celula) in self.tabelas.items():
+            valida = self.valida[tamanho]
+            cobertos = self.cobertos[tamanho]
+            for p in por_celula[c]:
+                if valida[p]:
+                    antes = self._peso(tamanho, p)
+                    cobertos[p] += 1
+                    self._somar(tamanho, p, self._peso(tamanho, p) - antes)
+
+    def registrar_afundado(self, x, y):
+        self.registrar_acerto(x, y)
+        c = y * self.tamanho_grid + x
+
+        # Primeiro só com acertos nossos; se nenhuma posição fecha, o navio
+        # passa por células desconhecidas que outro jogador acertou.
+        afundado = None
+        for conhecidas in (self.acertos, self.acertos | self.desconhecidas):
+            for tamanho in sorted(self.restantes, reverse=True):
+                if not self.restantes[tamanho]:
+                    continue
+                mascaras, celulas, por_celula = self.tabelas[tamanho]
+                for p in por_celula[c]:
+                    if mascaras[p] & ~conhecidas == 0:
+                        afundado = (tamanho, celulas[p])
+                        break
+                if afundado:
+                    break
+            if afundado:
+                break
+        if afundado is None:
+            return
+
+        tamanho, celulas_afundadas = afundado
+        valida = self.valida[tamanho]
+        cobertos = self.cobertos[tamanho]
+        for p in range(len(valida)):
+            if valida[p]:
+                self._somar(tamanho, p, -(1 + PESO_ACERTO * cobertos[p]))
+        self.restantes[tamanho] -= 1
+
+        for c_afundada in celulas_afundadas:
+            self.acertos &= ~(1 << c_afundada)
+            self.desconhecidas &= ~(1 << c_afundada)
+            self._invalidar_celula(c_afundada)
+
+    def registrar_resultado(self, resultado, x, y):
+        if resultado == "miss":
+            self.registrar_erro(x, y)
+        elif resultado == "repeat":
+            self.registrar_bloqueio(x, y)
+        elif resultado == "hit":
+            self.registrar_acerto(x, y)
+        elif resultado in ("destroyed", "game_over"):
+            self.registrar_afundado(x, y)
+
+    def melhor_celula(self):
+        melhor = -1
+        melhor_c = None
+        atirado = self.atirado
+        for c, valor in enumerate(self.calor):
+            if valor > melhor and not atirado[c]:
+                melhor = valor
+                melhor_c = c
+        if melhor_c is None:
+            return None
+        return melhor, melhor_c % self.tamanho_grid, melhor_c // self.tamanho_grid
+
+
+class BuscaEsparsa:
+    PRIORIDADE_ALVO = 2
+    PRIORIDADE_CACA = 1
+
+    def __init__(self, tamanho_grid, rng=random):
+        self.tamanho_grid = tamanho_grid
+        self.rng = rng
+        self.atirado = set()
+        self.vizinhos = []
+
+    def registrar_resultado(self, resultado, x, y):
+        n = self.tamanho_grid
+        self.atirado.add(y * n + x)
+        if resultado in ("hit", "destroyed", "game_over"):
+            for vx, vy in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if 0 <= vx < n and 0 <= vy < n:
+                    self.vizinhos.append(vy * n + vx)
+
+    def melhor_celula(self):
+        n = self.tamanho_grid
+        while self.vizinhos:
+            c = self.vizinhos[-1]
+            if c not in self.atirado:
+                return self.PRIORIDADE_ALVO, c % n, c // n
+            self.vizinhos.pop()
+
+        # Caça em xadrez: todo navio tem tamanho >= 2 e cobre as duas cores.
+        for _ in range(TENTATIVAS_BUSCA):
+            x = self.rng.randrange(n)
+            y = self.rng.randrange(n)
+            if (x + y) % 2 == 0 and y * n + x not in self.atirado:
+                return self.PRIORIDADE_CACA, x, y
+        for c in range(n * n):
+            if c not in self.atirado:
+                return self.PRIORIDADE_CACA, c % n, c // n
+        return None
+
+
+class Mira:
+    def __init__(self, tamanho_grid=Grid.GRID_SIZE, frota=None, rng=random):
+        self.tamanho_grid = tamanho_grid
+        self.frota = frota
+        self.rng = rng
+        # Oponente ainda sem tiros fica com None: todos compartilham o mesmo
+        # mapa intocado até o primeiro resultado (com centenas de oponentes,
+        # um mapa de calor por cabeça custaria mais que os tabuleiros).
+        self.mapas = {}
+        self.suspensos = set()
+        self._intocado = None
+
+    def _novo_mapa(self):
+        if self.tamanho_grid <= LIMITE_MAPA_CALOR:
+            return MapaCalor(self.tamanho_grid, self.frota)
+        return BuscaEsparsa(self.tamanho_grid, self.rng)
+
+    def adicionar_oponente(self, ip):
+        self.mapas.setdefault(ip, None)
+
+    def remover_oponente(self, ip):
+        self.mapas.pop(ip, None)
+        self.suspensos.discard(ip)
+
+    def suspender(self, ip):
+        if ip in self.mapas:
+            self.suspensos.add(ip)
+
+    def retomar(self, ip):
+        self.suspensos.discard(ip)
+
+    def registrar_resultado(self, ip, resultado, x, y):
+        if ip not in self.mapas:
+            return
+        mapa = self.mapas[ip]
+        if mapa is None:
+            mapa = self.mapas[ip] = self._novo_mapa()
+        mapa.registrar_resultado(resultado, x, y)
+
+    def escolher(self):
+        melhor = None
+        intocada = None
+        for ip, mapa in self.mapas.items():
+            if ip in self.suspensos:
+                continue
+            if mapa is not None:
+                candidata = mapa.melhor_celula()
+            elif intocada is not None:
+                # Mesma candidata para todos os intocados: só o primeiro conta.
+                continue
+            else:
+                if self._intocado is None:
+                    self._intocado = self._novo_mapa()
+                candidata = intocada = self._intocado.melhor_celula()
+            if candidata is not None and (melhor is None or candidata[0] > melhor[0]):
+                melhor = (candidata[0], ip, candidata[1], candidata[2])
+        if melhor is None:
+            return None
+        return melhor[1:]
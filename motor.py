@@ -0,0 +1,396 @@
+import queue
+import time
+
+import diario
+import espectadores
+import protocolo
+import snapshot
+from fila_eventos import FilaEventos
+from grid import Grid, GridOponente
+from mira import Mira
+from p2p_node import P2PNode
+
+ESTADO_POSICIONANDO = "posicionando"
+ESTADO_AGUARDANDO = "aguardando"
+ESTADO_ESCOLHENDO_ALVO = "escolhendo_alvo"
+ESTADO_ATIRANDO = "atirando"
+ESTADO_ESCOLHA_POSICIONAMENTO = "escolha_posicionamento"
+ESTADO_FIM_DE_JOGO = "fim_de_jogo"
+
+ESTADOS = (
+    ESTADO_POSICIONANDO,
+    ESTADO_AGUARDANDO,
+    ESTADO_ESCOLHENDO_ALVO,
+    ESTADO_ATIRANDO,
+    ESTADO_ESCOLHA_POSICIONAMENTO,
+    ESTADO_FIM_DE_JOGO,
+)
+ESTADOS_POSICIONAMENTO = (ESTADO_ESCOLHA_POSICIONAMENTO, ESTADO_POSICIONANDO)
+
+
+class MotorJogo:
+    def __init__(self, callback_queue=None, p2p_node=None, grid=None):
+        if callback_queue is None:
+            callback_queue = FilaEventos()
+        self.callback_queue = callback_queue
+        self.grid = grid if grid is not None else Grid()
+        if p2p_node is None:
+            p2p_node = P2PNode(self.callback_queue)
+        self.p2p_node = p2p_node
+        self.p2p_node.config_jogo = self.grid.config_jogo()
+        self.metricas = self.p2p_node.metricas
+        self.callback_queue.instrumentar(self.metricas)
+        self.eu = self.p2p_node.eu
+
+        self.grids_oponentes = {}
+        # Muda a cada entrada ou saída de oponente: a interface só refaz a
+        # lista (filtro, páginas) quando ela muda.
+        self.versao_oponentes = 0
+        self.mira = Mira(self.grid.GRID_SIZE, self.grid.SHIP_CONFIG)
+        self.jogo_ativo = True
+        self.verboso = True
+        self.diario = None
+        self.snapshots = None
+        self.espectadores = None
+
+        self._estado_jogo = None
+        self.estado_jogo = ESTADO_ESCOLHA_POSICIONAMENTO
+        self.status_msg = ""
+        self.ip_alvo_atual = None
+        self.celulas_alteradas = set()
+
+    @property
+    def estado_jogo(self):
+        return self._estado_jogo
+
+    @estado_jogo.setter
+    def estado_jogo(self, estado):
+        anterior = self._estado_jogo
+        self._estado_jogo = estado
+        if estado == anterior:
+            return
+        posicionou = (
+            anterior in ESTADOS_POSICIONAMENTO and estado not in ESTADOS_POSICIONAMENTO
+        )
+        if posicionou and self.espectadores is not None:
+            # A frota nova não passa por celulas_alteradas: retrato para todos.
+            self.espectadores.invalidar()
+        if self.diario is None:
+            return
+        if posicionou:
+            self.diario.registrar_frota(self.grid)
+        self.diario.registrar(diario.ESTADO, valor=ESTADOS.index(estado))
+
+    def iniciar_diario(self, caminho):
+        self.diario = diario.Diario(
+            caminho,
+            {
+                "ip": self.eu.ip,
+                "porta": self.eu.porta,
+                "id": self.eu.id,
+                "geracao": self.p2p_node.geracao,
+                "inicio": time.time(),
+                "tamanho": self.grid.GRID_SIZE,
+                "frota": list(self.grid.SHIP_CONFIG.items()),
+                "estados": ESTADOS,
+            },
+        )
+        if self.estado_jogo not in ESTADOS_POSICIONAMENTO:
+            self.diario.registrar_frota(self.grid)
+            # Depois de restaurar_estado o tabuleiro já pode ter levado tiros.
+            self.diario.registrar_restauracao(self.grid)
+        self.diario.registrar(diario.ESTADO, valor=ESTADOS.index(self.estado_jogo))
+
+    def fechar_diario(self):
+        if self.diario is not None:
+            self.diario.fechar()
+            self.diario = None
+
+    def iniciar_snapshots(self, caminho, intervalo=snapshot.Snapshots.INTERVALO):
+        self.snapshots = snapshot.Snapshots(caminho, intervalo)
+
+    def fechar_snapshots(self):
+        if self.snapshots is not None:
+            if self.estado_jogo not in ESTADOS_POSICIONAMENTO:
+                self.snapshots.fechar(self)
+            else:
+                self.snapshots.fechar()
+            self.snapshots = None
+
+    def iniciar_espectadores(self):
+        self.espectadores = espectadores.FeedEspectadores(self.callback_queue)
+        return self.espectadores
+
+    def restaurar_estado(self, caminho):
+        metadados, secoes = snapshot.carregar(caminho)
+        grid = self.grid
+        frota = dict(metadados["frota"])
+        if (metadados["tamanho"], frota) != (grid.GRID_SIZE, grid.SHIP_CONFIG):
+            raise ValueError(
+                f"snapshot de outra configuração ({metadados['tamanho']}x"
+                f"{metadados['tamanho']}, {len(frota)} navios)"
+            )
+        if grid.navio_na_celula:
+            raise ValueError("o tabuleiro já tem navios posicionados")
+
+        n = grid.GRID_SIZE
+        nomes = list(frota)
+        navios = secoes["navios"]
+        for i in range(0, len(navios), 4):
+            indice, x, y, vertical = navios[i : i + 4]
+            nome = nomes[indice]
+            grid._posicionar_navio(nome, x, y, frota[nome], "v" if vertical else "h")
+        grid.acertos.update(secoes["acertos"])
+        grid.erros.update(secoes["erros"])
+        grid.meus_navios_saude.update(metadados["saude"])
+        grid.navios_restantes = metadados["navios_restantes"]
+        grid.score_vezes_fui_atingido = metadados["vezes_fui_atingido"]
+        # No JSON os pares viram listas [ip, porta, id].
+        grid.score_jogadores_que_atingi.update(
+            protocolo.Par(*par) for par in metadados["jogadores_que_atingi"]
+        )
+
+        for nome, par in metadados["oponentes"].items():
+            par = protocolo.Par(*par)
+            oponente = self.grids_oponentes[par] = GridOponente(n)
+            self.versao_oponentes += 1
+            acertos, erros = secoes[f"{nome}/acertos"], secoes[f"{nome}/erros"]
+            bloqueados = secoes.get(f"{nome}/bloqueados", ())
+            afundados = secoes.get(f"{nome}/afundados", ())
+            oponente.restaurar(acertos, erros, bloqueados, afundados)
+            self.mira.adicionar_oponente(par)
+            # Os afundamentos por último e na ordem em que chegaram: cada um
+            # encontra os acertos do navio e o tira da mira, como na partida.
+            ultimos = set(afundados)
+            for resultado, indices in (
+                ("hit", [idx for idx in acertos if idx not in ultimos]),
+                ("miss", erros),
+                ("repeat", bloqueados),
+                ("destroyed", afundados),
+            ):
+                for idx in indices:
+                    self.mira.registrar_resultado(par, resultado, idx % n, idx // n)
+
+        self.p2p_node.retomar(
+            [
+                (protocolo.Par(*membro), geracao, estado)
+                for membro, geracao, estado in metadados["membros"]
+            ],
+            metadados["geracao"],
+            protocolo.Par(*metadados["eu"]),
+        )
+        self.eu = self.p2p_node.eu
+        # Estados intermediários da interface (mirando, atirando) não voltam.
+        if metadados["estado"] == ESTADO_FIM_DE_JOGO:
+            self.estado_jogo = ESTADO_FIM_DE_JOGO
+        else:
+            self.estado_jogo = ESTADO_AGUARDANDO
+        alvo = metadados["alvo"]
+        if alvo is not None and protocolo.Par(*alvo) in self.grids_oponentes:
+            self.ip_alvo_atual = protocolo.Par(*alvo)
+        self._log(
+            f"[JOGO] Estado restaurado de {caminho}: {grid.navios_restantes} "
+            f"navio(s), {len(self.grids_oponentes)} oponente(s)."
+        )
+
+    def _log(self, mensagem):
+        if self.verboso:
+            print(mensagem)
+
+    def enviar_tiro(self, ip_alvo, x, y):
+        if self.diario is not None:
+            self.diario.registrar(diario.TIRO_ENVIADO, ip_alvo, x, y)
+        self.p2p_node.enviar_tiro(ip_alvo, x, y)
+
+    def enviar_salvo(self, ip_alvo, coords):
+        if self.diario is not None:
+            for x, y in coords:
+                self.diario.registrar(diario.TIRO_ENVIADO, ip_alvo, x, y)
+        self.p2p_node.enviar_salvo(ip_alvo, coords)
+
+    def processar_eventos_rede(self):
+        self.callback_queue.rearmar()
+        registro = self.diario
+        try:
+            while not self.callback_queue.empty():
+                evento = self.callback_queue.get_nowait()
+                tipo, *dados = evento
+
+                if tipo == "novo_participante" or tipo == "lista_participantes":
+                    ips = [dados[0]] if tipo == "novo_participante" else dados[0]
+
+                    for ip in ips:
+                        if ip != self.eu and ip not in self.grids_oponentes:
+                            self.grids_oponentes[ip] = GridOponente(self.grid.GRID_SIZE)
+                            self.versao_oponentes += 1
+                            self.mira.adicionar_oponente(ip)
+                            self._log(f"[REDE] Adicionado oponente: {ip}")
+                            if registro is not None:
+                                registro.registrar(diario.ENTROU, ip)
+
+                    self.status_msg = "Novo(s) oponente(s)! Pressione 'A' para atirar."
+
+                elif tipo in ("jogador_saiu", "erro_conexao", "peer_morto"):
+                    ip = dados[0]
+                    if registro is not None:
+                        registro.registrar(
+                            diario.SAIU, ip, valor=diario.CODIGO_MOTIVO[tipo]
+                        )
+                    if self.grids_oponentes.pop(ip, None) is not None:
+                        self.versao_oponentes += 1
+                    self.mira.remover_oponente(ip)
+                    if tipo == "peer_morto":
+                        self.status_msg = f"Jogador {ip} parou de responder."
+                    else:
+                        self.status_msg = f"Jogador {ip} saiu."
+
+                    if self.ip_alvo_atual == ip:
+                        self.ip_alvo_atual = None
+                        self.estado_jogo = ESTADO_AGUARDANDO
+
+                elif tipo == "config_divergente":
+                    ip, tamanho_grid = dados
+                    if registro is not None:
+                        registro.registrar(diario.CONFIG_DIVERGENTE, ip, tamanho_grid)
+                    self._log(
+                        f"[REDE] {ip} joga com outra configuração "
+                        f"({tamanho_grid}x{tamanho_grid}), ignorado."
+                    )
+
+                elif tipo == "peer_suspeito":
+                    ip = dados[0]
+                    if registro is not None:
+                        registro.registrar(diario.SUSPEITO, ip)
+                    self.mira.suspender(ip)
+                    self._log(f"[REDE] Sem notícias de {ip}, suspeito de falha.")
+
+                elif tipo == "peer_recuperado":
+                    if registro is not None:
+                        registro.registrar(diario.RECUPERADO, dados[0])
+                    self.mira.retomar(dados[0])
+
+                elif tipo == "jogador_perdeu":
+                    ip = dados[0]
+                    if registro is not None:
+                        registro.registrar(
+                            diario.SAIU, ip, valor=diario.CODIGO_MOTIVO[tipo]
+                        )
+                    if self.grids_oponentes.pop(ip, None) is not None:
+                        self.versao_oponentes += 1
+                    self.mira.remover_oponente(ip)
+                    self.status_msg = f"Jogador {ip} perdeu!"
+
+                elif tipo == "tiro_recebido":
+                    ip_atacante, x, y = dados
+                    self.status_msg = f"Tiro recebido de {ip_atacante}!"
+                    resultado = self.grid.processar_tiro(x, y)
+                    self.celulas_alteradas.add((None, x, y))
+                    if registro is not None:
+                        registro.registrar(
+                            diario.TIRO_RECEBIDO,
+                            ip_atacante,
+                            x,
+                            y,
+                            protocolo.CODIGO_RESULTADO[resultado],
+                        )
+
+                    self.p2p_node.enviar_resultado(ip_atacante, resultado, x, y)
+
+                    if resultado == "game_over":
+                        self._perdi()
+
+                elif tipo == "salvo_recebido":
+                    ip_atacante, coords = dados
+                    self.status_msg = (
+                        f"Salva de {len(coords)} tiros recebida de {ip_atacante}!"
+                    )
+                    resultados = self.grid.processar_salvo(coords)
+                    self.celulas_alteradas.update((None, x, y) for x, y in coords)
+                    if registro is not None:
+                        for resultado, (x, y) in zip(resultados, coords):
+                            registro.registrar(
+                                diario.TIRO_RECEBIDO,
+                                ip_atacante,
+                                x,
+                                y,
+                                protocolo.CODIGO_RESULTADO[resultado],
+                            )
+                    self.p2p_node.enviar_resultados(
+                        ip_atacante,
+                        [
+                            (resultado, x, y)
+                            for resultado, (x, y) in zip(resultados, coords)
+                        ],
+                    )
+
+                    if "game_over" in resultados:
+                        self._perdi()
+
+                elif tipo == "resultado_tiro":
+                    ip_vitima, resultado, x, y = dados
+                    self._registrar_resultado(ip_vitima, resultado, x, y)
+
+                elif tipo == "tiro_perdido":
+                    ip_vitima, coords = dados
+                    if registro is not None:
+                        for x, y in coords:
+                            registro.registrar(diario.TIRO_PERDIDO, ip_vitima, x, y)
+                    self.status_msg = (
+                        f"{len(coords)} tiro(s) em {ip_vitima} sem resposta."
+                    )
+                    self._log(f"[REDE] {self.status_msg}")
+
+                elif tipo == "resultado_salvo":
+                    ip_vitima, resultados = dados
+                    for resultado, x, y in resultados:
+                        self._registrar_resultado(ip_vitima, resultado, x, y)
+
+                elif tipo == "retrato_espectadores":
+                    if self.espectadores is not None:
+                        self.espectadores.capturar(self)
+
+        except queue.Empty:
+            pass
+        if self.espectadores is not None:
+            self.espectadores.publicar(self)
+        if (
+            self.snapshots is not None
+            and self.estado_jogo not in ESTADOS_POSICIONAMENTO
+        ):
+            self.snapshots.talvez_capturar(self)
+
+    def _perdi(self):
+        self.p2p_node.broadcast_udp(protocolo.MSG_PERDEU)
+        self.estado_jogo = ESTADO_FIM_DE_JOGO
+        self.status_msg = "VOCE PERDEU! Fim de jogo."
+
+    def _registrar_resultado(self, ip_vitima, resultado, x, y):
+        if self.diario is not None:
+            self.diario.registrar(
+                diario.RESULTADO_RECEBIDO,
+                ip_vitima,
+                x,
+                y,
+                protocolo.CODIGO_RESULTADO[resultado],
+            )
+        if ip_vitima not in self.grids_oponentes:
+            return
+        if not (0 <= x < self.grid.GRID_SIZE and 0 <= y < self.grid.GRID_SIZE):
+            return
+        simbolo = self.grid.SIMBOLO_AGUA
+        if resultado in ["hit", "destroyed", "game_over"]:
+            simbolo = self.grid.SIMBOLO_ATINGIDO
+            self.grid.score_jogadores_que_atingi.add(ip_vitima)
+        elif resultado == "miss":
+            simbolo = self.grid.SIMBOLO_ERRO
+        elif resultado == "repeat":
+            # Célula já atingida por outro jogador: conteúdo desconhecido, mas
+            # não vale outro tiro.
+            simbolo = self.grid.SIMBOLO_BLOQUEADO
+        oponente = self.grids_oponentes[ip_vitima]
+        oponente.marcar(x, y, simbolo)
+        if resultado == "destroyed":
+            oponente.registrar_afundado(x, y)
+        self.celulas_alteradas.add((ip_vitima, x, y))
+        self.mira.registrar_resultado(ip_vitima, resultado, x, y)
+        self.status_msg = f"Resposta de {ip_vitima}: {resultado.upper()}!"
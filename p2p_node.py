@@ -1,23 +1,276 @@
+import asyncio
+import random
 import socket
+import struct
 import threading
 import time
+import zlib
+
+import detector_falhas
+import protocolo
+from confiabilidade import BaldeFichas, EstimadorRtt, JanelaDuplicatas, Pendente
+from detector_falhas import DetectorFalhas
+from membros import SAIU, VIVO, VisaoMembros
+from metricas import Metricas
+from protocolo import Par
+
+CABECALHO_TCP = struct.Struct("!I")
+NOMES_RTT = {protocolo.TIPO_TIRO: "rtt_tiro_s", protocolo.TIPO_SALVO: "rtt_salvo_s"}
+
+
+def id_sala(nome):
+    return zlib.crc32(nome.encode("utf-8"))
+
+
+def grupo_da_sala(nome):
+    # 239.255.0.0/16: escopo local da organização (RFC 2365), sem .0.0 e
+    # .255.255. Salas que caírem no mesmo grupo ainda se separam pelo id.
+    h = id_sala(nome) % 0xFFFE + 1
+    return f"239.255.{h >> 8}.{h & 255}"
+
+
+class _ProtocoloUDP(asyncio.DatagramProtocol):
+    def __init__(self, node):
+        self.node = node
+
+    def datagram_received(self, data, addr):
+        try:
+            self.node._tratar_datagrama(data, addr)
+        except Exception:
+            pass
+
+    def error_received(self, exc):
+        pass
+
+
+class _ProtocoloTCP(asyncio.Protocol):
+    def __init__(self, node):
+        self.node = node
+        self.buffer = bytearray()
+        self.transport = None
+        self.ip_origem = None
+        self.par = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.ip_origem = transport.get_extra_info("peername")[0]
+        self.node._entradas.add(transport)
+
+    def connection_lost(self, exc):
+        self.node._entradas.discard(self.transport)
+
+    def data_received(self, data):
+        self.buffer += data
+        pos = 0
+        fim_buffer = len(self.buffer)
+        with memoryview(self.buffer) as dados:
+            while fim_buffer - pos >= CABECALHO_TCP.size:
+                (tamanho,) = CABECALHO_TCP.unpack_from(dados, pos)
+                if tamanho > self.node.TCP_MAX_MENSAGEM:
+                    self.transport.close()
+                    pos = fim_buffer
+                    break
+                inicio = pos + CABECALHO_TCP.size
+                fim = inicio + tamanho
+                if fim > fim_buffer:
+                    break
+                if self.par is None:
+                    self.par = self.node._apresentacao(
+                        dados, inicio, fim, self.ip_origem
+                    )
+                    if self.par is None:
+                        self.transport.close()
+                        pos = fim_buffer
+                        break
+                else:
+                    self.node._tratar_mensagem_tcp(dados, inicio, fim, self.par)
+                pos = fim
+        del self.buffer[:pos]
+
+
+class _ConexaoPar:
+    def __init__(self, node, par):
+        self.node = node
+        self.par = par
+        self.fila = asyncio.Queue()
+        self.writer = None
+        self.tarefa = None
+
+    async def _conectar(self):
+        try:
+            _, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.par.ip, self.par.porta, local_addr=self.node._origem_tcp
+                ),
+                self.node.TCP_TIMEOUT,
+            )
+        except (OSError, asyncio.TimeoutError):
+            self.node.metricas.contar("tcp_falhas_conexao")
+            raise
+        self.node.metricas.contar("tcp_conexoes")
+        ola = protocolo.codificar_ola(self.node.porta, self.node.id)
+        self.writer.write(CABECALHO_TCP.pack(len(ola)) + ola)
+        self.node.metricas.contar_mensagem("saida", protocolo.TIPO_OLA, len(ola))
+
+    def _fechar(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def _escrever(self, quadros):
+        for _ in range(2):
+            try:
+                if self.writer is None:
+                    await self._conectar()
+                self.writer.writelines(quadros)
+                await self.writer.drain()
+                return True
+            except (OSError, asyncio.TimeoutError):
+                self._fechar()
+        return False
+
+    async def executar(self):
+        try:
+            while True:
+                try:
+                    quadro = await asyncio.wait_for(
+                        self.fila.get(), self.node.TCP_OCIOSO
+                    )
+                except asyncio.TimeoutError:
+                    if self.fila.empty():
+                        break
+                    continue
+                quadros = [quadro]
+                while not self.fila.empty():
+                    quadros.append(self.fila.get_nowait())
+                if not await self._escrever(quadros):
+                    while not self.fila.empty():
+                        self.fila.get_nowait()
+                    self.node.callback_queue.put(("erro_conexao", self.par))
+                    break
+        finally:
+            self._fechar()
+            if self.node._conexoes.get(self.par) is self:
+                del self.node._conexoes[self.par]
 
 
 class P2PNode:
+    # Porta conhecida da descoberta (broadcast/multicast). Cada nó recebe o
+    # resto numa porta própria, UDP e TCP com o mesmo número, anunciada junto
+    # com o id; 0 deixa o sistema escolher.
     UDP_PORT = 5000
-    TCP_PORT = 5001
+    PORTA = 0
+    TENTATIVAS_PORTA = 16
     BROADCAST_ADDR = "<broadcast>"
-    MSG_CONECTANDO = "Conectando"
+    TTL_SALA = 1
+    TCP_TIMEOUT = 2.0
+    TCP_OCIOSO = 30.0
+    TCP_MAX_MENSAGEM = 1 << 20
+    PERIODO_GOSSIP = 1.0
+    FANOUT_GOSSIP = 3
+    MAX_RUMORES = 32
+    LIMITE_DIVERGENCIA = 3
+    PERIODO_VERIFICACAO = 0.5
+    PHI_SUSPEITA = 3.0
+    PHI_MORTE = 8.0
+    DESVIO_MINIMO = 0.5
+    PAUSA_ACEITAVEL = 2.0
+    MAX_TENTATIVAS = 6
+    JANELA_DEDUP = 64
+    # Células por segundo que cada par pode nos mandar em tiros e salvas, e
+    # a rajada tolerada; None desliga o limite.
+    TAXA_TIROS = 20.0
+    RAJADA_TIROS = 40
 
-    def __init__(self, callback_queue):
+    def __init__(self, callback_queue, metricas=None, sala=None, porta=None):
         self.participantes = set()
         self.lock = threading.Lock()
         self.running = True
         self.MEU_IP = self._get_meu_ip_local()
         self.callback_queue = callback_queue
+        self.config_jogo = (0, ())
 
+        self.loop = None
+        self._thread_loop = None
+        self._udp_transport = None
+        self._tcp_server = None
+        self._parar = None
+        self._pronto = threading.Event()
+        self._conexoes = {}
+        self._entradas = set()
+        self._iniciar_sala(sala)
+        self._iniciar_identidade(
+            self._abrir_transporte(self.PORTA if porta is None else porta)
+        )
+        self._iniciar_membros()
+        self._iniciar_confiabilidade()
+        self._iniciar_metricas(metricas)
+
+    def _abrir_transporte(self, porta):
+        # Único ponto que toca a rede na construção: transportes alternativos
+        # (a rede em memória da simulação) sobrescrevem só isto e devolvem a
+        # porta que o nó vai anunciar.
+        self._sockets = self._reservar_porta(porta)
+        return self._sockets[0].getsockname()[1]
+
+    def _iniciar_identidade(self, porta, id_no=None):
+        if id_no is None:
+            id_no = random.SystemRandom().getrandbits(32)
+        self.porta = porta
+        self.id = id_no
+        self.eu = Par(self.MEU_IP, porta, id_no)
+        self.endereco = (self.MEU_IP, porta)
+
+    def _iniciar_sala(self, sala):
+        # Sem sala: broadcast no segmento inteiro, como sempre. Com sala: um
+        # grupo multicast próprio e sockets presos ao nosso IP, para que só o
+        # tráfego da sala chegue até aqui.
+        self.sala = sala
+        self.id_sala = id_sala(sala) if sala else 0
+        self.grupo = grupo_da_sala(sala) if sala else None
+        self.endereco_difusao = self.grupo or self.BROADCAST_ADDR
+        self._endereco_local = self.MEU_IP if sala else ""
+        self._origem_tcp = (self.MEU_IP, 0) if sala else None
+        self._udp_descoberta = None
+
+    def _iniciar_membros(self):
+        self.geracao = int(time.time()) & 0xFFFFFFFF
+        self.visao = VisaoMembros(self.eu, self.geracao)
+        # Datagramas só trazem o endereço de origem: este índice aponta o par
+        # mais recente visto em cada endereço.
+        self._pares = {self.endereco: self.eu}
+        # Digests divergentes seguidos, por par: um par atrasado não deve
+        # disparar a sincronização completa com outro que está em dia.
+        self._divergencias = {}
+        self._rng = random.Random()
+        self._ordem_gossip = []
+        self.detector = DetectorFalhas(
+            intervalo_esperado=self.PERIODO_GOSSIP,
+            limiar_suspeita=self.PHI_SUSPEITA,
+            limiar_morte=self.PHI_MORTE,
+            desvio_minimo=self.DESVIO_MINIMO,
+            pausa_aceitavel=self.PAUSA_ACEITAVEL,
+        )
         with self.lock:
-            self.participantes.add(self.MEU_IP)
+            self.participantes.add(self.eu)
+
+    def _iniciar_confiabilidade(self):
+        # Relógio de RTT e limite de taxa; trocável nos testes, como o do
+        # detector.
+        self.relogio = time.monotonic
+        self._seqs = {}
+        self._rtts = {}
+        self._pendentes = {}
+        self._janelas = {}
+        self._a_responder = {}
+        self._baldes = {}
+
+    def _iniciar_metricas(self, metricas):
+        if metricas is None:
+            metricas = Metricas(protocolo.NOMES_TIPO)
+        self.metricas = metricas
+        self.metricas.medir("participantes", lambda: len(self.participantes))
+        self.metricas.medir("tiros_pendentes", lambda: len(self._pendentes))
 
     def _get_meu_ip_local(self):
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -30,180 +283,615 @@ class P2PNode:
             s.close()
         return ip
 
-    def _parse_lista_ips(self, message_body):
-        ips_recebidos = []
+    def _criar_socket_udp(self, porta):
+        # Sem SO_REUSEADDR: outro nó na mesma porta dividiria os datagramas.
+        s_udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         try:
-            if len(message_body) <= 2:
-                return []
-            ips_str_limpa = message_body[1:-1]
-            ips_brutos = ips_str_limpa.split(",")
-            for ip_bruto in ips_brutos:
-                ip_limpo = ip_bruto.strip().strip("'")
-                if ip_limpo:
-                    ips_recebidos.append(ip_limpo)
-            return ips_recebidos
-        except Exception:
-            return []
+            if self.grupo is None:
+                s_udp.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            else:
+                interface = socket.inet_aton(self.MEU_IP)
+                s_udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, interface)
+                s_udp.setsockopt(
+                    socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.TTL_SALA
+                )
+                s_udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            s_udp.bind((self._endereco_local, porta))
+        except OSError:
+            s_udp.close()
+            raise
+        s_udp.setblocking(False)
+        return s_udp
+
+    def _reservar_porta(self, porta):
+        # TCP primeiro (com porta 0 o sistema escolhe) e o UDP no mesmo número;
+        # se este estiver ocupado, tenta outra porta.
+        for _ in range(1 if porta else self.TENTATIVAS_PORTA):
+            s_tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s_tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                s_tcp.bind((self._endereco_local, porta))
+                s_udp = self._criar_socket_udp(s_tcp.getsockname()[1])
+            except OSError:
+                s_tcp.close()
+                if porta:
+                    raise
+                continue
+            s_tcp.setblocking(False)
+            return s_udp, s_tcp
+        raise OSError("nenhuma porta livre para UDP e TCP ao mesmo tempo")
+
+    def _trocar_porta(self, porta):
+        # Só antes de start(): depois os sockets já estão com o loop.
+        if porta == self.porta or self.loop is not None:
+            return self.porta
+        try:
+            sockets = self._reservar_porta(porta)
+        except OSError:
+            return self.porta
+        for s in self._sockets:
+            s.close()
+        self._sockets = sockets
+        return porta
+
+    def _inscricao_sala(self):
+        return socket.inet_aton(self.grupo) + socket.inet_aton(self.MEU_IP)
 
-    def _enviar_tcp(self, mensagem, ip):
+    def _criar_socket_descoberta(self):
+        # Compartilhado (SO_REUSEADDR) por todos os nós da máquina: broadcast e
+        # multicast são entregues a cada um.
+        s_desc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s_desc.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.grupo is None:
+            s_desc.bind(("", self.UDP_PORT))
+        else:
+            try:
+                # Preso ao endereço do grupo, só recebe o tráfego desta sala.
+                s_desc.bind((self.grupo, self.UDP_PORT))
+            except OSError:
+                # Windows não aceita bind num endereço multicast.
+                s_desc.bind(("", self.UDP_PORT))
+            s_desc.setsockopt(
+                socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, self._inscricao_sala()
+            )
+        s_desc.setblocking(False)
+        return s_desc
+
+    def _fechar_descoberta(self):
+        if self._udp_descoberta is None:
+            return
+        if self.grupo is not None:
+            try:
+                self._udp_descoberta.get_extra_info("socket").setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_DROP_MEMBERSHIP,
+                    self._inscricao_sala(),
+                )
+            except OSError:
+                pass
+        self._udp_descoberta.close()
+        self._udp_descoberta = None
+
+    async def _principal(self):
+        self._parar = asyncio.Event()
+        s_udp, s_tcp = self._sockets
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s_tcp_out:
-                s_tcp_out.settimeout(2.0)
-                s_tcp_out.connect((ip, self.TCP_PORT))
-                s_tcp_out.sendall(mensagem.encode("utf-8"))
-        except socket.error as e:
-            self.callback_queue.put(("erro_conexao", ip))
-
-    def _enviar_udp(self, mensagem, ip):
+            self._udp_transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _ProtocoloUDP(self), sock=s_udp
+            )
+        except Exception as e:
+            print(f"[ERRO FATAL UDP] {e}")
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s_udp_out:
-                s_udp_out.sendto(mensagem.encode("utf-8"), (ip, self.UDP_PORT))
-        except Exception:
+            self._udp_descoberta, _ = await self.loop.create_datagram_endpoint(
+                lambda: _ProtocoloUDP(self), sock=self._criar_socket_descoberta()
+            )
+            if self.grupo is not None:
+                print(f"[REDE] Sala '{self.sala}' no grupo {self.grupo}")
+        except Exception as e:
+            print(f"[ERRO FATAL DESCOBERTA] {e}")
+        try:
+            self._tcp_server = await self.loop.create_server(
+                lambda: _ProtocoloTCP(self), sock=s_tcp
+            )
+        except Exception as e:
+            print(f"[ERRO FATAL TCP] {e}")
+
+        self._pronto.set()
+        periodicas = [
+            self.loop.create_task(
+                self._periodico(self.PERIODO_GOSSIP, self._rodada_gossip)
+            ),
+            self.loop.create_task(
+                self._periodico(self.PERIODO_VERIFICACAO, self._verificar_falhas)
+            ),
+        ]
+        await self._parar.wait()
+
+        tarefas = periodicas + [c.tarefa for c in self._conexoes.values()]
+        for tarefa in tarefas:
+            tarefa.cancel()
+        for transport in list(self._entradas):
+            transport.close()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self._fechar_descoberta()
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+
+    def _executar_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._principal())
+        finally:
+            self.loop.close()
+
+    def _no_loop(self, funcao, *args):
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(funcao, *args)
+        except RuntimeError:
             pass
 
+    def _enviar_datagrama(self, dados, endereco):
+        if self._udp_transport is None:
+            return
+        try:
+            self._udp_transport.sendto(dados, endereco)
+        except Exception as e:
+            print(f"[UDP ERRO] {e}")
+            return
+        self.metricas.contar_mensagem("saida", dados[1], len(dados))
+
+    def _enviar_tcp(self, dados, par):
+        conexao = self._conexoes.get(par)
+        if conexao is None:
+            conexao = _ConexaoPar(self, par)
+            conexao.tarefa = self.loop.create_task(conexao.executar())
+            self._conexoes[par] = conexao
+        conexao.fila.put_nowait(CABECALHO_TCP.pack(len(dados)) + dados)
+        self.metricas.contar_mensagem("saida", dados[1], len(dados))
+
+    def _agendar(self, atraso, funcao, *args):
+        return self.loop.call_later(atraso, funcao, *args)
+
+    async def _periodico(self, periodo, funcao):
+        while True:
+            await asyncio.sleep(periodo)
+            funcao()
+
+    def _alvos_gossip(self):
+        # Permutação percorrida em rodízio: cada par recebe notícias nossas a
+        # cada ~N/FANOUT rodadas, o que serve de batimento para o detector.
+        alvos = []
+        while len(alvos) < self.FANOUT_GOSSIP:
+            if not self._ordem_gossip:
+                self._ordem_gossip = [
+                    m
+                    for m in self.visao.vivos()
+                    if m != self.eu and self.detector.estado(m) != detector_falhas.MORTO
+                ]
+                self._rng.shuffle(self._ordem_gossip)
+                if not self._ordem_gossip:
+                    break
+                self._ajustar_detector(len(self._ordem_gossip))
+            par = self._ordem_gossip.pop()
+            if par in alvos:
+                break
+            alvos.append(par)
+        return alvos
+
+    def _ajustar_detector(self, pares):
+        # Com M pares no rodízio, cada um recebe notícias nossas a cada
+        # ~M/FANOUT rodadas, e nós deles no mesmo ritmo: com centenas de nós o
+        # batimento esperado passa de um por segundo para um a cada minutos.
+        rodizio = self.PERIODO_GOSSIP * max(1.0, pares / self.FANOUT_GOSSIP)
+        self.detector.intervalo_esperado = rodizio
+        self.detector.desvio_minimo = max(self.DESVIO_MINIMO, rodizio / 2)
+
+    def _rodada_gossip(self):
+        alvos = self._alvos_gossip()
+        if not alvos:
+            return
+        mensagem = protocolo.codificar_gossip(
+            self.visao.digest, self.visao.rumores_para_envio(self.MAX_RUMORES)
+        )
+        for par in alvos:
+            self._enviar_datagrama_para(mensagem, par)
+
+    def _enviar_datagrama_para(self, dados, par):
+        # Aceita um Par ou só o endereço (ip, porta).
+        self._enviar_datagrama(dados, par[:2])
+
+    def _mesclar(self, entradas):
+        novos, removidos = self.visao.mesclar(entradas)
+        # A visão pode ter desmentido um boato de que saímos.
+        self.geracao = self.visao.geracao
+        geracoes = self.visao.entradas
+        # Um nó reiniciado no mesmo endereço volta com outro id e uma geração
+        # maior: a encarnação nova passa a responder pelo endereço e a antiga
+        # é dada como saída, sem esperar pelo detector.
+        antigos = []
+        for par in novos:
+            endereco = par[:2]
+            atual = self._pares.get(endereco)
+            if atual is None or atual == par:
+                self._pares[endereco] = par
+            elif atual == self.eu or geracoes[par][0] < geracoes[atual][0]:
+                # No nosso endereço quem responde somos nós.
+                antigos.append(par)
+            elif geracoes[par][0] > geracoes[atual][0]:
+                self._pares[endereco] = par
+                antigos.append(atual)
+        for par in antigos:
+            if self.visao.marcar_saida(par) == SAIU:
+                if par not in novos:
+                    removidos.append(par)
+        novos = [par for par in novos if par not in antigos]
+        self._aplicar_mudancas(novos, removidos)
+
+    def _aplicar_mudancas(self, novos, removidos):
+        novos = [par for par in novos if par != self.eu]
+        removidos = [par for par in removidos if par != self.eu]
+        with self.lock:
+            self.participantes.update(novos)
+            self.participantes.difference_update(removidos)
+        if len(novos) == 1:
+            self.callback_queue.put(("novo_participante", novos[0]))
+        elif novos:
+            self.callback_queue.put(("lista_participantes", novos))
+        for par in removidos:
+            self.detector.remover(par)
+            self._esquecer_par(par)
+            self.callback_queue.put(("jogador_saiu", par))
+
+    def _verificar_digest(self, digest_remoto, origem):
+        if digest_remoto == self.visao.digest:
+            self._divergencias.pop(origem, None)
+            return
+        divergencias = self._divergencias.get(origem, 0) + 1
+        if (
+            len(self.visao) <= 1
+            or not self.visao.conhece(origem)
+            or divergencias >= self.LIMITE_DIVERGENCIA
+        ):
+            self._divergencias.pop(origem, None)
+            self._enviar_datagrama_para(protocolo.MSG_PEDIDO_SYNC, origem)
+        else:
+            self._divergencias[origem] = divergencias
+
+    def _registrar_contato(self, par):
+        anterior = self.detector.registrar(par)
+        if anterior == detector_falhas.SUSPEITO:
+            self.callback_queue.put(("peer_recuperado", par))
+        elif anterior == detector_falhas.MORTO and self.visao.esta_vivo(par):
+            self._aplicar_mudancas([par], [])
+
+    def _verificar_falhas(self):
+        for par, estado in self.detector.verificar():
+            if estado == detector_falhas.SUSPEITO:
+                self.callback_queue.put(("peer_suspeito", par))
+            else:
+                with self.lock:
+                    self.participantes.discard(par)
+                self.callback_queue.put(("peer_morto", par))
+
+    def _rtt(self, par):
+        estimador = self._rtts.get(par)
+        if estimador is None:
+            estimador = self._rtts[par] = EstimadorRtt()
+        return estimador
+
+    def _enviar_confiavel(self, par, tipo, coords):
+        seq = self._seqs.get(par)
+        if seq is None:
+            seq = self._rng.getrandbits(32)
+        self._seqs[par] = (seq + 1) & 0xFFFFFFFF
+        if tipo == protocolo.TIPO_TIRO:
+            dados = protocolo.codificar_tiro(seq, *coords[0])
+        else:
+            dados = protocolo.codificar_salvo(seq, coords)
+
+        pendente = Pendente(par, seq, dados, coords, self.relogio())
+        self._pendentes[(par, seq)] = pendente
+        self._enviar_datagrama_para(dados, par)
+        pendente.temporizador = self._agendar(
+            self._rtt(par).rto, self._retransmitir, pendente
+        )
+
+    def _retransmitir(self, pendente):
+        chave = (pendente.par, pendente.seq)
+        if self._pendentes.get(chave) is not pendente:
+            return
+        if pendente.tentativas >= self.MAX_TENTATIVAS:
+            del self._pendentes[chave]
+            self.metricas.contar("tiros_perdidos")
+            self.callback_queue.put(("tiro_perdido", pendente.par, pendente.coords))
+            return
+        pendente.tentativas += 1
+        self.metricas.contar("retransmissoes")
+        self._enviar_datagrama_para(pendente.dados, pendente.par)
+        pendente.temporizador = self._agendar(
+            self._rtt(pendente.par).recuo(pendente.tentativas),
+            self._retransmitir,
+            pendente,
+        )
+
+    def _confirmar(self, par, seq):
+        pendente = self._pendentes.pop((par, seq), None)
+        if pendente is None:
+            return False
+        if pendente.temporizador is not None:
+            pendente.temporizador.cancel()
+        decorrido = self.relogio() - pendente.enviado
+        # Karn: RTT de mensagens retransmitidas é ambíguo e não entra na média.
+        if pendente.tentativas == 1:
+            self._rtt(par).amostrar(decorrido)
+        # O histograma mede o tempo até o resultado, retransmissões incluídas.
+        self.metricas.observar(NOMES_RTT[pendente.dados[1]], decorrido, par)
+        return True
+
+    def _receber_confiavel(self, par, tipo, seq, coords):
+        janela = self._janelas.get(par)
+        if janela is None:
+            janela = self._janelas[par] = JanelaDuplicatas(self.JANELA_DEDUP)
+        novo, resposta = janela.receber(seq)
+        if novo:
+            self._a_responder[(par, tipo, coords)] = seq
+        else:
+            self.metricas.contar("duplicatas")
+            if resposta is not JanelaDuplicatas.AGUARDANDO:
+                self._enviar_tcp(resposta, par)
+        return novo
+
+    def _admitir_tiros(self, par, quantidade):
+        # Antes da janela de duplicatas: um tiro recusado aqui não é
+        # respondido, e o atirador o retransmite com recuo até haver vaga.
+        if self.TAXA_TIROS is not None:
+            balde = self._baldes.get(par)
+            agora = self.relogio()
+            if balde is None:
+                balde = self._baldes[par] = BaldeFichas(
+                    self.TAXA_TIROS, self.RAJADA_TIROS, agora
+                )
+            if not balde.retirar(quantidade, agora):
+                self.metricas.contar("tiros_limitados")
+                return False
+        if not self.callback_queue.aceita_tiros():
+            self.metricas.contar("tiros_sem_vaga")
+            return False
+        return True
+
+    def _responder(self, par, tipo, coords, resultados):
+        seq = self._a_responder.pop((par, tipo, coords), None)
+        if seq is None:
+            return
+        if tipo == protocolo.TIPO_TIRO:
+            dados = protocolo.codificar_resultado(seq, *resultados[0])
+        else:
+            dados = protocolo.codificar_resultados(seq, resultados)
+        janela = self._janelas.get(par)
+        if janela is not None:
+            janela.responder(seq, dados)
+        self._enviar_tcp(dados, par)
+
+    def _esquecer_par(self, par):
+        self._divergencias.pop(par, None)
+        self._seqs.pop(par, None)
+        self._rtts.pop(par, None)
+        self._janelas.pop(par, None)
+        self._baldes.pop(par, None)
+        self.metricas.esquecer(par)
+        for chave in [c for c in self._pendentes if c[0] == par]:
+            pendente = self._pendentes.pop(chave)
+            if pendente.temporizador is not None:
+                pendente.temporizador.cancel()
+
     def start(self):
-        print(f"[REDE] Iniciando listeners... Meu IP: {self.MEU_IP}")
-        threading.Thread(target=self._udp_listener, daemon=True).start()
-        threading.Thread(target=self._tcp_listener, daemon=True).start()
-        time.sleep(1)
+        print(f"[REDE] Iniciando listeners... Eu: {self.eu}")
+        self.loop = asyncio.new_event_loop()
+        self._thread_loop = threading.Thread(target=self._executar_loop, daemon=True)
+        self._thread_loop.start()
+        self._pronto.wait(timeout=self.TCP_TIMEOUT)
 
     def stop(self):
         print("[REDE] Encerrando... Avisando participantes.")
+        self.broadcast_udp(protocolo.MSG_SAINDO)
         self.running = False
-        self.broadcast_udp("saindo")
+        if self._parar is not None:
+            self._no_loop(self._parar.set)
+        if self._thread_loop is not None:
+            self._thread_loop.join(timeout=1.0)
+        else:
+            # Nunca iniciado: os sockets reservados não chegaram ao loop.
+            for s in self._sockets:
+                s.close()
+
+    def retomar(self, membros, geracao_anterior, eu=None):
+        # Volta de uma queda: o mesmo id e, se ainda estiver livre, a mesma
+        # porta, então para os pares é o mesmo nó. A geração passa da anterior
+        # (quem nos viu sair aceita o retorno) e a visão salva evita que cada
+        # par que nos mande gossip dispare uma sincronização completa.
+        if eu is not None:
+            with self.lock:
+                self.participantes.discard(self.eu)
+            self._iniciar_identidade(self._trocar_porta(eu.porta), eu.id)
+            with self.lock:
+                self.participantes.add(self.eu)
+        # Também passa de qualquer geração nossa que a visão salva tenha visto
+        # (uma saída anunciada, um desmentido que não chegou ao snapshot).
+        vistas = [g for par, g, _ in membros if par.id == self.id]
+        self.geracao = max(
+            self.geracao, (max([geracao_anterior, *vistas]) + 1) & 0xFFFFFFFF
+        )
+        self.visao = VisaoMembros(self.eu, self.geracao)
+        self._pares = {self.endereco: self.eu}
+        self._mesclar([entrada for entrada in membros if entrada[0].id != self.id])
+        # Só a nossa entrada nova vira rumor; as outras os pares já conhecem.
+        self.visao.rumores = {self.eu: self.visao.rumores[self.eu]}
+        for par in self.visao.vivos():
+            # Pares que morreram enquanto estávamos fora são detectados pelo
+            # silêncio, como qualquer outro.
+            if par != self.eu:
+                self.detector.registrar(par)
+
+    def anunciar(self):
+        self.broadcast_udp(
+            protocolo.codificar_conectando(
+                self.id, self.geracao, self.id_sala, *self.config_jogo
+            )
+        )
 
     def broadcast_udp(self, mensagem):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s_udp_bcast:
-                s_udp_bcast.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-                s_udp_bcast.sendto(
-                    mensagem.encode("utf-8"), (self.BROADCAST_ADDR, self.UDP_PORT)
-                )
-        except Exception as e:
-            print(f"[BROADCAST ERRO] {e}")
+        self._no_loop(
+            self._enviar_datagrama, mensagem, (self.endereco_difusao, self.UDP_PORT)
+        )
 
-    def enviar_tiro(self, ip_alvo, x, y):
-        msg = f"shot:{x},{y}"
-        self._enviar_udp(msg, ip_alvo)
+    def enviar_tiro(self, par_alvo, x, y):
+        self._no_loop(self._enviar_confiavel, par_alvo, protocolo.TIPO_TIRO, ((x, y),))
 
-    def enviar_resposta_tcp(self, ip_alvo, mensagem):
-        threading.Thread(target=self._enviar_tcp, args=(mensagem, ip_alvo)).start()
+    def enviar_salvo(self, par_alvo, coords):
+        coords = tuple(coords)[: protocolo.MAX_SALVO]
+        if coords:
+            self._no_loop(
+                self._enviar_confiavel, par_alvo, protocolo.TIPO_SALVO, coords
+            )
+
+    def enviar_resultado(self, par_alvo, resultado, x, y):
+        self._no_loop(
+            self._responder,
+            par_alvo,
+            protocolo.TIPO_TIRO,
+            ((x, y),),
+            [(resultado, x, y)],
+        )
+
+    def enviar_resultados(self, par_alvo, resultados):
+        coords = tuple((x, y) for _, x, y in resultados)
+        self._no_loop(
+            self._responder, par_alvo, protocolo.TIPO_SALVO, coords, list(resultados)
+        )
+
+    def enviar_resposta_tcp(self, par_alvo, mensagem):
+        self._no_loop(self._enviar_tcp, mensagem, par_alvo)
+
+    def vivacidade(self):
+        return self.detector.vivacidade()
 
     def get_participantes(self):
         with self.lock:
-            return list(p for p in self.participantes if p != self.MEU_IP)
+            return list(p for p in self.participantes if p != self.eu)
 
-    def _udp_listener(self):
+    def _tratar_datagrama(self, data, origem):
+        if origem == self.endereco:
+            return
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s_udp_in:
-                s_udp_in.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                s_udp_in.bind(("", self.UDP_PORT))
-                s_udp_in.settimeout(1.0)
-
-                while self.running:
-                    try:
-                        data, addr = s_udp_in.recvfrom(1024)
-                        mensagem = data.decode("utf-8")
-                        ip_origem = addr[0]
-                        if ip_origem == self.MEU_IP:
-                            continue
-
-                        if mensagem == self.MSG_CONECTANDO:
-                            novo = False
-                            with self.lock:
-                                if ip_origem not in self.participantes:
-                                    self.participantes.add(ip_origem)
-                                    novo = True
-                                lista_atual = list(self.participantes)
-                            if novo:
-                                self.callback_queue.put(
-                                    ("novo_participante", ip_origem)
-                                )
-                            self.enviar_resposta_tcp(
-                                ip_origem, f"participantes: {lista_atual}"
-                            )
-
-                        elif mensagem.startswith("shot:"):
-                            try:
-                                coords = mensagem.split(":", 1)[1]
-                                x, y = map(int, coords.split(","))
-                                self.callback_queue.put(
-                                    ("tiro_recebido", ip_origem, x, y)
-                                )
-                            except Exception:
-                                pass
-
-                        elif mensagem == "lost":
-                            self.callback_queue.put(("jogador_perdeu", ip_origem))
-
-                        elif mensagem == "saindo":
-                            with self.lock:
-                                self.participantes.discard(ip_origem)
-                            self.callback_queue.put(("jogador_saiu", ip_origem))
-
-                    except socket.timeout:
-                        continue
-                    except Exception:
-                        pass
-        except Exception as e:
-            if self.running:
-                print(f"[ERRO FATAL UDP] {e}")
+            tipo, *campos = protocolo.decodificar(data)
+        except protocolo.ErroProtocolo:
+            self.metricas.contar("mensagens_invalidas")
+            return
+        self.metricas.contar_mensagem("entrada", tipo, len(data))
+
+        if tipo == protocolo.TIPO_CONECTANDO:
+            id_no, geracao, sala, tamanho_grid, frota = campos
+            par = Par(origem[0], origem[1], id_no)
+        else:
+            par = self._pares.get(origem)
+        if par is not None:
+            self._registrar_contato(par)
+        elif tipo != protocolo.TIPO_GOSSIP:
+            # Tiros, avisos e pedidos só de quem está na visão.
+            self.metricas.contar("remetente_desconhecido")
+            return
 
-    def _handle_tcp_client(self, conn, addr):
-        ip_origem = addr[0]
+        if tipo == protocolo.TIPO_CONECTANDO:
+            if sala != self.id_sala:
+                # Outra sala no mesmo grupo (colisão do hash) ou um nó sem sala.
+                self.detector.remover(par)
+                self.metricas.contar("anuncios_outra_sala")
+                return
+            if (tamanho_grid, frota) != self.config_jogo:
+                # Outra partida com tabuleiro ou frota diferentes.
+                self.detector.remover(par)
+                self.callback_queue.put(("config_divergente", par, tamanho_grid))
+                return
+            self._mesclar([(par, geracao, VIVO)])
+            if self._pares.get(origem) == par and not self.visao.esta_vivo(par):
+                # Já o demos como saído nesta geração (saiu e voltou no mesmo
+                # segundo): contamos a ele, que se desmente numa geração maior.
+                self._enviar_datagrama_para(
+                    protocolo.codificar_gossip(
+                        self.visao.digest, [(par, *self.visao.entradas[par])]
+                    ),
+                    par,
+                )
+
+        elif tipo == protocolo.TIPO_GOSSIP:
+            digest, entradas = campos
+            self._mesclar(entradas)
+            # Remetente ainda desconhecido: o pedido vai direto ao endereço.
+            self._verificar_digest(digest, par or self._pares.get(origem, origem))
+
+        elif tipo == protocolo.TIPO_PEDIDO_SYNC:
+            self._enviar_tcp(
+                protocolo.codificar_visao(self.visao.digest, self.visao.todas()), par
+            )
+
+        elif tipo == protocolo.TIPO_TIRO:
+            seq, x, y = campos
+            if self._admitir_tiros(par, 1) and self._receber_confiavel(
+                par, tipo, seq, ((x, y),)
+            ):
+                self.callback_queue.put(("tiro_recebido", par, x, y))
+
+        elif tipo == protocolo.TIPO_SALVO:
+            seq, coords = campos
+            if (
+                coords
+                and self._admitir_tiros(par, len(coords))
+                and self._receber_confiavel(par, tipo, seq, tuple(coords))
+            ):
+                self.callback_queue.put(("salvo_recebido", par, coords))
+
+        elif tipo == protocolo.TIPO_PERDEU:
+            self.callback_queue.put(("jogador_perdeu", par))
+
+        elif tipo == protocolo.TIPO_SAINDO:
+            if self.visao.marcar_saida(par) == SAIU:
+                self._aplicar_mudancas([], [par])
+
+    def _apresentacao(self, dados, inicio, fim, ip_origem):
         try:
-            with conn:
-                data = conn.recv(1024)
-                if not data:
-                    return
-                mensagem = data.decode("utf-8")
-
-                if mensagem.startswith("participantes:"):
-                    list_str = mensagem.split(":", 1)[1].strip()
-                    ips_recebidos = self._parse_lista_ips(list_str)
-                    novos_encontrados = []
-                    with self.lock:
-                        for ip in ips_recebidos:
-                            if ip != self.MEU_IP and ip not in self.participantes:
-                                self.participantes.add(ip)
-                                novos_encontrados.append(ip)
-                    if novos_encontrados:
-                        self.callback_queue.put(
-                            ("lista_participantes", novos_encontrados)
-                        )
-
-                elif ":" in mensagem:
-                    try:
-                        partes = mensagem.split(":")
-                        if len(partes) == 3:
-                            resultado, x, y = partes[0], int(partes[1]), int(partes[2])
-                            self.callback_queue.put(
-                                ("resultado_tiro", ip_origem, resultado, x, y)
-                            )
-                    except ValueError:
-                        pass
-
-        except socket.error:
-            pass
+            tipo, *campos = protocolo.decodificar(dados, inicio, fim)
+        except protocolo.ErroProtocolo:
+            tipo = None
+        if tipo != protocolo.TIPO_OLA:
+            self.metricas.contar("mensagens_invalidas")
+            return None
+        self.metricas.contar_mensagem("entrada", tipo, fim - inicio)
+        porta, id_no = campos
+        return Par(ip_origem, porta, id_no)
 
-    def _tcp_listener(self):
+    def _tratar_mensagem_tcp(self, dados, inicio, fim, par):
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s_tcp_in:
-                s_tcp_in.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                s_tcp_in.bind(("", self.TCP_PORT))
-                s_tcp_in.listen(5)
-                s_tcp_in.settimeout(1.0)
-
-                while self.running:
-                    try:
-                        conn, addr = s_tcp_in.accept()
-                        threading.Thread(
-                            target=self._handle_tcp_client,
-                            args=(conn, addr),
-                            daemon=True,
-                        ).start()
-                    except socket.timeout:
-                        continue
-        except Exception as e:
-            if self.running:
-                print(f"[ERRO FATAL TCP] {e}")
+            tipo, *campos = protocolo.decodificar(dados, inicio, fim)
+        except protocolo.ErroProtocolo:
+            self.metricas.contar("mensagens_invalidas")
+            return
+        self.metricas.contar_mensagem("entrada", tipo, fim - inicio)
+        self._registrar_contato(par)
+
+        if tipo == protocolo.TIPO_VISAO:
+            _, entradas = campos
+            self._mesclar(entradas)
+
+        elif tipo == protocolo.TIPO_RESULTADO:
+            seq, resultado, x, y = campos
+            if self._confirmar(par, seq):
+                self.callback_queue.put(("resultado_tiro", par, resultado, x, y))
+
+        elif tipo == protocolo.TIPO_RESULTADOS:
+            seq, resultados = campos
+            if self._confirmar(par, seq) and resultados:
+                self.callback_queue.put(("resultado_salvo", par, resultados))
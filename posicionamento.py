@@ -0,0 +1,100 @@
+import random
+from functools import lru_cache
+
+# Acima disso as máscaras (uma por posição, com tamanho_grid² bits) ficam caras
+# demais; tabuleiros maiores sorteiam posições por rejeição.
+LIMITE_INDICE = 32
+TENTATIVAS_POR_NAVIO = 1000
+
+
+@lru_cache(maxsize=None)
+def _mascara_vertical(tamanho_grid, tamanho):
+    mascara = 0
+    for i in range(tamanho):
+        mascara |= 1 << (i * tamanho_grid)
+    return mascara
+
+
+def mascara_navio(tamanho_grid, x, y, tamanho, orientacao):
+    if orientacao == "h":
+        base = (1 << tamanho) - 1
+    else:
+        base = _mascara_vertical(tamanho_grid, tamanho)
+    return base << (y * tamanho_grid + x)
+
+
+class IndicePosicionamento:
+    def __init__(self, tamanho_grid):
+        self.tamanho_grid = tamanho_grid
+        self._posicoes = {}
+
+    def posicoes(self, tamanho):
+        posicoes = self._posicoes.get(tamanho)
+        if posicoes is None:
+            posicoes = []
+            n = self.tamanho_grid
+            for orientacao in ("h", "v"):
+                for y in range(n if orientacao == "h" else n - tamanho + 1):
+                    for x in range(n - tamanho + 1 if orientacao == "h" else n):
+                        mascara = mascara_navio(n, x, y, tamanho, orientacao)
+                        posicoes.append((mascara, x, y, orientacao))
+            self._posicoes[tamanho] = posicoes
+        return posicoes
+
+    def legais(self, tamanho, ocupacao=0):
+        return [p for p in self.posicoes(tamanho) if not p[0] & ocupacao]
+
+    def sortear_frota(self, frota, rng=random, ocupacao=0):
+        # Sorteio sequencial: cada navio é uniforme entre as posições que os
+        # anteriores deixaram livres, mas a frota inteira não é uniforme entre
+        # todas as frotas legais. Frotas em que os primeiros navios (os maiores,
+        # na ordem de SHIP_CONFIG) bloqueiam menos posições dos seguintes saem
+        # com menos chance que as outras; basta para jogar, não para estimar
+        # probabilidades exatas de ocupação.
+        navios = []
+        for nome, tamanho in frota.items():
+            candidatas = self.legais(tamanho, ocupacao)
+            if not candidatas:
+                raise ValueError(f"Não há espaço para posicionar {nome}.")
+            mascara, x, y, orientacao = rng.choice(candidatas)
+            ocupacao |= mascara
+            navios.append((nome, x, y, tamanho, orientacao))
+        return navios
+
+    def gerar_frotas(self, quantidade, frota, semente=None):
+        rng = random.Random(semente)
+        for _ in range(quantidade):
+            yield self.sortear_frota(frota, rng)
+
+
+@lru_cache(maxsize=None)
+def indice_posicionamento(tamanho_grid):
+    return IndicePosicionamento(tamanho_grid)
+
+
+def sortear_frota_esparsa(tamanho_grid, frota, rng=random, livre=None):
+    ocupadas = set()
+    navios = []
+    for nome, tamanho in frota.items():
+        for _ in range(TENTATIVAS_POR_NAVIO):
+            orientacao = rng.choice("hv")
+            if orientacao == "h":
+                x = rng.randrange(tamanho_grid - tamanho + 1)
+                y = rng.randrange(tamanho_grid)
+                passo = 1
+            else:
+                x = rng.randrange(tamanho_grid)
+                y = rng.randrange(tamanho_grid - tamanho + 1)
+                passo = tamanho_grid
+            inicio = y * tamanho_grid + x
+            celulas = [inicio + i * passo for i in range(tamanho)]
+            if any(
+                c in ocupadas or (livre is not None and not livre(c)) for c in celulas
+            ):
+                continue
+            ocupadas.update(celulas)
+            navios.append((nome, x, y, tamanho, orientacao))
+            break
+        else:
+            raise ValueError(f"Não há espaço para posicionar {nome}.")
+    return navios
@@ -0,0 +1,217 @@
+import socket
+import struct
+from collections import namedtuple
+
+VERSAO = 6
+
+TIPO_CONECTANDO = 1
+TIPO_TIRO = 2
+TIPO_RESULTADO = 3
+TIPO_GOSSIP = 4
+TIPO_PERDEU = 5
+TIPO_SAINDO = 6
+TIPO_SALVO = 7
+TIPO_RESULTADOS = 8
+TIPO_VISAO = 9
+TIPO_PEDIDO_SYNC = 10
+TIPO_OLA = 11
+
+NOMES_TIPO = {
+    TIPO_CONECTANDO: "conectando",
+    TIPO_TIRO: "tiro",
+    TIPO_RESULTADO: "resultado",
+    TIPO_GOSSIP: "gossip",
+    TIPO_PERDEU: "perdeu",
+    TIPO_SAINDO: "saindo",
+    TIPO_SALVO: "salvo",
+    TIPO_RESULTADOS: "resultados",
+    TIPO_VISAO: "visao",
+    TIPO_PEDIDO_SYNC: "pedido_sync",
+    TIPO_OLA: "ola",
+}
+
+RESULTADOS = ("miss", "hit", "destroyed", "game_over", "repeat")
+CODIGO_RESULTADO = {nome: codigo for codigo, nome in enumerate(RESULTADOS)}
+
+MAX_MEMBROS = 0xFFFF
+MAX_SALVO = 1024
+MAX_CLASSES_NAVIO = 64
+
+_CABECALHO = struct.Struct("!BB")
+_TIRO = struct.Struct("!BBIHH")
+_RESULTADO = struct.Struct("!BBIBHH")
+_CONECTANDO = struct.Struct("!BBIIIHB")
+_CLASSE_NAVIO = struct.Struct("!HI")
+_MEMBROS = struct.Struct("!BBIH")
+_MEMBRO = struct.Struct("!4sHIIB")
+_LOTE = struct.Struct("!BBIH")
+_COORD = struct.Struct("!HH")
+_COORD_RESULTADO = struct.Struct("!BHH")
+_OLA = struct.Struct("!BBHI")
+_tupla = tuple.__new__
+
+
+class ErroProtocolo(ValueError):
+    pass
+
+
+class Par(namedtuple("Par", "ip porta id")):
+    # Identidade de um nó: endereço (a mesma porta para UDP e TCP) e um id
+    # aleatório, que distingue vários nós no mesmo IP e encarnações
+    # sucessivas no mesmo endereço.
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.ip}:{self.porta}#{self.id:08x}"
+
+
+def _sem_dados(tipo):
+    return _CABECALHO.pack(VERSAO, tipo)
+
+
+MSG_PERDEU = _sem_dados(TIPO_PERDEU)
+MSG_SAINDO = _sem_dados(TIPO_SAINDO)
+MSG_PEDIDO_SYNC = _sem_dados(TIPO_PEDIDO_SYNC)
+
+
+def codificar_conectando(id_no, geracao, sala=0, tamanho_grid=0, frota=()):
+    # A porta do nó é a de origem do datagrama; só o id precisa ir junto.
+    frota = list(frota)[:MAX_CLASSES_NAVIO]
+    partes = [
+        _CONECTANDO.pack(
+            VERSAO, TIPO_CONECTANDO, id_no, geracao, sala, tamanho_grid, len(frota)
+        )
+    ]
+    partes.extend(_CLASSE_NAVIO.pack(t, quantidade) for t, quantidade in frota)
+    return b"".join(partes)
+
+
+def codificar_ola(porta, id_no):
+    # Primeira mensagem de cada conexão TCP: a porta de origem é efêmera,
+    # então o remetente se identifica.
+    return _OLA.pack(VERSAO, TIPO_OLA, porta, id_no)
+
+
+def codificar_tiro(seq, x, y):
+    return _TIRO.pack(VERSAO, TIPO_TIRO, seq, x, y)
+
+
+def codificar_resultado(seq, resultado, x, y):
+    codigo = CODIGO_RESULTADO[resultado]
+    return _RESULTADO.pack(VERSAO, TIPO_RESULTADO, seq, codigo, x, y)
+
+
+def _codificar_membros(tipo, digest, entradas):
+    entradas = list(entradas)[:MAX_MEMBROS]
+    partes = [_MEMBROS.pack(VERSAO, tipo, digest, len(entradas))]
+    partes.extend(
+        _MEMBRO.pack(socket.inet_aton(par.ip), par.porta, par.id, geracao, estado)
+        for par, geracao, estado in entradas
+    )
+    return b"".join(partes)
+
+
+def codificar_gossip(digest, entradas):
+    return _codificar_membros(TIPO_GOSSIP, digest, entradas)
+
+
+def codificar_visao(digest, entradas):
+    return _codificar_membros(TIPO_VISAO, digest, entradas)
+
+
+def codificar_salvo(seq, coords):
+    coords = list(coords)[:MAX_SALVO]
+    partes = [_LOTE.pack(VERSAO, TIPO_SALVO, seq, len(coords))]
+    partes.extend(_COORD.pack(x, y) for x, y in coords)
+    return b"".join(partes)
+
+
+def codificar_resultados(seq, resultados):
+    resultados = list(resultados)[:MAX_SALVO]
+    partes = [_LOTE.pack(VERSAO, TIPO_RESULTADOS, seq, len(resultados))]
+    partes.extend(
+        _COORD_RESULTADO.pack(CODIGO_RESULTADO[resultado], x, y)
+        for resultado, x, y in resultados
+    )
+    return b"".join(partes)
+
+
+def _decodificar_lote(buffer, inicio, fim, item):
+    _, _, seq, quantidade = _LOTE.unpack_from(buffer, inicio)
+    pos = inicio + _LOTE.size
+    if quantidade > MAX_SALVO or fim - pos != quantidade * item.size:
+        raise ErroProtocolo("lote com tamanho inválido")
+    return seq, item.iter_unpack(memoryview(buffer)[pos:fim])
+
+
+def decodificar(buffer, inicio=0, fim=None):
+    if fim is None:
+        fim = len(buffer)
+    try:
+        versao, tipo = _CABECALHO.unpack_from(buffer, inicio)
+        if versao != VERSAO:
+            raise ErroProtocolo(f"versão {versao} não suportada")
+
+        if tipo == TIPO_TIRO:
+            if fim - inicio != _TIRO.size:
+                raise ErroProtocolo("tiro com tamanho inválido")
+            _, _, seq, x, y = _TIRO.unpack_from(buffer, inicio)
+            return (tipo, seq, x, y)
+
+        if tipo == TIPO_RESULTADO:
+            if fim - inicio != _RESULTADO.size:
+                raise ErroProtocolo("resultado com tamanho inválido")
+            _, _, seq, codigo, x, y = _RESULTADO.unpack_from(buffer, inicio)
+            return (tipo, seq, RESULTADOS[codigo], x, y)
+
+        if tipo == TIPO_GOSSIP or tipo == TIPO_VISAO:
+            _, _, digest, quantidade = _MEMBROS.unpack_from(buffer, inicio)
+            pos = inicio + _MEMBROS.size
+            if fim - pos != quantidade * _MEMBRO.size:
+                raise ErroProtocolo("lista de membros com tamanho inválido")
+            # tuple.__new__ direto: o __new__ gerado pelo namedtuple pesa na
+            # decodificação de listas grandes.
+            entradas = [
+                (_tupla(Par, (socket.inet_ntoa(ip), porta, id_no)), geracao, estado)
+                for ip, porta, id_no, geracao, estado in _MEMBRO.iter_unpack(
+                    memoryview(buffer)[pos:fim]
+                )
+            ]
+            if any(estado > 1 for _, _, estado in entradas):
+                raise ErroProtocolo("estado de membro inválido")
+            return (tipo, digest, entradas)
+
+        if tipo == TIPO_CONECTANDO:
+            _, _, id_no, geracao, sala, tamanho_grid, classes = _CONECTANDO.unpack_from(
+                buffer, inicio
+            )
+            pos = inicio + _CONECTANDO.size
+            if fim - pos != classes * _CLASSE_NAVIO.size:
+                raise ErroProtocolo("anúncio com tamanho inválido")
+            frota = tuple(_CLASSE_NAVIO.iter_unpack(memoryview(buffer)[pos:fim]))
+            return (tipo, id_no, geracao, sala, tamanho_grid, frota)
+
+        if tipo == TIPO_SALVO:
+            seq, itens = _decodificar_lote(buffer, inicio, fim, _COORD)
+            return (tipo, seq, list(itens))
+
+        if tipo == TIPO_RESULTADOS:
+            seq, itens = _decodificar_lote(buffer, inicio, fim, _COORD_RESULTADO)
+            resultados = [(RESULTADOS[codigo], x, y) for codigo, x, y in itens]
+            return (tipo, seq, resultados)
+
+        if tipo == TIPO_OLA:
+            if fim - inicio != _OLA.size:
+                raise ErroProtocolo("apresentação com tamanho inválido")
+            _, _, porta, id_no = _OLA.unpack_from(buffer, inicio)
+            return (tipo, porta, id_no)
+
+        if tipo in (TIPO_PERDEU, TIPO_SAINDO, TIPO_PEDIDO_SYNC):
+            if fim - inicio != _CABECALHO.size:
+                raise ErroProtocolo("mensagem de controle com tamanho inválido")
+            return (tipo,)
+
+    except (struct.error, IndexError) as e:
+        raise ErroProtocolo(str(e)) from e
+
+    raise ErroProtocolo(f"tipo {tipo} desconhecido")
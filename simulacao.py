@@ -0,0 +1,411 @@
+import argparse
+import os
+import random
+import time
+
+import protocolo
+from grid import Grid, configurar_partida
+from fila_eventos import FilaEventos
+from grid_bitboard import GridBitboard
+from metricas import Metricas, MetricasDesligadas
+from motor import ESTADO_AGUARDANDO, ESTADO_FIM_DE_JOGO, MotorJogo
+from p2p_node import P2PNode
+from posicionamento import (
+    LIMITE_INDICE,
+    indice_posicionamento,
+    sortear_frota_esparsa,
+)
+
+
+class RedeMemoria:
+    # Nós indexados pelo endereço (ip, porta), como numa rede de verdade.
+    # `perda(origem, destino, dados)` verdadeiro descarta a mensagem: com ela
+    # os nós passam a agendar retransmissões (ver TransporteMemoria).
+    def __init__(self, perda=None):
+        self.nos = {}
+        self.perda = perda
+        self.mensagens = 0
+        self.bytes = 0
+        self.perdidas = 0
+
+    def registrar(self, no):
+        self.nos[no.endereco] = no
+
+    def remover(self, no):
+        self.nos.pop(no.endereco, None)
+
+    def _contar(self, dados):
+        self.mensagens += 1
+        self.bytes += len(dados)
+
+    def _perdida(self, origem, destino, dados):
+        if self.perda is not None and self.perda(origem, destino, dados):
+            self.perdidas += 1
+            return True
+        return False
+
+    def entregar_udp(self, origem, destino, dados):
+        no = self.nos.get(destino)
+        if no is not None:
+            self._contar(dados)
+            if not self._perdida(origem, destino, dados):
+                no._tratar_datagrama(dados, origem)
+
+    def entregar_broadcast(self, origem, dados):
+        for destino in list(self.nos.values()):
+            self._contar(dados)
+            if not self._perdida(origem, destino.endereco, dados):
+                destino._tratar_datagrama(dados, origem)
+
+    def entregar_tcp(self, par_origem, destino, dados):
+        # A conexão já teria passado pelo Ola: o destino recebe o par inteiro.
+        no = self.nos.get(destino)
+        if no is None:
+            return False
+        self._contar(dados)
+        # Perda no TCP: a conexão caiu depois do envio, sem aviso a quem enviou.
+        if not self._perdida(par_origem[:2], destino, dados):
+            no._tratar_mensagem_tcp(dados, 0, len(dados), par_origem)
+        return True
+
+
+class TemporizadorMemoria:
+    # Mesma interface do TimerHandle do asyncio que o nó usa: cancel().
+    def __init__(self, instante, funcao, args):
+        self.instante = instante
+        self.funcao = funcao
+        self.args = args
+        self.cancelado = False
+
+    def cancel(self):
+        self.cancelado = True
+
+
+class TransporteMemoria(P2PNode):
+    PORTA = 5001
+    # Bots do mesmo processo atiram a cada rodada e a rede em memória não
+    # retransmite: sem limite de taxa.
+    TAXA_TIROS = None
+
+    def __init__(
+        self, callback_queue, rede, ip, metricas=None, porta=None, semente=None
+    ):
+        self.rede = rede
+        self._ip = ip
+        super().__init__(callback_queue, metricas, porta=porta)
+        # Com semente, rodízio de gossip e números de sequência se repetem.
+        self._rng = random.Random(semente)
+        self._temporizadores = []
+
+    def _get_meu_ip_local(self):
+        return self._ip
+
+    def _abrir_transporte(self, porta):
+        # Nada a reservar: a rede em memória só indexa o endereço.
+        return porta
+
+    def start(self):
+        self.rede.registrar(self)
+
+    def stop(self):
+        self.broadcast_udp(protocolo.MSG_SAINDO)
+        self.running = False
+        self.rede.remover(self)
+
+    # Sem loop de eventos: quem usa a rede em memória roda as tarefas
+    # periódicas do nó no ritmo que quiser.
+    def rodada_gossip(self):
+        self._rodada_gossip()
+
+    def verificar_falhas(self):
+        self._verificar_falhas()
+
+    def disparar_temporizadores(self):
+        # Retransmissões vencidas no relógio do nó.
+        agora = self.relogio()
+        vencidos = [t for t in self._temporizadores if t.instante <= agora]
+        self._temporizadores = [
+            t for t in self._temporizadores if t.instante > agora and not t.cancelado
+        ]
+        for temporizador in vencidos:
+            if not temporizador.cancelado:
+                temporizador.funcao(*temporizador.args)
+
+    def _no_loop(self, funcao, *args):
+        funcao(*args)
+
+    def _agendar(self, atraso, funcao, *args):
+        if self.rede.perda is None:
+            # Sem perdas na rede em memória: nada a retransmitir.
+            return None
+        temporizador = TemporizadorMemoria(self.relogio() + atraso, funcao, args)
+        self._temporizadores.append(temporizador)
+        return temporizador
+
+    def _trocar_porta(self, porta):
+        return porta
+
+    def _enviar_datagrama_para(self, dados, par):
+        self.metricas.contar_mensagem("saida", dados[1], len(dados))
+        self.rede.entregar_udp(self.endereco, par[:2], dados)
+
+    def _enviar_tcp(self, dados, par):
+        self.metricas.contar_mensagem("saida", dados[1], len(dados))
+        if not self.rede.entregar_tcp(self.eu, par[:2], dados):
+            self.metricas.contar("tcp_falhas_conexao")
+            self.callback_queue.put(("erro_conexao", par))
+
+    def broadcast_udp(self, mensagem):
+        self.metricas.contar_mensagem("saida", mensagem[1], len(mensagem))
+        self.rede.entregar_broadcast(self.endereco, mensagem)
+
+
+class EstrategiaAleatoria:
+    TENTATIVAS = 64
+
+    def escolher(self, bot):
+        rng = bot.rng
+        ip_alvo = rng.choice(list(bot.grids_oponentes))
+        grid_oponente = bot.grids_oponentes[ip_alvo]
+        n = grid_oponente.GRID_SIZE
+        for _ in range(self.TENTATIVAS):
+            x = rng.randrange(n)
+            y = rng.randrange(n)
+            if grid_oponente.celula(x, y) == Grid.SIMBOLO_AGUA:
+                return ip_alvo, x, y
+        livres = [
+            (x, y)
+            for y in range(n)
+            for x in range(n)
+            if grid_oponente.celula(x, y) == Grid.SIMBOLO_AGUA
+        ]
+        if not livres:
+            return None
+        x, y = rng.choice(livres)
+        return ip_alvo, x, y
+
+
+class EstrategiaDensidade:
+    def escolher(self, bot):
+        return bot.mira.escolher()
+
+
+ESTRATEGIAS = {"aleatoria": EstrategiaAleatoria, "densidade": EstrategiaDensidade}
+
+
+class NoBot(MotorJogo):
+    RODADAS_SEM_RESPOSTA = 3
+
+    def __init__(
+        self, rede, ip, estrategia, rng, tamanho=None, frota=None, metricas=None
+    ):
+        grid = GridBitboard(tamanho, frota)
+        if grid.GRID_SIZE <= LIMITE_INDICE:
+            navios = indice_posicionamento(grid.GRID_SIZE).sortear_frota(
+                grid.SHIP_CONFIG, rng
+            )
+        else:
+            navios = sortear_frota_esparsa(grid.GRID_SIZE, grid.SHIP_CONFIG, rng)
+        for navio in navios:
+            grid._posicionar_navio(*navio)
+        fila = FilaEventos()
+        super().__init__(fila, TransporteMemoria(fila, rede, ip, metricas), grid)
+        self.verboso = False
+        self.estado_jogo = ESTADO_AGUARDANDO
+
+        self.estrategia = estrategia
+        # Um gerador só por bot: estratégia e mira esparsa reproduzem a partida
+        # a partir da semente.
+        self.rng = rng
+        self.mira.rng = rng
+        self.tiro_pendente = None
+        self.latencias = []
+        self.tiros = 0
+        self.tiros_sem_resposta = 0
+        self.rodada = 0
+
+    @property
+    def vivo(self):
+        return self.estado_jogo != ESTADO_FIM_DE_JOGO
+
+    def conectar(self):
+        self.p2p_node.start()
+        self.p2p_node.anunciar()
+
+    def processar_eventos(self):
+        self.processar_eventos_rede()
+        self.celulas_alteradas.clear()
+        if self.tiro_pendente and self.tiro_pendente[0] not in self.grids_oponentes:
+            self.tiro_pendente = None
+
+    def _registrar_resultado(self, ip_vitima, resultado, x, y):
+        if self.tiro_pendente and self.tiro_pendente[:3] == (ip_vitima, x, y):
+            self.latencias.append(time.perf_counter() - self.tiro_pendente[3])
+            self.tiro_pendente = None
+        super()._registrar_resultado(ip_vitima, resultado, x, y)
+
+    def agir(self):
+        self.rodada += 1
+        if self.tiro_pendente:
+            # Salvaguarda caso um tiro nunca seja respondido (alvo saiu, por
+            # exemplo): libera o bot após algumas rodadas.
+            ip_alvo, x, y, _, rodada = self.tiro_pendente
+            if self.rodada - rodada < self.RODADAS_SEM_RESPOSTA:
+                return
+            self.tiros_sem_resposta += 1
+            self.tiro_pendente = None
+            if ip_alvo in self.grids_oponentes:
+                self.grids_oponentes[ip_alvo].marcar(x, y, Grid.SIMBOLO_ERRO)
+                self.mira.registrar_resultado(ip_alvo, "miss", x, y)
+        if not self.vivo or not self.grids_oponentes:
+            return
+        escolha = self.estrategia.escolher(self)
+        if escolha is None:
+            return
+        ip_alvo, x, y = escolha
+        self.tiro_pendente = (ip_alvo, x, y, time.perf_counter(), self.rodada)
+        self.tiros += 1
+        self.enviar_tiro(ip_alvo, x, y)
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    idx = min(len(valores_ordenados) - 1, int(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[idx]
+
+
+class Simulacao:
+    MAX_RODADAS = 10000
+    RODADAS_POR_GOSSIP = 5
+
+    def __init__(
+        self,
+        jogadores=4,
+        estrategia="aleatoria",
+        semente=None,
+        tamanho=None,
+        copias=None,
+        metricas=True,
+        diarios=None,
+    ):
+        self.jogadores = jogadores
+        self.metricas = metricas
+        # Diretório onde cada bot grava o diário de cada partida, se definido.
+        self.diarios = diarios
+        self.partidas = 0
+        self.estrategia = ESTRATEGIAS[estrategia]
+        self.rng = random.Random(semente)
+        self.tamanho, self.frota = configurar_partida(tamanho, copias)
+
+    def jogar_partida(self):
+        self.partidas += 1
+        rede = RedeMemoria()
+        bots = []
+        for i in range(self.jogadores):
+            ip = f"10.0.{i // 250}.{i % 250 + 1}"
+            bots.append(
+                NoBot(
+                    rede,
+                    ip,
+                    self.estrategia(),
+                    self.rng,
+                    self.tamanho,
+                    self.frota,
+                    (
+                        Metricas(protocolo.NOMES_TIPO)
+                        if self.metricas
+                        else MetricasDesligadas()
+                    ),
+                )
+            )
+        for bot in bots:
+            if self.diarios is not None:
+                bot.iniciar_diario(
+                    os.path.join(
+                        self.diarios, f"{self.partidas:04d}-{bot.eu.id:08x}.diario"
+                    )
+                )
+            bot.conectar()
+
+        for rodada in range(self.MAX_RODADAS):
+            if rodada % self.RODADAS_POR_GOSSIP == 0:
+                for bot in bots:
+                    bot.p2p_node.rodada_gossip()
+            for bot in bots:
+                bot.processar_eventos()
+                bot.agir()
+            if sum(bot.vivo for bot in bots) <= 1:
+                break
+
+        for bot in bots:
+            bot.p2p_node.stop()
+            bot.fechar_diario()
+        return bots, rede
+
+    def executar(self, partidas):
+        latencias = []
+        tiros = 0
+        sem_resposta = 0
+        mensagens = 0
+        inicio = time.perf_counter()
+        for _ in range(partidas):
+            bots, rede = self.jogar_partida()
+            for bot in bots:
+                latencias.extend(bot.latencias)
+                tiros += bot.tiros
+                sem_resposta += bot.tiros_sem_resposta
+            mensagens += rede.mensagens
+        duracao = time.perf_counter() - inicio
+
+        latencias.sort()
+        return {
+            "partidas": partidas,
+            "jogadores": self.jogadores,
+            "tamanho": self.tamanho,
+            "duracao_s": duracao,
+            "partidas_por_s": partidas / duracao,
+            "tiros_por_s": tiros / duracao,
+            "tiros_por_partida": tiros / partidas,
+            "tiros_sem_resposta": sem_resposta,
+            "mensagens_por_partida": mensagens / partidas,
+            "latencia_p50_us": _percentil(latencias, 50) * 1e6,
+            "latencia_p90_us": _percentil(latencias, 90) * 1e6,
+            "latencia_p99_us": _percentil(latencias, 99) * 1e6,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Torneio de bots sem interface.")
+    parser.add_argument("--jogadores", type=int, default=4)
+    parser.add_argument("--partidas", type=int, default=20)
+    parser.add_argument(
+        "--estrategia", choices=sorted(ESTRATEGIAS), default="aleatoria"
+    )
+    parser.add_argument("--semente", type=int, default=None)
+    parser.add_argument("--tamanho", type=int, default=None)
+    parser.add_argument("--copias", type=int, default=None, help="cópias da frota")
+    parser.add_argument("--diarios", default=None, help="diretório para os diários")
+    args = parser.parse_args()
+
+    if args.diarios is not None:
+        os.makedirs(args.diarios, exist_ok=True)
+    relatorio = Simulacao(
+        args.jogadores,
+        args.estrategia,
+        args.semente,
+        args.tamanho,
+        args.copias,
+        diarios=args.diarios,
+    ).executar(args.partidas)
+    print("\n--- SIMULAÇÃO ---")
+    for chave, valor in relatorio.items():
+        if isinstance(valor, float):
+            print(f"{chave}: {valor:,.2f}")
+        else:
+            print(f"{chave}: {valor}")
+    print("-----------------")
+
+
+if __name__ == "__main__":
+    main()
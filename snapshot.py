@@ -0,0 +1,202 @@
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from functools import partial
+
+from grid import ACERTO, BLOQUEADO, ERRO
+
+MAGICA = b"BNDS"
+VERSAO = 2
+
+# Cabeçalho: mágica, versão e tamanho do JSON de metadados. Em seguida vêm as
+# seções listadas em metadados["secoes"]: inteiros de 32 bits little-endian,
+# comprimidos com zlib.
+_CABECALHO = struct.Struct("<4sBI")
+
+
+def _codificar(indices):
+    valores = array("I", indices)
+    if sys.byteorder != "little":
+        valores.byteswap()
+    return zlib.compress(valores.tobytes(), 1)
+
+
+def _decodificar(bloco):
+    valores = array("I")
+    valores.frombytes(zlib.decompress(bloco))
+    if sys.byteorder != "little":
+        valores.byteswap()
+    return valores
+
+
+class Snapshots:
+    INTERVALO = 5.0
+
+    def __init__(self, caminho, intervalo=INTERVALO):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.gravados = 0
+        self.ultima_gravacao_s = 0.0
+        self._proxima = time.monotonic() + intervalo
+        # Assinatura de cada seção na última captura: só o que mudou é copiado.
+        self._assinaturas = {}
+        self._anteriores = None
+        self._frota = None
+        # Blocos já comprimidos, reaproveitados enquanto a seção não muda.
+        self._blocos = {}
+        self._pendente = None
+        self._encerrar = False
+        self._condicao = threading.Condition()
+        self._escritor = threading.Thread(target=self._escrever, daemon=True)
+        self._escritor.start()
+
+    def talvez_capturar(self, motor):
+        agora = time.monotonic()
+        if agora >= self._proxima:
+            self._proxima = agora + self.intervalo
+            self.capturar(motor)
+
+    def capturar(self, motor):
+        # Roda na thread do jogo: só set.copy() dos conjuntos alterados. A
+        # conversão, a compressão e a escrita ficam com a thread do escritor.
+        grid = motor.grid
+        # Nossos conjuntos só crescem: o tamanho basta como assinatura. Os dos
+        # oponentes podem trocar células de lado, então contam as marcações.
+        # Cada seção vem com quem a copia, chamado só se ela mudou.
+        conjuntos = {
+            "navios": (len(grid.navio_na_celula), None),
+            "acertos": (len(grid.acertos), grid.acertos.copy),
+            "erros": (len(grid.erros), grid.erros.copy),
+        }
+        oponentes = {}
+        for par, oponente in motor.grids_oponentes.items():
+            nome = oponentes[par] = str(par)
+            conjuntos[f"{nome}/acertos"] = (
+                oponente.marcacoes,
+                partial(oponente.indices, ACERTO),
+            )
+            conjuntos[f"{nome}/erros"] = (
+                oponente.marcacoes,
+                partial(oponente.indices, ERRO),
+            )
+            conjuntos[f"{nome}/bloqueados"] = (
+                oponente.marcacoes,
+                partial(oponente.indices, BLOQUEADO),
+            )
+            conjuntos[f"{nome}/afundados"] = (oponente.marcacoes, oponente.afundados)
+
+        if self._frota is None:
+            # Milhares de tuplas em tabuleiros grandes: montadas uma vez só.
+            self._frota = list(grid.SHIP_CONFIG.items())
+
+        metadados = {
+            "eu": motor.eu,
+            "geracao": motor.p2p_node.geracao,
+            "tamanho": grid.GRID_SIZE,
+            "frota": self._frota,
+            "estado": motor.estado_jogo,
+            "alvo": motor.ip_alvo_atual,
+            "saude": dict(grid.meus_navios_saude),
+            "navios_restantes": grid.navios_restantes,
+            "vezes_fui_atingido": grid.score_vezes_fui_atingido,
+            "jogadores_que_atingi": sorted(grid.score_jogadores_que_atingi),
+            # A visão é alterada pela thread da rede: list() copia de uma vez.
+            "membros": [
+                (membro, geracao, estado)
+                for membro, (geracao, estado) in list(
+                    motor.p2p_node.visao.entradas.items()
+                )
+            ],
+            "oponentes": {nome: par for par, nome in oponentes.items()},
+            "secoes": list(conjuntos),
+        }
+        # Cópias por último: coletas do gc disparadas pelas alocações acima
+        # percorreriam os conjuntos recém-copiados.
+        alteradas = {}
+        for nome, (assinatura, copiar) in conjuntos.items():
+            if self._assinaturas.get(nome) != assinatura:
+                self._assinaturas[nome] = assinatura
+                # A frota não muda depois de posicionada: lida pelo escritor.
+                alteradas[nome] = grid if copiar is None else copiar()
+        for nome in set(self._assinaturas) - set(conjuntos):
+            del self._assinaturas[nome]
+        if not alteradas and metadados == self._anteriores:
+            return False
+        self._anteriores = metadados
+        metadados = dict(metadados, instante=time.time())
+        with self._condicao:
+            # Escritor atrasado: a captura nova substitui a pendente, mas as
+            # seções alteradas das duas se somam.
+            if self._pendente is not None:
+                alteradas = {**self._pendente[1], **alteradas}
+            self._pendente = (metadados, alteradas)
+            self._condicao.notify()
+        return True
+
+    def _navios(self, grid):
+        indices = {nome: i for i, nome in enumerate(grid.SHIP_CONFIG)}
+        for nome, x, y, orientacao in grid.navios_posicionados():
+            yield from (indices[nome], x, y, orientacao == "v")
+
+    def _escrever(self):
+        while True:
+            with self._condicao:
+                while self._pendente is None and not self._encerrar:
+                    self._condicao.wait()
+                captura, self._pendente = self._pendente, None
+            if captura is None:
+                break
+            self._gravar(*captura)
+
+    def _gravar(self, metadados, alteradas):
+        inicio = time.perf_counter()
+        for nome, valores in alteradas.items():
+            if nome == "navios":
+                valores = self._navios(valores)
+            self._blocos[nome] = _codificar(valores)
+        secoes = metadados["secoes"]
+        for nome in set(self._blocos) - set(secoes):
+            del self._blocos[nome]
+        metadados["secoes"] = [[nome, len(self._blocos[nome])] for nome in secoes]
+        corpo = json.dumps(metadados).encode()
+
+        # Arquivo temporário + os.replace: quem lê vê o snapshot antigo ou o
+        # novo inteiro, nunca um pela metade.
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(_CABECALHO.pack(MAGICA, VERSAO, len(corpo)) + corpo)
+            for nome in secoes:
+                arquivo.write(self._blocos[nome])
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho)
+        self.gravados += 1
+        self.ultima_gravacao_s = time.perf_counter() - inicio
+
+    def fechar(self, motor=None):
+        if motor is not None:
+            self.capturar(motor)
+        with self._condicao:
+            self._encerrar = True
+            self._condicao.notify()
+        self._escritor.join()
+
+
+def carregar(caminho):
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    magica, versao, tamanho = _CABECALHO.unpack_from(dados, 0)
+    if magica != MAGICA or versao != VERSAO:
+        raise ValueError("arquivo não é um snapshot compatível")
+    posicao = _CABECALHO.size + tamanho
+    metadados = json.loads(dados[_CABECALHO.size : posicao])
+    secoes = {}
+    for nome, tamanho in metadados["secoes"]:
+        secoes[nome] = _decodificar(dados[posicao : posicao + tamanho])
+        posicao += tamanho
+    return metadados, secoes
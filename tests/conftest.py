@@ -0,0 +1,111 @@
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fila_eventos import FilaEventos  # noqa: E402
+from grid import Grid  # noqa: E402
+from motor import ESTADO_AGUARDANDO, MotorJogo  # noqa: E402
+from simulacao import EstrategiaAleatoria, NoBot, RedeMemoria, TransporteMemoria  # noqa: E402
+
+
+class RelogioSimulado:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    return RelogioSimulado()
+
+
+@pytest.fixture
+def drenar():
+    # drenar(fila, tipos) esvazia a fila e devolve os eventos dos tipos pedidos
+    # (todos, sem tipos).
+    def drenar(fila, tipos=None):
+        retirados = []
+        while not fila.empty():
+            evento = fila.get_nowait()
+            if tipos is None or evento[0] in tipos:
+                retirados.append(evento)
+        return retirados
+
+    return drenar
+
+
+@pytest.fixture
+def rede():
+    return RedeMemoria()
+
+
+@pytest.fixture
+def indices():
+    # Um índice por nó criado no teste: define o IP e a semente do nó.
+    return itertools.count()
+
+
+def _ip(indice):
+    return f"10.0.{indice // 250}.{indice % 250 + 1}"
+
+
+@pytest.fixture
+def criar_nos(rede, indices):
+    # criar_nos(n) -> n nós em memória, na rede e já anunciados.
+    def criar(quantidade, relogio=None, anunciar=True):
+        nos = []
+        for _ in range(quantidade):
+            indice = next(indices)
+            no = TransporteMemoria(FilaEventos(), rede, _ip(indice), semente=indice)
+            if relogio is not None:
+                no.detector.relogio = relogio
+            no.start()
+            nos.append(no)
+        if anunciar:
+            for no in nos:
+                no.anunciar()
+        return nos
+
+    return criar
+
+
+@pytest.fixture
+def criar_bots(rede, indices):
+    # criar_bots(n) -> n bots em memória que já se enxergam.
+    def criar(quantidade, **kwargs):
+        bots = []
+        for _ in range(quantidade):
+            indice = next(indices)
+            rng = random.Random(indice)
+            bot = NoBot(rede, _ip(indice), EstrategiaAleatoria(), rng, **kwargs)
+            bot.conectar()
+            bots.append(bot)
+        # Quem chegou antes não ouviu os anúncios seguintes: o gossip resolve.
+        for bot in bots:
+            bot.p2p_node.rodada_gossip()
+        for bot in bots:
+            bot.processar_eventos()
+        for bot in bots:
+            assert len(bot.grids_oponentes) == len(rede.nos) - 1
+        return bots
+
+    return criar
+
+
+@pytest.fixture
+def motor(rede):
+    # Motor sem pygame, com uma lancha em (0, 0) na horizontal.
+    fila = FilaEventos()
+    grid = Grid()
+    grid._posicionar_navio("lancha", 0, 0, 2, "h")
+    motor = MotorJogo(fila, TransporteMemoria(fila, rede, "10.0.0.1"), grid)
+    motor.verboso = False
+    motor.estado_jogo = ESTADO_AGUARDANDO
+    return motor
@@ -0,0 +1,187 @@
+import pytest
+
+import protocolo
+from confiabilidade import BaldeFichas, EstimadorRtt, JanelaDuplicatas
+from p2p_node import P2PNode
+
+
+def test_estimador_primeira_amostra_e_limites():
+    estimador = EstimadorRtt(rto_inicial=0.3, rto_minimo=0.1, rto_maximo=2.0)
+    assert estimador.rto == 0.3
+    estimador.amostrar(0.2)
+    assert estimador.srtt == 0.2 and estimador.rttvar == 0.1
+    assert estimador.rto == pytest.approx(0.2 + 4 * 0.1)
+    # Rede local rápida: o RTO não desce do mínimo.
+    for _ in range(50):
+        estimador.amostrar(0.001)
+    assert estimador.rto == 0.1
+    for _ in range(50):
+        estimador.amostrar(5.0)
+    assert estimador.rto == 2.0
+
+
+def test_estimador_suaviza_com_alfa_e_beta():
+    estimador = EstimadorRtt()
+    estimador.amostrar(0.1)
+    estimador.amostrar(0.3)
+    assert estimador.rttvar == pytest.approx(0.05 + (0.2 - 0.05) / 4)
+    assert estimador.srtt == pytest.approx(0.1 + 0.2 / 8)
+
+
+def test_recuo_exponencial_com_teto():
+    estimador = EstimadorRtt(rto_inicial=0.3, rto_maximo=2.0)
+    assert [estimador.recuo(t) for t in range(1, 6)] == pytest.approx(
+        [0.3, 0.6, 1.2, 2.0, 2.0]
+    )
+
+
+def test_janela_aguardando_e_resposta_guardada():
+    janela = JanelaDuplicatas(tamanho=2)
+    assert janela.receber(7) == (True, None)
+    # Duplicata antes da resposta: ainda sem o que reenviar.
+    assert janela.receber(7) == (False, JanelaDuplicatas.AGUARDANDO)
+    janela.responder(7, b"resposta")
+    assert janela.receber(7) == (False, b"resposta")
+
+
+def test_janela_esquece_o_mais_antigo():
+    janela = JanelaDuplicatas(tamanho=2)
+    for seq in (1, 2, 3):
+        janela.receber(seq)
+    assert list(janela.respostas) == [2, 3]
+    # Resposta de um seq que já saiu da janela não volta para ela.
+    janela.responder(1, b"velha")
+    assert 1 not in janela.respostas
+    assert janela.receber(1) == (True, None)
+
+
+def test_balde_rajada_e_reposicao():
+    balde = BaldeFichas(taxa=10, capacidade=5, agora=0.0)
+    assert [balde.retirar(1, 0.0) for _ in range(6)] == [True] * 5 + [False]
+    # Meio segundo repõe 5 fichas, sem passar da capacidade.
+    assert [balde.retirar(1, 0.5) for _ in range(6)] == [True] * 5 + [False]
+    assert [balde.retirar(1, 100.0) for _ in range(6)] == [True] * 5 + [False]
+
+
+def test_balde_lote_maior_que_o_saldo():
+    balde = BaldeFichas(taxa=10, capacidade=5, agora=0.0)
+    assert balde.retirar(8, 0.0)
+    assert balde.fichas == -3
+    # O saldo negativo é pago antes da próxima ficha: 0,4 s até voltar a 1.
+    assert not balde.retirar(1, 0.3)
+    assert balde.retirar(1, 0.4 + 1e-9)
+
+
+def _tipo(dados):
+    return dados[1]
+
+
+@pytest.fixture
+def dupla(criar_bots, rede, relogio):
+    # a atira em b numa rede com perdas: cada teste põe em `perdas` funções
+    # (origem, destino, dados) que decidem o que descartar.
+    perdas = []
+    rede.perda = lambda origem, destino, dados: any(
+        perder(origem, destino, dados) for perder in perdas
+    )
+    a, b = criar_bots(2)
+    for bot in (a, b):
+        bot.p2p_node.relogio = relogio
+    return a, b, perdas
+
+
+def _avancar(bots, relogio, segundos, passo=0.05):
+    for _ in range(round(segundos / passo)):
+        relogio.agora += passo
+        for bot in bots:
+            bot.p2p_node.disparar_temporizadores()
+
+
+def _alvo_de(bot, resultado):
+    # Uma casa do tabuleiro de `bot` que dá `resultado` no primeiro tiro.
+    for y in range(bot.grid.GRID_SIZE):
+        for x in range(bot.grid.GRID_SIZE):
+            tem_navio = bot.grid.celula(x, y) not in (
+                bot.grid.SIMBOLO_AGUA,
+                bot.grid.SIMBOLO_ERRO,
+            )
+            if tem_navio == (resultado == "hit"):
+                return x, y
+
+
+def test_retransmissao_recebe_resposta_guardada(dupla, relogio, drenar):
+    a, b, perdas = dupla
+    resultados_perdidos = []
+
+    def perder_primeiro_resultado(origem, destino, dados):
+        if _tipo(dados) == protocolo.TIPO_RESULTADO and not resultados_perdidos:
+            resultados_perdidos.append(dados)
+            return True
+        return False
+
+    perdas.append(perder_primeiro_resultado)
+    x, y = _alvo_de(b, "hit")
+    a.enviar_tiro(b.eu, x, y)
+    b.processar_eventos()
+    assert resultados_perdidos and a.callback_queue.empty()
+    saude = dict(b.grid.meus_navios_saude)
+
+    _avancar([a, b], relogio, EstimadorRtt().rto)
+    # b reconhece o seq e reenvia a resposta guardada, sem processar o tiro
+    # de novo (que daria "repeat" e tiraria mais vida do navio).
+    assert b.callback_queue.empty()
+    assert b.metricas.contadores["duplicatas"] == 1
+    assert b.grid.meus_navios_saude == saude
+    assert drenar(a.callback_queue) == [("resultado_tiro", b.eu, "hit", x, y)]
+
+
+def test_duplicata_aguardando_resposta_e_descartada(dupla, relogio, drenar):
+    a, b, _ = dupla
+    x, y = _alvo_de(b, "miss")
+    a.enviar_tiro(b.eu, x, y)
+    # b ainda não atendeu o tiro quando a retransmissão chega.
+    _avancar([a], relogio, EstimadorRtt().rto)
+    assert a.metricas.contadores["retransmissoes"] == 1
+    assert b.metricas.contadores["duplicatas"] == 1
+    assert a.callback_queue.empty()
+    assert b.callback_queue.qsize() == 1
+
+    b.processar_eventos()
+    assert drenar(a.callback_queue) == [("resultado_tiro", b.eu, "miss", x, y)]
+    # Karn: o tiro foi retransmitido, então a resposta não vira amostra.
+    estimador = a.p2p_node._rtts.get(b.eu)
+    assert estimador is None or estimador.srtt is None
+
+
+def test_amostra_de_rtt_sem_retransmissao(dupla, relogio):
+    a, b, _ = dupla
+    a.enviar_tiro(b.eu, 0, 0)
+    relogio.agora += 0.05
+    b.processar_eventos()
+    assert a.p2p_node._rtts[b.eu].srtt == pytest.approx(0.05)
+    assert a.metricas.contadores.get("retransmissoes", 0) == 0
+
+
+def test_recuo_exponencial_ate_tiro_perdido(dupla, relogio, drenar):
+    a, b, perdas = dupla
+    envios = []
+
+    def perder_tiros(origem, destino, dados):
+        if _tipo(dados) == protocolo.TIPO_TIRO:
+            envios.append(relogio.agora)
+            return True
+        return False
+
+    perdas.append(perder_tiros)
+    a.enviar_tiro(b.eu, 3, 3)
+    _avancar([a, b], relogio, 20)
+
+    estimador = EstimadorRtt()
+    assert len(envios) == P2PNode.MAX_TENTATIVAS
+    intervalos = [depois - antes for antes, depois in zip(envios, envios[1:])]
+    esperados = [estimador.recuo(t) for t in range(1, P2PNode.MAX_TENTATIVAS)]
+    assert intervalos == pytest.approx(esperados, abs=0.051)
+    assert a.metricas.contadores["retransmissoes"] == P2PNode.MAX_TENTATIVAS - 1
+    assert a.metricas.contadores["tiros_perdidos"] == 1
+    assert drenar(a.callback_queue) == [("tiro_perdido", b.eu, ((3, 3),))]
+    assert b.callback_queue.empty()
@@ -0,0 +1,123 @@
+import random
+
+import detector_falhas
+from detector_falhas import MORTO, SUSPEITO, VIVO, DetectorFalhas
+from p2p_node import P2PNode
+
+
+def _detector(relogio, pares):
+    # Mesmos parâmetros que o P2PNode usa com `pares` no rodízio de gossip.
+    rodizio = P2PNode.PERIODO_GOSSIP * max(1.0, pares / P2PNode.FANOUT_GOSSIP)
+    detector = DetectorFalhas(
+        relogio,
+        intervalo_esperado=rodizio,
+        limiar_suspeita=P2PNode.PHI_SUSPEITA,
+        limiar_morte=P2PNode.PHI_MORTE,
+        desvio_minimo=max(P2PNode.DESVIO_MINIMO, rodizio / 2),
+        pausa_aceitavel=P2PNode.PAUSA_ACEITAVEL,
+    )
+    return detector, rodizio
+
+
+def test_morte_detectada_e_volta_avisada(relogio):
+    detector, rodizio = _detector(relogio, 3)
+    for i in range(50):
+        relogio.agora = i * rodizio
+        assert detector.registrar("a") is None
+        assert detector.verificar() == []
+    transicoes = []
+    while MORTO not in [estado for _, estado in transicoes]:
+        relogio.agora += 0.5
+        transicoes.extend(detector.verificar())
+    assert [estado for _, estado in transicoes] == [SUSPEITO, MORTO]
+    assert detector.registrar("a") == MORTO
+    assert detector.estado("a") == VIVO
+
+
+def test_volta_de_morto_mantem_historico(relogio):
+    detector, rodizio = _detector(relogio, 30)
+    for i in range(20):
+        relogio.agora = i * rodizio
+        detector.registrar("a")
+    historico = detector._pares["a"]
+    intervalos = list(historico.intervalos)
+    relogio.agora += 1000
+    assert ("a", MORTO) in detector.verificar()
+    detector.registrar("a")
+    assert detector._pares["a"] is historico
+    assert list(historico.intervalos) == intervalos
+
+
+def test_batimento_no_ritmo_do_rodizio_sem_falsos_positivos(relogio):
+    # Cada par só nos visita a cada ~N/FANOUT rodadas, em posições sorteadas
+    # de uma permutação nova a cada volta: intervalos de 1 a ~2N/FANOUT.
+    rng = random.Random(0)
+    pares = 200
+    detector, rodizio = _detector(relogio, pares)
+    voltas = int(rodizio)
+    proximo = {}
+    for par in range(pares):
+        proximo[par] = rng.randrange(voltas)
+    transicoes = []
+    for rodada in range(3600):
+        relogio.agora = float(rodada)
+        for par in range(pares):
+            if proximo[par] == rodada:
+                detector.registrar(par)
+                inicio_volta = (rodada // voltas + 1) * voltas
+                proximo[par] = inicio_volta + rng.randrange(voltas)
+        transicoes.extend(detector.verificar())
+        relogio.agora += 0.5
+        transicoes.extend(detector.verificar())
+    assert transicoes == []
+
+
+def _rodar(nos, relogio, segundos):
+    # Gossip a cada PERIODO_GOSSIP e verificação a cada PERIODO_VERIFICACAO,
+    # como nas tarefas periódicas do nó.
+    passos = int(P2PNode.PERIODO_GOSSIP / P2PNode.PERIODO_VERIFICACAO)
+    for _ in range(int(segundos)):
+        for passo in range(passos):
+            relogio.agora += P2PNode.PERIODO_VERIFICACAO
+            if passo == 0:
+                for no in nos:
+                    no.rodada_gossip()
+            for no in nos:
+                no.verificar_falhas()
+
+
+def test_rodizio_de_gossip_sem_falsos_positivos(criar_nos, relogio, drenar):
+    nos = criar_nos(40, relogio)
+    _rodar(nos, relogio, 600)
+    for no in nos:
+        assert len(no.visao.vivos()) == len(nos)
+        assert drenar(no.callback_queue, ("peer_suspeito", "peer_morto")) == []
+        assert {e for e, _ in no.vivacidade().values()} == {detector_falhas.VIVO}
+
+
+def test_latencia_de_deteccao_no_rodizio(criar_nos, rede, relogio, drenar):
+    nos = criar_nos(40, relogio)
+    _rodar(nos, relogio, 120)
+    for no in nos:
+        drenar(no.callback_queue)
+
+    # Queda sem aviso: o nó some da rede, sem Saindo.
+    caido = nos.pop()
+    rede.remover(caido)
+    queda = relogio.agora
+    latencias = {}
+    while len(latencias) < len(nos) and relogio.agora - queda < 600:
+        _rodar(nos, relogio, 1)
+        for no in nos:
+            if no.eu not in latencias and drenar(
+                no.callback_queue, ("peer_morto",)
+            ):
+                latencias[no.eu] = relogio.agora - queda
+
+    rodizio = P2PNode.PERIODO_GOSSIP * (len(nos) / P2PNode.FANOUT_GOSSIP)
+    assert len(latencias) == len(nos)
+    # O último batimento pode ter vindo até um rodízio antes da queda, e phi 8
+    # fica a ~5,6 desvios (no mínimo meio rodízio cada) além da média.
+    assert max(latencias.values()) < 5 * rodizio + P2PNode.PAUSA_ACEITAVEL
+    for no in nos:
+        assert caido.eu not in no.get_participantes()
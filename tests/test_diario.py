@@ -0,0 +1,39 @@
+import diario
+import snapshot
+from fila_eventos import FilaEventos
+from grid import Grid
+from motor import MotorJogo
+from protocolo import Par
+from simulacao import TransporteMemoria
+
+ATACANTE = Par("10.0.0.9", 5001, 9)
+
+
+def _tiros(motor, coords):
+    for x, y in coords:
+        motor.callback_queue.put(("tiro_recebido", ATACANTE, x, y))
+    motor.processar_eventos_rede()
+
+
+def test_diario_depois_de_restaurar_nao_diverge(motor, rede, tmp_path):
+    # Lancha em (0, 0)-(1, 0): um acerto e dois erros antes do snapshot.
+    _tiros(motor, [(0, 0), (5, 5), (6, 6)])
+    caminho = str(tmp_path / "estado.snap")
+    snapshots = snapshot.Snapshots(caminho)
+    snapshots.fechar(motor)
+
+    fila = FilaEventos()
+    restaurado = MotorJogo(fila, TransporteMemoria(fila, rede, "10.0.0.1"), Grid())
+    restaurado.verboso = False
+    restaurado.restaurar_estado(caminho)
+    restaurado.iniciar_diario(str(tmp_path / "partida.diario"))
+    # Repetir (5, 5) só bate com o diário se ele souber do tiro anterior; o
+    # (1, 0) afunda a lancha já atingida.
+    _tiros(restaurado, [(5, 5), (1, 0)])
+    restaurado.fechar_diario()
+
+    relatorio = diario.reproduzir(str(tmp_path / "partida.diario"))
+    assert relatorio["eventos"]["restaurado"] == 3
+    assert relatorio["tiros_recebidos"] == {"repeat": 1, "game_over": 1}
+    assert relatorio["divergencias"] == 0
+    assert relatorio["navios_restantes"] == 0
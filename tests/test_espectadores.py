@@ -0,0 +1,70 @@
+import json
+
+from espectadores import EU, coalescer
+from grid import Grid
+from protocolo import Par
+
+OPONENTE = Par("10.0.0.2", 5001, 2)
+
+
+def _retrato(motor, feed):
+    corpo, seq = feed.retrato(0)
+    if corpo is None:
+        # O retrato é capturado pela thread do jogo, a pedido.
+        motor.processar_eventos_rede()
+        corpo, seq = feed.retrato(0)
+    return json.loads(corpo), seq
+
+
+def _tiro(motor, x, y):
+    motor.grid.processar_tiro(x, y)
+    motor.celulas_alteradas.add((None, x, y))
+    motor.processar_eventos_rede()
+    motor.celulas_alteradas.clear()
+
+
+def test_retrato_e_deltas(motor):
+    feed = motor.iniciar_espectadores()
+    feed.entrar()
+    retrato, seq = _retrato(motor, feed)
+    assert retrato["tabuleiros"][EU]["navios"] == [0, 1]
+
+    _tiro(motor, 0, 0)
+    _tiro(motor, 3, 3)
+    _tiro(motor, 0, 0)
+    entradas, cursor = feed.aguardar(seq, 0)
+    delta = coalescer(entradas)
+    assert delta["celulas"][EU] == [[0, Grid.SIMBOLO_ATINGIDO], [33, Grid.SIMBOLO_ERRO]]
+    assert cursor > seq
+
+
+def test_novo_espectador_nao_recebe_retrato_velho(motor):
+    feed = motor.iniciar_espectadores()
+    feed.entrar()
+    _retrato(motor, feed)
+    feed.sair()
+
+    # Sem espectadores a mudança não entra no anel.
+    _tiro(motor, 3, 3)
+
+    feed.entrar()
+    corpo, _ = feed.retrato(0)
+    assert corpo is None
+    retrato, seq = _retrato(motor, feed)
+    assert retrato["tabuleiros"][EU]["erros"] == [33]
+    assert feed.retratos == 2
+    assert feed.aguardar(seq, 0) == ([], seq)
+
+
+def test_oponente_que_entra_sem_espectadores(motor):
+    feed = motor.iniciar_espectadores()
+    feed.entrar()
+    _retrato(motor, feed)
+    feed.sair()
+
+    motor.callback_queue.put(("novo_participante", OPONENTE))
+    motor.processar_eventos_rede()
+
+    feed.entrar()
+    retrato, _ = _retrato(motor, feed)
+    assert str(OPONENTE) in retrato["tabuleiros"]
@@ -0,0 +1,102 @@
+import time
+
+import protocolo
+from fila_eventos import FilaEventos
+from p2p_node import P2PNode
+from protocolo import Par
+
+ATACANTE = Par("10.0.0.9", 5001, 9)
+
+
+def test_faixa_de_tiros_limitada_e_atendida_por_ultimo(drenar):
+    fila = FilaEventos(limite_tiros=4)
+    for i in range(10):
+        fila.put(("tiro_recebido", ATACANTE, i, 0))
+        if i % 3 == 0:
+            fila.put(("resultado_tiro", ATACANTE, "miss", i, 0))
+    fila.put(("jogador_saiu", ATACANTE))
+
+    assert not fila.aceita_tiros()
+    assert fila.descartados == 6
+    assert fila.qsize() == 4 + 5
+    eventos = drenar(fila)
+    tipos = [evento[0] for evento in eventos]
+    # Todo o resto antes do primeiro tiro, cada faixa na ordem de chegada.
+    assert tipos == ["resultado_tiro"] * 4 + ["jogador_saiu"] + ["tiro_recebido"] * 4
+    assert [evento[2] for evento in eventos[5:]] == [0, 1, 2, 3]
+    assert fila.aceita_tiros()
+
+
+def test_salvas_dividem_a_faixa_com_tiros(drenar):
+    fila = FilaEventos(limite_tiros=2)
+    fila.put(("salvo_recebido", ATACANTE, [(0, 0), (1, 1)]))
+    fila.put(("tiro_recebido", ATACANTE, 2, 2))
+    fila.put(("salvo_recebido", ATACANTE, [(3, 3)]))
+    assert fila.descartados == 1
+    fila.put(("novo_participante", ATACANTE))
+    assert [evento[0] for evento in drenar(fila)] == [
+        "novo_participante",
+        "salvo_recebido",
+        "tiro_recebido",
+    ]
+
+
+def _inundar(rede, vitima, inundador, quantidade, inicio=0):
+    # Datagramas de tiro de um par da visão, como um cliente com defeito.
+    for seq in range(inicio, inicio + quantidade):
+        rede.entregar_udp(
+            inundador.p2p_node.endereco,
+            vitima.p2p_node.endereco,
+            protocolo.codificar_tiro(seq, seq % 10, seq // 10 % 10),
+        )
+
+
+def test_inundacao_com_faixa_cheia_nao_atrasa_prioritarios(criar_bots, rede):
+    vitima, bom, inundador = criar_bots(3)
+    vitima.callback_queue.limite_tiros = 16
+    _inundar(rede, vitima, inundador, 5000)
+    contadores = vitima.metricas.contadores
+    assert contadores["tiros_sem_vaga"] == 5000 - 16
+    assert vitima.callback_queue.qsize() == 16
+
+    # Um resultado para a vítima, com a faixa de tiros cheia, é o primeiro
+    # evento atendido.
+    vitima.enviar_tiro(bom.eu, 0, 0)
+    bom.processar_eventos()
+    assert vitima.callback_queue.queue[0][:2] == ("resultado_tiro", bom.eu)
+    assert vitima.callback_queue.get_nowait()[0] == "resultado_tiro"
+
+
+def test_inundacao_limitada_por_par(criar_bots, rede, relogio):
+    vitima, bom, inundador = criar_bots(3)
+    vitima.p2p_node.TAXA_TIROS = P2PNode.TAXA_TIROS
+    # Relógio parado: o balde só tem a rajada inicial.
+    vitima.p2p_node.relogio = relogio
+    _inundar(rede, vitima, inundador, 5000)
+    contadores = vitima.metricas.contadores
+    assert contadores["tiros_limitados"] == 5000 - P2PNode.RAJADA_TIROS
+    assert contadores.get("tiros_sem_vaga", 0) == 0
+    assert vitima.callback_queue.qsize() == P2PNode.RAJADA_TIROS
+
+    # Um segundo depois, só a taxa de reposição entra (seqs e casas ainda
+    # não admitidas).
+    relogio.agora += 1
+    _inundar(rede, vitima, inundador, 5000, inicio=P2PNode.RAJADA_TIROS)
+    assert vitima.callback_queue.qsize() == P2PNode.RAJADA_TIROS + int(
+        P2PNode.TAXA_TIROS
+    )
+
+    # O par bem-comportado tem balde próprio: o tiro dele entra atrás da
+    # inundação admitida e é respondido na mesma passada do loop, sem esperar
+    # retransmissão.
+    admitidos = vitima.callback_queue.qsize()
+    bom.tiro_pendente = (vitima.eu, 5, 5, time.perf_counter(), bom.rodada)
+    bom.enviar_tiro(vitima.eu, 5, 5)
+    assert vitima.callback_queue.qsize() == admitidos + 1
+    vitima.processar_eventos()
+    assert vitima.callback_queue.qsize() == 0
+    bom.processar_eventos()
+    assert bom.tiro_pendente is None
+    assert bom.metricas.contadores.get("retransmissoes", 0) == 0
+    resultados = inundador.metricas.mensagens["entrada"][0]
+    assert resultados[protocolo.TIPO_RESULTADO] == admitidos
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+import protocolo
+from grid import Grid, frota_ampliada
+from grid_bitboard import GridBitboard
+
+np = pytest.importorskip("numpy")
+
+from grid_batch import GridBatch  # noqa: E402
+
+
+def _grids(quantidade, semente):
+    random.seed(semente)
+    grids = []
+    for _ in range(quantidade):
+        grid = Grid()
+        grid.posicionar_navios_aleatorio()
+        grids.append(grid)
+    return grids
+
+
+def _conferir(grids, lote, xs, ys):
+    esperado = [g.processar_tiro(x, y) for g, x, y in zip(grids, xs, ys)]
+    obtido = [protocolo.RESULTADOS[c] for c in lote.processar_tiros(xs, ys)]
+    assert obtido == esperado
+
+
+@pytest.mark.parametrize("semente", range(3))
+def test_diferencial_tiros_aleatorios(semente):
+    # Coordenadas de -1 a GRID_SIZE: fora do tabuleiro de propósito e, com
+    # 150 tiros em ~144 células possíveis, muitas repetições.
+    grids = _grids(200, semente)
+    lote = GridBatch.de_grids(grids)
+    rng = random.Random(semente)
+    for _ in range(150):
+        xs = [rng.randrange(-1, Grid.GRID_SIZE + 1) for _ in grids]
+        ys = [rng.randrange(-1, Grid.GRID_SIZE + 1) for _ in grids]
+        _conferir(grids, lote, xs, ys)
+    assert list(lote.score_vezes_fui_atingido) == [
+        g.score_vezes_fui_atingido for g in grids
+    ]
+    assert list(lote.derrotados()) == [g.navios_restantes == 0 for g in grids]
+
+
+def test_diferencial_tabuleiros_inteiros():
+    # Todas as células em ordem aleatória, depois a mesma rodada de novo:
+    # cada tabuleiro termina em game_over e a repetição só dá repeat.
+    grids = _grids(50, 7)
+    lote = GridBatch.de_grids(grids)
+    rng = random.Random(7)
+    celulas = Grid.GRID_SIZE * Grid.GRID_SIZE
+    ordens = [rng.sample(range(celulas), celulas) for _ in grids]
+    for rodada in range(celulas):
+        alvos = [ordem[rodada] for ordem in ordens]
+        xs = [a % Grid.GRID_SIZE for a in alvos]
+        ys = [a // Grid.GRID_SIZE for a in alvos]
+        _conferir(grids, lote, xs, ys)
+    assert lote.derrotados().all()
+    _conferir(grids, lote, xs, ys)
+
+
+def test_fora_do_tabuleiro_nao_marca_celula():
+    grids = _grids(2, 3)
+    lote = GridBatch.de_grids(grids)
+    n = Grid.GRID_SIZE
+    for x, y in [(-1, 0), (n, 0), (0, -1), (0, n), (-5, n + 5)]:
+        _conferir(grids, lote, [x, x], [y, y])
+    assert not lote.atirado.any()
+
+
+@pytest.mark.parametrize("copias, bytes_indice", [(1, 1), (40, 2), (9000, 4)])
+def test_indice_de_navio_cabe_na_frota(copias, bytes_indice):
+    frota = frota_ampliada(copias)
+    lote = GridBatch(1, 10, frota)
+    assert lote.navio_id.dtype.itemsize == bytes_indice
+    assert np.iinfo(lote.navio_id.dtype).max >= len(frota) - 1
+
+
+def test_diferencial_frota_ampliada():
+    # 200 navios: índices acima de 127, que não cabiam em int8.
+    tamanho = 100
+    random.seed(5)
+    grids = []
+    for _ in range(3):
+        grid = Grid(tamanho, frota_ampliada(50))
+        grid.posicionar_navios_aleatorio()
+        grids.append(grid)
+    lote = GridBatch.de_grids(grids)
+    rng = random.Random(5)
+    alvos = [sorted(g.navio_na_celula, key=lambda _: rng.random()) for g in grids]
+    for rodada in range(len(alvos[0])):
+        idx = [a[rodada] for a in alvos]
+        _conferir(grids, lote, [i % tamanho for i in idx], [i // tamanho for i in idx])
+    assert lote.derrotados().all()
+
+
+@pytest.mark.parametrize("classe", [Grid, GridBitboard])
+def test_de_grids_com_tabuleiros_em_jogo(classe):
+    # Tabuleiros que já levaram tiros: as mesmas casas dão repeat no lote.
+    random.seed(11)
+    grids = []
+    for _ in range(20):
+        grid = classe()
+        grid.posicionar_navios_aleatorio()
+        grids.append(grid)
+    rng = random.Random(11)
+    atirados = [
+        [
+            (rng.randrange(Grid.GRID_SIZE), rng.randrange(Grid.GRID_SIZE))
+            for _ in range(40)
+        ]
+        for _ in grids
+    ]
+    for grid, tiros in zip(grids, atirados):
+        grid.processar_salvo(tiros)
+    lote = GridBatch.de_grids(grids)
+    assert list(lote.score_vezes_fui_atingido) == [
+        g.score_vezes_fui_atingido for g in grids
+    ]
+    for rodada in range(40):
+        _conferir(
+            grids,
+            lote,
+            [tiros[rodada][0] for tiros in atirados],
+            [tiros[rodada][1] for tiros in atirados],
+        )
+    assert list(lote.score_vezes_fui_atingido) == [
+        g.score_vezes_fui_atingido for g in grids
+    ]
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from grid import Grid, frota_ampliada
+from grid_bitboard import GridBitboard
+
+
+def _dupla(semente, tamanho=None, frota=None):
+    # A mesma frota nos dois tabuleiros.
+    grid = Grid(tamanho, frota)
+    grid.posicionar_navios_aleatorio(random.Random(semente))
+    bitboard = GridBitboard(tamanho, frota)
+    for nome, x, y, orientacao in grid.navios_posicionados():
+        bitboard._posicionar_navio(nome, x, y, grid.SHIP_CONFIG[nome], orientacao)
+    return grid, bitboard
+
+
+def _estado(grid):
+    return (
+        grid.meu_grid,
+        sorted(grid.celulas_marcadas()),
+        grid.navios_restantes,
+        grid.meus_navios_saude,
+        grid.score_vezes_fui_atingido,
+    )
+
+
+@pytest.mark.parametrize(
+    "semente, tamanho, frota",
+    [(0, None, None), (1, None, None), (2, 30, frota_ampliada(3))],
+)
+def test_diferencial_contra_grid(semente, tamanho, frota):
+    grid, bitboard = _dupla(semente, tamanho, frota)
+    n = grid.GRID_SIZE
+    assert _estado(bitboard) == _estado(grid)
+    rng = random.Random(semente)
+    # Coordenadas de -1 a n (fora do tabuleiro de propósito) com muitas
+    # repetições; depois todas as células, até o fim da partida.
+    tiros = [
+        (rng.randrange(-1, n + 1), rng.randrange(-1, n + 1)) for _ in range(n * n)
+    ]
+    todas = [(x, y) for y in range(n) for x in range(n)]
+    rng.shuffle(todas)
+    for x, y in tiros + todas:
+        assert bitboard.processar_tiro(x, y) == grid.processar_tiro(x, y)
+        assert _estado(bitboard) == _estado(grid)
+    assert grid.navios_restantes == 0
+
+
+def test_repeticao_e_fora_do_tabuleiro():
+    grid, bitboard = _dupla(3)
+    nome, x, y, _ = next(bitboard.navios_posicionados())
+    for tabuleiro in (grid, bitboard):
+        assert tabuleiro.processar_tiro(x, y) == "hit"
+        assert tabuleiro.processar_tiro(x, y) == "repeat"
+        assert tabuleiro.processar_tiro(-1, 0) == "miss"
+        assert tabuleiro.processar_tiro(0, tabuleiro.GRID_SIZE) == "miss"
+        # Repetir não tira mais vida do navio.
+        assert tabuleiro.meus_navios_saude[nome] == tabuleiro.SHIP_CONFIG[nome] - 1
+        assert tabuleiro.score_vezes_fui_atingido == 1
+
+
+def test_validacao_de_posicao_igual():
+    grid, bitboard = _dupla(4)
+    rng = random.Random(4)
+    for _ in range(200):
+        x, y = rng.randrange(Grid.GRID_SIZE), rng.randrange(Grid.GRID_SIZE)
+        grid.processar_tiro(x, y)
+        bitboard.processar_tiro(x, y)
+    for y in range(Grid.GRID_SIZE):
+        for x in range(Grid.GRID_SIZE):
+            for tamanho in (2, 5):
+                for orientacao in "hv":
+                    assert bitboard._validar_posicao(
+                        x, y, tamanho, orientacao
+                    ) == grid._validar_posicao(x, y, tamanho, orientacao)
@@ -0,0 +1,167 @@
+import os
+import socket
+import sys
+import time
+from collections import Counter
+
+import pytest
+
+import protocolo
+from fila_eventos import FilaEventos
+from grid import Grid
+from p2p_node import P2PNode, grupo_da_sala, id_sala
+
+# Nós reais (sockets, asyncio, multicast) em endereços 127.0.0.x distintos.
+SALAS = {"alfa": 6, "beta": 2}
+PRAZO = 10.0
+OBSERVACAO = 1.0
+IGMP = "/proc/net/igmp"
+INTRUSO = "127.0.0.250"
+
+
+class NoLoopback(P2PNode):
+    proximo_ip = 2
+
+    def _get_meu_ip_local(self):
+        ip = f"127.0.0.{NoLoopback.proximo_ip}"
+        NoLoopback.proximo_ip += 1
+        return ip
+
+    def _tratar_datagrama(self, data, origem):
+        self.origens[origem[0]] += 1
+        super()._tratar_datagrama(data, origem)
+
+
+def _multicast_em_loopback():
+    # Um datagrama de 127.0.0.2 para um grupo inscrito em 127.0.0.1 precisa
+    # voltar; sem isso (sem rota multicast no lo, outro sistema) não há teste.
+    grupo = grupo_da_sala("sonda")
+    recepcao = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    envio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        recepcao.bind((grupo, 0))
+        recepcao.setsockopt(
+            socket.IPPROTO_IP,
+            socket.IP_ADD_MEMBERSHIP,
+            socket.inet_aton(grupo) + socket.inet_aton("127.0.0.1"),
+        )
+        recepcao.settimeout(1.0)
+        envio.bind(("127.0.0.2", 0))
+        envio.setsockopt(
+            socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton("127.0.0.2")
+        )
+        envio.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        envio.sendto(b"sonda", (grupo, recepcao.getsockname()[1]))
+        return recepcao.recv(16) == b"sonda"
+    except OSError:
+        return False
+    finally:
+        recepcao.close()
+        envio.close()
+
+
+pytestmark = pytest.mark.skipif(
+    not _multicast_em_loopback(), reason="multicast em loopback indisponível"
+)
+
+
+def _grupos_inscritos():
+    # Grupos em /proc/net/igmp aparecem em hexadecimal, na ordem do host.
+    if not os.path.exists(IGMP):
+        return None
+    grupos = set()
+    with open(IGMP) as arquivo:
+        for linha in arquivo:
+            campos = linha.split()
+            if linha.startswith("\t") and len(campos[0]) == 8:
+                valor = int(campos[0], 16).to_bytes(4, sys.byteorder)
+                grupos.add(socket.inet_ntoa(valor))
+    return grupos
+
+
+def _anuncio_intruso(sala_alvo):
+    # Um nó de outra sala cujo nome caísse no mesmo grupo (colisão do hash).
+    envio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    envio.bind((INTRUSO, 0))
+    envio.setsockopt(
+        socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(INTRUSO)
+    )
+    tamanho, frota = Grid().config_jogo()
+    envio.sendto(
+        protocolo.codificar_conectando(1, 1, id_sala("intrusa"), tamanho, frota),
+        (grupo_da_sala(sala_alvo), P2PNode.UDP_PORT),
+    )
+    envio.close()
+
+
+def _criar_no(sala):
+    no = NoLoopback(FilaEventos(), sala=sala)
+    no.origens = Counter()
+    no.config_jogo = Grid().config_jogo()
+    return no
+
+
+def _convergiu(nos):
+    for membros in nos.values():
+        pares = {no.eu for no in membros}
+        if any(set(no.get_participantes()) != pares - {no.eu} for no in membros):
+            return False
+    return all(
+        no.metricas.contadores["anuncios_outra_sala"] == 1 for no in nos["alfa"]
+    )
+
+
+@pytest.fixture
+def salas():
+    nos = {sala: [_criar_no(sala) for _ in range(n)] for sala, n in SALAS.items()}
+    todos = [no for membros in nos.values() for no in membros]
+    try:
+        for no in todos:
+            no.start()
+        yield nos
+    finally:
+        for no in todos:
+            no.stop()
+
+
+def test_salas_isoladas(salas):
+    inscritos = _grupos_inscritos()
+    for membros in salas.values():
+        for no in membros:
+            no.anunciar()
+    _anuncio_intruso("alfa")
+
+    limite = time.monotonic() + PRAZO
+    while not _convergiu(salas) and time.monotonic() < limite:
+        time.sleep(0.1)
+    # Mais um pouco de gossip: um vazamento entre salas teria tempo de aparecer.
+    time.sleep(OBSERVACAO)
+
+    for sala, membros in salas.items():
+        ips = {no.MEU_IP for no in membros}
+        pares = {no.eu for no in membros}
+        for no in membros:
+            assert set(no.get_participantes()) == pares - {no.eu}, sala
+            # O intruso chega pelo grupo de propósito; quem vaza é outra sala.
+            assert set(no.origens) - ips - {INTRUSO} == set(), sala
+    # Todos de alfa recusam o anúncio da sala intrusa.
+    assert [
+        no.metricas.contadores["anuncios_outra_sala"] for no in salas["alfa"]
+    ] == [1] * SALAS["alfa"]
+
+    if inscritos is not None:
+        for sala in salas:
+            assert grupo_da_sala(sala) in inscritos
+
+
+def test_saida_cancela_inscricao():
+    if _grupos_inscritos() is None:
+        pytest.skip(f"{IGMP} indisponível")
+    no = _criar_no("gama")
+    grupo = grupo_da_sala("gama")
+    no.start()
+    try:
+        assert grupo in _grupos_inscritos()
+    finally:
+        no.stop()
+    assert grupo not in _grupos_inscritos()
@@ -0,0 +1,102 @@
+import time
+
+import protocolo
+from fila_eventos import FilaEventos
+from membros import SAIU, VIVO, VisaoMembros
+from protocolo import Par
+from simulacao import TransporteMemoria
+
+EU = Par("10.0.0.1", 5001, 1)
+OUTRO = Par("10.0.0.2", 5001, 2)
+
+
+def test_mesclar_aplica_geracao_maior():
+    visao = VisaoMembros(EU, 100)
+    assert visao.mesclar([(OUTRO, 50, VIVO)]) == ([OUTRO], [])
+    assert visao.mesclar([(OUTRO, 50, SAIU)]) == ([], [OUTRO])
+    # Mesma geração: a saída vence e a volta é ignorada.
+    assert visao.mesclar([(OUTRO, 50, VIVO)]) == ([], [])
+    assert visao.mesclar([(OUTRO, 51, VIVO)]) == ([OUTRO], [])
+
+
+def test_digest_nao_depende_da_ordem():
+    a = VisaoMembros(EU, 100)
+    b = VisaoMembros(EU, 100)
+    entradas = [(Par("10.0.0.%d" % i, 5001, i), i, VIVO) for i in range(2, 40)]
+    a.mesclar(entradas)
+    b.mesclar(reversed(entradas))
+    assert a.digest == b.digest
+
+
+def test_boato_de_saida_e_desmentido():
+    visao = VisaoMembros(EU, 100)
+    visao.rumores.clear()
+    assert visao.mesclar([(EU, 100, SAIU)]) == ([], [])
+    assert visao.entradas[EU] == (101, VIVO)
+    assert visao.geracao == 101
+    # O desmentido vira rumor para ser espalhado.
+    assert (EU, 101, VIVO) in visao.rumores_para_envio(8)
+
+
+def test_desmentido_passa_da_geracao_vista():
+    visao = VisaoMembros(EU, 100)
+    visao.mesclar([(EU, 250, SAIU)])
+    assert visao.entradas[EU] == (251, VIVO)
+    # Notícias velhas sobre nós não mudam nada.
+    visao.mesclar([(EU, 200, SAIU), (EU, 251, VIVO)])
+    assert visao.entradas[EU] == (251, VIVO)
+
+
+def test_volta_na_mesma_geracao_e_aceita(criar_nos, rede, monkeypatch):
+    # Sai e volta no mesmo segundo: mesma geração, que os outros já têm como
+    # saída. O desmentido do próprio nó o traz de volta.
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    a, b = criar_nos(2)
+    assert a.visao.esta_vivo(b.eu)
+
+    geracao = b.geracao
+    b.stop()
+    assert not a.visao.esta_vivo(b.eu)
+
+    antigo = b
+    b = TransporteMemoria(FilaEventos(), rede, antigo.eu.ip)
+    b.retomar([], geracao - 1, eu=antigo.eu)
+    assert b.eu == antigo.eu and b.geracao == geracao
+    b.start()
+    # a ignora o anúncio, mas conta a b que o tem como saído; b se desmente
+    # numa geração maior e pede a visão completa, que ainda não tem.
+    b.anunciar()
+    assert b.geracao == geracao + 1
+    assert b.visao.esta_vivo(a.eu)
+    b.rodada_gossip()
+    assert a.visao.esta_vivo(b.eu)
+    assert a.visao.entradas[b.eu] == (geracao + 1, VIVO)
+
+
+def test_divergencia_contada_por_par(criar_nos, rede):
+    a, b, c = criar_nos(3)
+
+    def pedidos(no):
+        return no.metricas.mensagens["entrada"][0][protocolo.TIPO_PEDIDO_SYNC]
+
+    def gossip_divergente(origem):
+        rede.entregar_udp(
+            origem.endereco,
+            a.endereco,
+            protocolo.codificar_gossip(a.visao.digest ^ 1, []),
+        )
+
+    limite = a.LIMITE_DIVERGENCIA
+    for _ in range(limite - 1):
+        gossip_divergente(b)
+        gossip_divergente(c)
+    # Sem contador por par, as divergências de b e c somadas já teriam
+    # disparado uma sincronização.
+    assert pedidos(b) == pedidos(c) == 0
+    rede.entregar_udp(
+        c.endereco, a.endereco, protocolo.codificar_gossip(a.visao.digest, [])
+    )
+    gossip_divergente(b)
+    assert (pedidos(b), pedidos(c)) == (1, 0)
+    gossip_divergente(c)
+    assert (pedidos(b), pedidos(c)) == (1, 0)
@@ -0,0 +1,34 @@
+from metricas import Metricas, MetricasDesligadas
+
+
+def test_esquecer_remove_o_rotulo_de_todos_os_histogramas():
+    metricas = Metricas()
+    metricas.observar("rtt_tiro_s", 0.01, "a")
+    metricas.observar("rtt_tiro_s", 0.02, "b")
+    metricas.observar("rtt_salvo_s", 0.03, "a")
+    metricas.observar("quadro_s", 0.004)
+    metricas.esquecer("a")
+    metricas.esquecer("nunca-visto")
+    histogramas = metricas.snapshot()["histogramas"]
+    assert list(histogramas["rtt_tiro_s"]) == ["b"]
+    assert histogramas["rtt_salvo_s"] == {}
+    assert histogramas["quadro_s"]["contagem"] == 1
+
+
+def test_esquecer_desligada():
+    metricas = MetricasDesligadas()
+    metricas.observar("rtt_tiro_s", 0.01, "a")
+    metricas.esquecer("a")
+    assert metricas.histogramas == {}
+
+
+def test_par_que_sai_leva_os_histogramas(criar_bots):
+    a, b, c = criar_bots(3)
+    for alvo in (b, c):
+        a.enviar_tiro(alvo.eu, 0, 0)
+        alvo.processar_eventos()
+    a.processar_eventos()
+    assert set(a.metricas.histogramas["rtt_tiro_s"]) == {b.eu, c.eu}
+
+    b.p2p_node.stop()
+    assert set(a.metricas.histogramas["rtt_tiro_s"]) == {c.eu}
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+
+from grid import Grid, GridOponente
+from mira import PESO_ACERTO, BuscaEsparsa, MapaCalor, Mira
+from protocolo import Par
+
+
+def _recontar(mapa, bloqueadas):
+    # Calor calculado do zero: cada posição que não passa por erro nem por
+    # navio afundado pesa restantes * (1 + PESO_ACERTO * acertos que cobre).
+    calor = [0] * (mapa.tamanho_grid**2)
+    for tamanho, (mascaras, celulas, _) in mapa.tabelas.items():
+        for mascara, celulas_p in zip(mascaras, celulas):
+            if mascara & bloqueadas:
+                continue
+            cobertos = bin(mascara & mapa.acertos).count("1")
+            peso = mapa.restantes[tamanho] * (1 + PESO_ACERTO * cobertos)
+            for c in celulas_p:
+                calor[c] += peso
+    return calor
+
+
+@pytest.mark.parametrize("semente", range(4))
+def test_incremental_igual_a_recontagem(semente):
+    # Outro jogador já atirou em parte do tabuleiro: essas casas voltam
+    # "repeat" para nós.
+    rng = random.Random(semente)
+    grid = Grid()
+    grid.posicionar_navios_aleatorio(rng)
+    n = grid.GRID_SIZE
+    celulas = list(range(n * n))
+    rng.shuffle(celulas)
+    for idx in celulas[:15]:
+        grid.processar_tiro(idx % n, idx // n)
+
+    mapa = MapaCalor()
+    bloqueadas = 0
+    rng.shuffle(celulas)
+    for idx in celulas:
+        x, y = idx % n, idx // n
+        resultado = grid.processar_tiro(x, y)
+        # Com casas desconhecidas o navio afundado pode ser ambíguo: a
+        # recontagem usa as casas que a própria mira deu como afundadas.
+        candidatas = mapa.acertos | mapa.desconhecidas | 1 << idx
+        mapa.registrar_resultado(resultado, x, y)
+        if resultado == "miss":
+            bloqueadas |= 1 << idx
+        elif resultado in ("destroyed", "game_over"):
+            bloqueadas |= candidatas & ~(mapa.acertos | mapa.desconhecidas)
+        assert mapa.calor == _recontar(mapa, bloqueadas)
+        if resultado == "game_over":
+            break
+
+
+def test_repeat_nao_invalida_posicoes_nem_e_escolhido():
+    mapa = MapaCalor()
+    antes = list(mapa.calor)
+    mapa.registrar_resultado("repeat", 4, 4)
+    assert mapa.calor == antes
+    assert mapa.melhor_celula()[1:] != (4, 4)
+    mapa.registrar_resultado("miss", 4, 5)
+    assert mapa.calor != antes
+
+    # Um erro no mesmo lugar teria zerado as posições que passam por ele.
+    erro = MapaCalor()
+    erro.registrar_resultado("miss", 4, 4)
+    assert erro.calor[4 * Grid.GRID_SIZE + 5] < antes[4 * Grid.GRID_SIZE + 5]
+
+
+def test_afundado_por_casas_desconhecidas():
+    # Lancha em (0, 0)-(1, 0): outro jogador acertou (0, 0), que nos volta
+    # "repeat"; nosso tiro em (1, 0) afunda a lancha.
+    mapa = MapaCalor()
+    mapa.registrar_resultado("repeat", 0, 0)
+    mapa.registrar_resultado("destroyed", 1, 0)
+    assert mapa.restantes[2] == 0
+    assert mapa.desconhecidas == 0 and mapa.acertos == 0
+    assert mapa.calor == _recontar(mapa, 0b11)
+
+
+def test_afundado_prefere_acertos_proprios():
+    # Acerto nosso à esquerda, casa desconhecida embaixo: a lancha afundada é
+    # a dos nossos acertos, e a desconhecida continua desconhecida.
+    mapa = MapaCalor()
+    mapa.registrar_resultado("repeat", 5, 6)
+    mapa.registrar_resultado("hit", 4, 5)
+    mapa.registrar_resultado("destroyed", 5, 5)
+    n = Grid.GRID_SIZE
+    assert mapa.desconhecidas == 1 << (6 * n + 5)
+    assert mapa.calor == _recontar(mapa, 1 << (5 * n + 4) | 1 << (5 * n + 5))
+
+
+def test_busca_esparsa_nao_repete_casa_bloqueada():
+    busca = BuscaEsparsa(3, random.Random(0))
+    for c in range(8):
+        busca.registrar_resultado("repeat", c % 3, c // 3)
+    assert busca.vizinhos == []
+    assert busca.melhor_celula() == (BuscaEsparsa.PRIORIDADE_CACA, 2, 2)
+
+
+def test_mira_registra_repeat_por_oponente():
+    mira = Mira()
+    mira.adicionar_oponente("a")
+    mira.registrar_resultado("a", "repeat", 0, 0)
+    assert mira.mapas["a"].desconhecidas == 1
+    assert mira.mapas["a"].calor == MapaCalor().calor
+
+
+@pytest.mark.parametrize("tamanho", [10, GridOponente.LIMITE_COMPACTO + 1])
+def test_visao_do_oponente_guarda_bloqueio(tamanho):
+    # Byte por célula e conjuntos esparsos guardam o bloqueio do mesmo jeito.
+    oponente = GridOponente(tamanho)
+    oponente.marcar(1, 0, Grid.SIMBOLO_BLOQUEADO)
+    oponente.restaurar([2], [3], [4])
+    assert oponente.celula(1, 0) == Grid.SIMBOLO_BLOQUEADO
+    assert oponente.bloqueados == {1, 4}
+    assert sorted(oponente.celulas_marcadas()) == [
+        (1, 0, Grid.SIMBOLO_BLOQUEADO),
+        (2, 0, Grid.SIMBOLO_ATINGIDO),
+        (3, 0, Grid.SIMBOLO_ERRO),
+        (4, 0, Grid.SIMBOLO_BLOQUEADO),
+    ]
+    oponente.marcar(1, 0, Grid.SIMBOLO_ATINGIDO)
+    assert oponente.bloqueados == {4} and oponente.acertos == {1, 2}
+
+
+def test_motor_marca_repeat_como_bloqueio(motor):
+    oponente = Par("10.0.0.2", 5001, 2)
+    motor.callback_queue.put(("novo_participante", oponente))
+    motor.callback_queue.put(("resultado_tiro", oponente, "repeat", 3, 3))
+    motor.processar_eventos_rede()
+    assert motor.grids_oponentes[oponente].celula(3, 3) == Grid.SIMBOLO_BLOQUEADO
+    assert motor.mira.mapas[oponente].calor == MapaCalor().calor
+    assert oponente not in motor.grid.score_jogadores_que_atingi
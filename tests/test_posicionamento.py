@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from grid import Grid, frota_ampliada
+from posicionamento import (
+    IndicePosicionamento,
+    indice_posicionamento,
+    mascara_navio,
+    sortear_frota_esparsa,
+)
+
+
+def _conferir_frota(navios, tamanho_grid, frota):
+    assert [nome for nome, *_ in navios] == list(frota)
+    ocupadas = set()
+    for nome, x, y, tamanho, orientacao in navios:
+        assert tamanho == frota[nome]
+        assert 0 <= x and 0 <= y
+        if orientacao == "h":
+            assert x + tamanho <= tamanho_grid and y < tamanho_grid
+            celulas = {y * tamanho_grid + x + i for i in range(tamanho)}
+        else:
+            assert y + tamanho <= tamanho_grid and x < tamanho_grid
+            celulas = {(y + i) * tamanho_grid + x for i in range(tamanho)}
+        assert not celulas & ocupadas
+        ocupadas |= celulas
+
+
+def test_mesma_semente_mesmas_frotas():
+    indice = indice_posicionamento(Grid.GRID_SIZE)
+    a = list(indice.gerar_frotas(50, Grid.SHIP_CONFIG, semente=3))
+    b = list(IndicePosicionamento(Grid.GRID_SIZE).gerar_frotas(50, Grid.SHIP_CONFIG, 3))
+    assert a == b
+    assert a != list(indice.gerar_frotas(50, Grid.SHIP_CONFIG, semente=4))
+    assert indice.sortear_frota(Grid.SHIP_CONFIG, random.Random(9)) == (
+        indice.sortear_frota(Grid.SHIP_CONFIG, random.Random(9))
+    )
+
+
+@pytest.mark.parametrize(
+    "tamanho_grid, frota",
+    [
+        (Grid.GRID_SIZE, Grid.SHIP_CONFIG),
+        (6, Grid.SHIP_CONFIG),
+        (20, frota_ampliada(4)),
+    ],
+)
+def test_frotas_geradas_sao_legais(tamanho_grid, frota):
+    indice = indice_posicionamento(tamanho_grid)
+    for navios in indice.gerar_frotas(500, frota, semente=tamanho_grid):
+        _conferir_frota(navios, tamanho_grid, frota)
+
+
+def test_ocupacao_previa_respeitada():
+    n = Grid.GRID_SIZE
+    # Duas linhas inteiras já tomadas.
+    ocupacao = mascara_navio(n, 0, 2, n, "h") | mascara_navio(n, 0, 7, n, "h")
+    rng = random.Random(1)
+    indice = indice_posicionamento(n)
+    for _ in range(200):
+        for nome, x, y, tamanho, orientacao in indice.sortear_frota(
+            Grid.SHIP_CONFIG, rng, ocupacao
+        ):
+            assert not mascara_navio(n, x, y, tamanho, orientacao) & ocupacao
+
+
+def test_sem_espaco_levanta_erro():
+    with pytest.raises(ValueError):
+        indice_posicionamento(4).sortear_frota(Grid.SHIP_CONFIG, random.Random(0))
+
+
+def test_frota_esparsa_legal_e_reproduzivel():
+    frota = frota_ampliada(3)
+    a = sortear_frota_esparsa(200, frota, random.Random(2))
+    assert a == sortear_frota_esparsa(200, frota, random.Random(2))
+    _conferir_frota(a, 200, frota)
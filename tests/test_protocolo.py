@@ -0,0 +1,148 @@
+import random
+
+import pytest
+
+import protocolo
+from membros import SAIU, VIVO
+from protocolo import ErroProtocolo, Par
+
+A = Par("10.0.0.1", 5001, 0x1234ABCD)
+B = Par("192.168.1.20", 40000, 7)
+
+MENSAGENS = {
+    protocolo.TIPO_CONECTANDO: (
+        protocolo.codificar_conectando(0xDEADBEEF, 1700000000, 42, 20, [(5, 1), (2, 3)]),
+        (protocolo.TIPO_CONECTANDO, 0xDEADBEEF, 1700000000, 42, 20, ((5, 1), (2, 3))),
+    ),
+    protocolo.TIPO_TIRO: (
+        protocolo.codificar_tiro(99, 3, 7),
+        (protocolo.TIPO_TIRO, 99, 3, 7),
+    ),
+    protocolo.TIPO_RESULTADO: (
+        protocolo.codificar_resultado(99, "destroyed", 3, 7),
+        (protocolo.TIPO_RESULTADO, 99, "destroyed", 3, 7),
+    ),
+    protocolo.TIPO_GOSSIP: (
+        protocolo.codificar_gossip(0xCAFE, [(A, 10, VIVO), (B, 11, SAIU)]),
+        (protocolo.TIPO_GOSSIP, 0xCAFE, [(A, 10, VIVO), (B, 11, SAIU)]),
+    ),
+    protocolo.TIPO_PERDEU: (protocolo.MSG_PERDEU, (protocolo.TIPO_PERDEU,)),
+    protocolo.TIPO_SAINDO: (protocolo.MSG_SAINDO, (protocolo.TIPO_SAINDO,)),
+    protocolo.TIPO_SALVO: (
+        protocolo.codificar_salvo(5, [(0, 0), (9, 9), (1000, 2)]),
+        (protocolo.TIPO_SALVO, 5, [(0, 0), (9, 9), (1000, 2)]),
+    ),
+    protocolo.TIPO_RESULTADOS: (
+        protocolo.codificar_resultados(5, [("miss", 0, 0), ("game_over", 9, 9)]),
+        (protocolo.TIPO_RESULTADOS, 5, [("miss", 0, 0), ("game_over", 9, 9)]),
+    ),
+    protocolo.TIPO_VISAO: (
+        protocolo.codificar_visao(1, [(B, 3, VIVO)]),
+        (protocolo.TIPO_VISAO, 1, [(B, 3, VIVO)]),
+    ),
+    protocolo.TIPO_PEDIDO_SYNC: (
+        protocolo.MSG_PEDIDO_SYNC,
+        (protocolo.TIPO_PEDIDO_SYNC,),
+    ),
+    protocolo.TIPO_OLA: (
+        protocolo.codificar_ola(5001, 0x1234ABCD),
+        (protocolo.TIPO_OLA, 5001, 0x1234ABCD),
+    ),
+}
+
+
+def test_todos_os_tipos_tem_caso():
+    assert set(MENSAGENS) == set(protocolo.NOMES_TIPO)
+
+
+@pytest.mark.parametrize("tipo", sorted(MENSAGENS), ids=protocolo.NOMES_TIPO.get)
+def test_ida_e_volta(tipo):
+    dados, esperado = MENSAGENS[tipo]
+    assert dados[:2] == bytes((protocolo.VERSAO, tipo))
+    assert protocolo.decodificar(dados) == esperado
+
+
+@pytest.mark.parametrize("tipo", sorted(MENSAGENS), ids=protocolo.NOMES_TIPO.get)
+def test_ida_e_volta_dentro_de_buffer_maior(tipo):
+    # O TCP decodifica cada quadro sem copiá-lo para fora do buffer.
+    dados, esperado = MENSAGENS[tipo]
+    buffer = b"\xff" * 3 + dados + b"\xff" * 5
+    assert protocolo.decodificar(buffer, 3, 3 + len(dados)) == esperado
+
+
+@pytest.mark.parametrize(
+    "tipo",
+    [protocolo.TIPO_SALVO, protocolo.TIPO_RESULTADOS, protocolo.TIPO_GOSSIP],
+    ids=protocolo.NOMES_TIPO.get,
+)
+def test_lotes_vazios(tipo):
+    codificar = {
+        protocolo.TIPO_SALVO: lambda: protocolo.codificar_salvo(1, []),
+        protocolo.TIPO_RESULTADOS: lambda: protocolo.codificar_resultados(1, []),
+        protocolo.TIPO_GOSSIP: lambda: protocolo.codificar_gossip(0, []),
+    }[tipo]
+    tipo_lido, _, itens = protocolo.decodificar(codificar())
+    assert (tipo_lido, itens) == (tipo, [])
+
+
+def test_salvo_acima_do_limite_e_cortado():
+    coords = [(i, i) for i in range(protocolo.MAX_SALVO + 10)]
+    _, _, lidas = protocolo.decodificar(protocolo.codificar_salvo(1, coords))
+    assert lidas == coords[: protocolo.MAX_SALVO]
+
+
+def test_versao_diferente_e_recusada():
+    dados = bytearray(protocolo.codificar_tiro(1, 2, 3))
+    dados[0] = protocolo.VERSAO + 1
+    with pytest.raises(ErroProtocolo, match="versão"):
+        protocolo.decodificar(bytes(dados))
+
+
+def test_tipo_desconhecido_e_recusado():
+    with pytest.raises(ErroProtocolo, match="desconhecido"):
+        protocolo.decodificar(bytes((protocolo.VERSAO, 200)))
+
+
+@pytest.mark.parametrize("tipo", sorted(MENSAGENS), ids=protocolo.NOMES_TIPO.get)
+def test_mensagem_truncada_ou_com_sobra(tipo):
+    dados, _ = MENSAGENS[tipo]
+    for corte in range(len(dados)):
+        with pytest.raises(ErroProtocolo):
+            protocolo.decodificar(dados[:corte])
+    with pytest.raises(ErroProtocolo):
+        protocolo.decodificar(dados + b"\x00")
+
+
+def _decodificar_ou_erro(dados):
+    try:
+        protocolo.decodificar(dados)
+    except ErroProtocolo:
+        pass
+
+
+def test_fuzz_bytes_aleatorios():
+    rng = random.Random(1234)
+    for _ in range(20000):
+        tamanho = rng.randrange(64)
+        _decodificar_ou_erro(bytes(rng.getrandbits(8) for _ in range(tamanho)))
+
+
+def test_fuzz_cabecalho_valido():
+    # Com versão e tipo válidos o fuzz passa do cabeçalho e chega aos corpos.
+    rng = random.Random(4321)
+    tipos = list(MENSAGENS)
+    for _ in range(20000):
+        cabecalho = bytes((protocolo.VERSAO, rng.choice(tipos)))
+        corpo = bytes(rng.getrandbits(8) for _ in range(rng.randrange(48)))
+        _decodificar_ou_erro(cabecalho + corpo)
+
+
+def test_fuzz_mutacoes_de_mensagens_validas():
+    rng = random.Random(99)
+    validas = [dados for dados, _ in MENSAGENS.values()]
+    for _ in range(20000):
+        dados = bytearray(rng.choice(validas))
+        for _ in range(rng.randint(1, 4)):
+            pos = rng.randrange(1, len(dados)) if len(dados) > 1 else 0
+            dados[pos] = rng.getrandbits(8)
+        _decodificar_ou_erro(bytes(dados))
@@ -0,0 +1,97 @@
+import pytest
+
+import protocolo
+from membros import VIVO
+from p2p_node import CABECALHO_TCP, _ProtocoloTCP
+from protocolo import Par
+
+
+class TransporteFalso:
+    def __init__(self, ip):
+        self.ip = ip
+        self.fechado = False
+
+    def get_extra_info(self, nome):
+        return (self.ip, 40000) if nome == "peername" else None
+
+    def close(self):
+        self.fechado = True
+
+
+def _quadro(dados):
+    return CABECALHO_TCP.pack(len(dados)) + dados
+
+
+def _visao(inicio, quantidade):
+    entradas = [
+        (Par(f"10.1.{i // 250}.{i % 250 + 1}", 5001, i), 1, VIVO)
+        for i in range(inicio, inicio + quantidade)
+    ]
+    return protocolo.codificar_visao(0, entradas), [par for par, _, _ in entradas]
+
+
+@pytest.fixture
+def conexao(criar_nos):
+    # a recebe uma conexão de b, já apresentada.
+    a, b = criar_nos(2)
+    tcp = _ProtocoloTCP(a)
+    transporte = TransporteFalso(b.eu.ip)
+    tcp.connection_made(transporte)
+    tcp.data_received(_quadro(protocolo.codificar_ola(b.eu.porta, b.eu.id)))
+    assert tcp.par == b.eu
+    return a, tcp, transporte
+
+
+def test_quadro_partido_entre_leituras(conexao):
+    a, tcp, transporte = conexao
+    visao, pares = _visao(0, 3)
+    quadro = _quadro(visao)
+    # Corte dentro do cabeçalho e depois dentro do corpo.
+    for parte in (quadro[:2], quadro[2:9], quadro[9:-1]):
+        tcp.data_received(parte)
+        assert not any(a.visao.esta_vivo(par) for par in pares)
+    tcp.data_received(quadro[-1:])
+    assert all(a.visao.esta_vivo(par) for par in pares)
+    assert len(tcp.buffer) == 0
+    assert not transporte.fechado
+
+
+def test_varios_quadros_numa_leitura(conexao):
+    a, tcp, transporte = conexao
+    (v1, p1), (v2, p2) = _visao(0, 2), _visao(2, 2)
+    # Dois quadros inteiros e o começo de um terceiro.
+    tcp.data_received(_quadro(v1) + _quadro(v2) + _quadro(v1)[:3])
+    assert all(a.visao.esta_vivo(par) for par in p1 + p2)
+    assert len(tcp.buffer) == 3
+    assert not transporte.fechado
+
+
+def test_quadro_maior_que_1024_bytes(conexao):
+    a, tcp, transporte = conexao
+    visao, pares = _visao(0, 200)
+    assert len(visao) > 1024
+    quadro = _quadro(visao)
+    for inicio in range(0, len(quadro), 1024):
+        tcp.data_received(quadro[inicio : inicio + 1024])
+    assert all(a.visao.esta_vivo(par) for par in pares)
+    assert not transporte.fechado
+
+
+def test_quadro_acima_do_limite_fecha(conexao):
+    a, tcp, transporte = conexao
+    tcp.data_received(CABECALHO_TCP.pack(a.TCP_MAX_MENSAGEM + 1) + b"\0" * 16)
+    assert transporte.fechado
+    assert len(tcp.buffer) == 0
+
+
+def test_conexao_sem_ola_e_recusada(criar_nos):
+    a, b = criar_nos(2)
+    tcp = _ProtocoloTCP(a)
+    transporte = TransporteFalso(b.eu.ip)
+    tcp.connection_made(transporte)
+    visao, pares = _visao(0, 2)
+    tcp.data_received(_quadro(visao))
+    assert transporte.fechado
+    assert tcp.par is None
+    assert not any(a.visao.esta_vivo(par) for par in pares)
+    assert a.metricas.contadores["mensagens_invalidas"] == 1
@@ -0,0 +1,33 @@
+from grid import Grid
+from simulacao import Simulacao
+
+
+def test_game_over_conta_como_acerto(criar_bots):
+    # O último tiro numa frota volta como game_over: é um acerto, não água.
+    a, b = criar_bots(2)
+    a.callback_queue.put(("resultado_tiro", b.eu, "game_over", 4, 2))
+    a.processar_eventos()
+    assert a.grids_oponentes[b.eu].celula(4, 2) == Grid.SIMBOLO_ATINGIDO
+    assert b.eu in a.grid.score_jogadores_que_atingi
+
+
+def test_tiro_final_pela_rede(criar_bots):
+    a, b = criar_bots(2)
+    celulas = list(b.grid.navio_na_celula)
+    for idx in celulas[:-1]:
+        b.grid.processar_tiro(idx % b.grid.GRID_SIZE, idx // b.grid.GRID_SIZE)
+    x, y = celulas[-1] % b.grid.GRID_SIZE, celulas[-1] // b.grid.GRID_SIZE
+
+    a.enviar_tiro(b.eu, x, y)
+    b.processar_eventos()
+    assert a.callback_queue.queue[0] == ("resultado_tiro", b.eu, "game_over", x, y)
+    a.processar_eventos()
+    assert b.eu in a.grid.score_jogadores_que_atingi
+    assert not b.vivo
+    assert b.eu not in a.grids_oponentes
+
+
+def test_partida_termina_com_um_vencedor():
+    bots, _ = Simulacao(jogadores=3, semente=1, metricas=False).jogar_partida()
+    assert sum(bot.vivo for bot in bots) == 1
+    assert all(bot.tiros_sem_resposta == 0 for bot in bots)
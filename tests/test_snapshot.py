@@ -0,0 +1,54 @@
+import snapshot
+from fila_eventos import FilaEventos
+from grid import Grid
+from mira import MapaCalor
+from motor import MotorJogo
+from protocolo import Par
+from simulacao import TransporteMemoria
+
+OPONENTE = Par("10.0.0.2", 5001, 2)
+
+
+def _restaurar(motor, rede, caminho):
+    snapshot.Snapshots(caminho).fechar(motor)
+    fila = FilaEventos()
+    restaurado = MotorJogo(fila, TransporteMemoria(fila, rede, "10.0.0.1"), Grid())
+    restaurado.verboso = False
+    restaurado.restaurar_estado(caminho)
+    return restaurado
+
+
+def test_mira_restaurada_sabe_dos_navios_afundados(motor, rede, tmp_path):
+    # Lancha do oponente afundada em (0, 0)-(1, 0), um acerto solto em (5, 5),
+    # um erro e uma casa já atingida por outro jogador.
+    motor.callback_queue.put(("novo_participante", OPONENTE))
+    for resultado, x, y in [
+        ("hit", 0, 0),
+        ("hit", 5, 5),
+        ("miss", 3, 3),
+        ("destroyed", 1, 0),
+        ("repeat", 7, 7),
+    ]:
+        motor.callback_queue.put(("resultado_tiro", OPONENTE, resultado, x, y))
+    motor.processar_eventos_rede()
+    original = motor.mira.mapas[OPONENTE]
+    assert original.restantes[2] == 0
+
+    restaurado = _restaurar(motor, rede, str(tmp_path / "estado.snap"))
+    mapa = restaurado.mira.mapas[OPONENTE]
+    assert mapa.restantes == original.restantes
+    assert mapa.acertos == original.acertos
+    assert mapa.desconhecidas == original.desconhecidas
+    assert mapa.calor == original.calor
+    oponente = restaurado.grids_oponentes[OPONENTE]
+    assert oponente.afundados() == [1]
+    assert oponente.celula(7, 7) == Grid.SIMBOLO_BLOQUEADO
+
+
+def test_oponente_sem_tiros_volta_intocado(motor, rede, tmp_path):
+    motor.callback_queue.put(("novo_participante", OPONENTE))
+    motor.processar_eventos_rede()
+    restaurado = _restaurar(motor, rede, str(tmp_path / "estado.snap"))
+    assert restaurado.grids_oponentes[OPONENTE].afundados() == []
+    mapa = restaurado.mira.mapas[OPONENTE]
+    assert mapa is None or mapa.calor == MapaCalor().calor